@@ -1,13 +1,45 @@
+import json
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from app.core.auth import get_current_verified_user, require_analyst
 from app.db.database import get_db
-from app.schemas.livability import LivabilityScoreResponse, LivabilityComparisonResponse
+from app.models.user import User
+from app.schemas.livability import (
+    LivabilityScoreResponse, LivabilityComparisonResponse,
+    LivabilityRankingRequest, LivabilityRankingResponse, LivabilityRankStabilityRequest,
+    IndicatorValuesUpdateRequest, UserWeightProfile
+)
 from app.services.livability_service import LivabilityService
 
 router = APIRouter()
 livability_service = LivabilityService()
 
+RADAR_LABELS = [
+    "インフラ", "医療・健康", "教育", "環境",
+    "経済・雇用", "コミュニティ", "交通", "文化・娯楽"
+]
+# 重ね表示の系列色（地域数が多い場合は繰り返す）
+RADAR_COLORS = [
+    (59, 130, 246), (239, 68, 68), (16, 185, 129), (245, 158, 11),
+    (139, 92, 246), (236, 72, 153), (20, 184, 166), (107, 114, 128)
+]
+
+
+def _radar_dataset(label: str, data: List[float], color: tuple) -> dict:
+    """Chart.js レーダーチャートの1系列"""
+    rgb = f"rgb({color[0]}, {color[1]}, {color[2]})"
+    return {
+        "label": label,
+        "data": data,
+        "borderColor": rgb,
+        "backgroundColor": f"rgba({color[0]}, {color[1]}, {color[2]}, 0.2)",
+        "pointBackgroundColor": rgb,
+        "pointBorderColor": "#fff",
+        "pointHoverBackgroundColor": "#fff",
+        "pointHoverBorderColor": rgb
+    }
+
 
 @router.get("/scores", response_model=List[LivabilityScoreResponse])
 async def get_livability_scores(
@@ -52,6 +84,7 @@ async def get_livability_radar_chart(
     municipality_code: str,
     year: Optional[int] = None,
     user_weights: Optional[str] = None,  # JSON文字列
+    profile_id: Optional[int] = None,  # 保存済み重みプロファイル（user_weights より優先）
     db: Session = Depends(get_db)
 ):
     """住みやすさレーダーチャートデータを取得する（Chart.js用）"""
@@ -60,24 +93,188 @@ async def get_livability_radar_chart(
             db=db,
             municipality_code=municipality_code,
             year=year,
-            user_weights=user_weights
+            user_weights=user_weights,
+            profile_id=profile_id
+        )
+        return {
+            "labels": RADAR_LABELS,
+            "datasets": [_radar_dataset(chart_data["municipality_name"], chart_data["scores"], RADAR_COLORS[0])]
+        }
+    except (ValueError, LookupError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/radar-chart/overlay")
+async def get_livability_radar_overlay(
+    municipality_codes: List[str] = Query(...),
+    year: Optional[int] = None,
+    user_weights: Optional[str] = None,  # JSON文字列
+    profile_id: Optional[int] = None,  # 保存済み重みプロファイル（user_weights より優先）
+    db: Session = Depends(get_db)
+):
+    """複数地域を重ねた住みやすさレーダーチャートデータを取得する（Chart.js用）"""
+    try:
+        overlay_data = await livability_service.get_radar_overlay_data(
+            db=db,
+            municipality_codes=municipality_codes,
+            year=year,
+            user_weights=user_weights,
+            profile_id=profile_id
         )
         return {
-            "labels": [
-                "インフラ", "医療・健康", "教育", "環境",
-                "経済・雇用", "コミュニティ", "交通", "文化・娯楽"
+            "labels": RADAR_LABELS,
+            "datasets": [
+                _radar_dataset(item["municipality_name"], item["scores"], RADAR_COLORS[i % len(RADAR_COLORS)])
+                for i, item in enumerate(overlay_data)
+            ],
+            "municipalities": [
+                {"municipality_code": item["municipality_code"], "year": item["year"]}
+                for item in overlay_data
             ],
-            "datasets": [{
-                "label": chart_data["municipality_name"],
-                "data": chart_data["scores"],
-                "borderColor": "rgb(59, 130, 246)",
-                "backgroundColor": "rgba(59, 130, 246, 0.2)",
-                "pointBackgroundColor": "rgb(59, 130, 246)",
-                "pointBorderColor": "#fff",
-                "pointHoverBackgroundColor": "#fff",
-                "pointHoverBorderColor": "rgb(59, 130, 246)"
-            }]
+            "missing_codes": [
+                code for code in municipality_codes
+                if code not in {item["municipality_code"] for item in overlay_data}
+            ]
         }
+    except (ValueError, LookupError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/clusters")
+async def get_livability_clusters(
+    year: Optional[int] = None,
+    n_clusters: Optional[int] = Query(None, ge=2, le=20),
+    prefecture_code: Optional[str] = None,  # 指定時はその都道府県の市町村のみ返す（クラスタは全国で算出）
+    include_embedding: bool = True,
+    db: Session = Depends(get_db)
+):
+    """全国の市町村類型クラスタと描画用の2次元埋め込みを取得する"""
+    try:
+        return await livability_service.get_municipality_clusters(
+            db=db,
+            year=year,
+            n_clusters=n_clusters,
+            prefecture_code=prefecture_code,
+            include_embedding=include_embedding
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/similar")
+async def get_similar_municipalities(
+    municipality_code: str,
+    k: int = Query(10, ge=1, le=100),
+    year: Optional[int] = None,
+    weights: Optional[str] = None,  # JSON文字列（"<特徴量>_weight"）
+    exclude_same_prefecture: bool = False,
+    db: Session = Depends(get_db)
+):
+    """全国から住みやすさ・人口構造が類似した市町村を取得する"""
+    try:
+        return await livability_service.find_similar_municipalities(
+            db=db,
+            municipality_code=municipality_code,
+            k=k,
+            year=year,
+            weights=json.loads(weights) if weights else None,
+            exclude_same_prefecture=exclude_same_prefecture
+        )
+    except (ValueError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/indicator-values/correlation")
+async def get_indicator_correlation(
+    indicator_codes: List[str] = Query(...),
+    year: Optional[int] = None,
+    prefecture_code: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """指標間の相関係数行列を取得する"""
+    try:
+        return await livability_service.get_indicator_correlation(
+            db=db,
+            indicator_codes=indicator_codes,
+            year=year,
+            prefecture_code=prefecture_code
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.patch("/indicator-values")
+async def update_indicator_values(
+    request: IndicatorValuesUpdateRequest,
+    current_user: User = Depends(require_analyst),
+    db: Session = Depends(get_db)
+):
+    """指標値を更新し、影響する市町村のスコア・順位だけを差分で再計算する（分析者権限が必要）"""
+    try:
+        return await livability_service.update_indicator_values(
+            db=db,
+            prefecture_code=request.prefecture_code,
+            year=request.year,
+            changes=request.changes
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/indicator-values/{indicator_code}/ranking")
+async def get_indicator_ranking(
+    indicator_code: str,
+    year: Optional[int] = None,
+    prefecture_code: Optional[str] = None,
+    top_k: int = Query(50, ge=1, le=2000),
+    db: Session = Depends(get_db)
+):
+    """指標値による市町村順位を取得する"""
+    try:
+        return await livability_service.get_indicator_ranking(
+            db=db,
+            indicator_code=indicator_code,
+            year=year,
+            prefecture_code=prefecture_code,
+            top_k=top_k
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/indicator-values/{indicator_code}/time-series")
+async def get_indicator_time_series(
+    indicator_code: str,
+    municipality_codes: List[str] = Query(...),
+    start_year: Optional[int] = None,
+    end_year: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """市町村ごとの指標値の時系列を取得する"""
+    try:
+        return await livability_service.get_indicator_time_series(
+            db=db,
+            indicator_code=indicator_code,
+            municipality_codes=municipality_codes,
+            start_year=start_year,
+            end_year=end_year
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -117,4 +314,104 @@ async def calculate_custom_livability_score(
         )
         return custom_score
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ranking", response_model=LivabilityRankingResponse)
+async def rank_livability_with_custom_weights(
+    request: LivabilityRankingRequest,
+    db: Session = Depends(get_db)
+):
+    """カスタム重み設定で全市町村を再ランキングし、上位k件を返す"""
+    try:
+        ranking = await livability_service.rank_with_custom_weights(
+            db=db,
+            custom_weights=request.custom_weights,
+            prefecture_code=request.prefecture_code,
+            year=request.year,
+            top_k=request.top_k,
+            profile_id=request.profile_id
+        )
+        return ranking
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/rank-stability")
+async def analyze_livability_rank_stability(
+    request: LivabilityRankStabilityRequest,
+    db: Session = Depends(get_db)
+):
+    """重みの揺らぎに対する順位の安定性を分析する（順位分布・上位k位以内の確率）"""
+    try:
+        stability = await livability_service.analyze_rank_stability(
+            db=db,
+            custom_weights=request.custom_weights,
+            prefecture_code=request.prefecture_code,
+            year=request.year,
+            municipality_codes=request.municipality_codes,
+            n_samples=request.n_samples,
+            concentration=request.concentration,
+            top_k=request.top_k,
+            include_distribution=request.include_distribution,
+            seed=request.seed,
+            profile_id=request.profile_id
+        )
+        return stability
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/weight-profiles")
+async def create_weight_profile(
+    profile: UserWeightProfile,
+    prefecture_code: str = "31",
+    current_user: User = Depends(get_current_verified_user),
+    db: Session = Depends(get_db)
+):
+    """ログインユーザーの重みプロファイルを保存し、重み付きスコアを事前計算する"""
+    try:
+        return await livability_service.save_weight_profile(
+            db=db,
+            profile_data=profile,
+            user_id=current_user.id,
+            prefecture_code=prefecture_code
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/weight-profiles/{profile_id}")
+async def update_weight_profile(
+    profile_id: int,
+    profile: UserWeightProfile,
+    prefecture_code: str = "31",
+    current_user: User = Depends(get_current_verified_user),
+    db: Session = Depends(get_db)
+):
+    """ログインユーザーの重みプロファイルを更新し、重み付きスコアを再計算する"""
+    try:
+        return await livability_service.save_weight_profile(
+            db=db,
+            profile_data=profile,
+            user_id=current_user.id,
+            profile_id=profile_id,
+            prefecture_code=prefecture_code
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
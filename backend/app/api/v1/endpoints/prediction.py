@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, List, Optional, Any
 import logging
 from datetime import datetime
@@ -6,6 +7,10 @@ from pydantic import BaseModel, Field
 import pandas as pd
 import numpy as np
 
+from app.db.database import SessionLocal
+from app.models.population import PopulationData
+from app.services.livability_rules import LivabilityIndicatorRules
+
 # 予測モデルのインポート
 from backend.ml_models.population_forecast import PopulationPredictor
 from backend.ml_models.economic_impact import EconomicImpactPredictor  
@@ -30,15 +35,32 @@ class PopulationPredictionRequest(BaseModel):
     years_ahead: int = Field(10, ge=1, le=20, description="予測期間（年）")
     policy_scenario: Optional[PolicyScenario] = Field(None, description="政策シナリオ")
 
+class PopulationScenarioBatchRequest(BaseModel):
+    model_type: str = Field("ensemble", description="予測モデル種別")
+    years_ahead: int = Field(10, ge=1, le=20, description="予測期間（年）")
+    scenarios: List[PolicyScenario] = Field(..., description="政策シナリオ一覧")
+
 class EconomicPredictionRequest(BaseModel):
     policy_scenario: Dict[str, float] = Field(..., description="政策シナリオ")
     population_change: float = Field(0.0, description="人口変化率（%）")
     years_ahead: int = Field(5, ge=1, le=10, description="予測期間（年）")
 
+class EconomicScenarioBatchRequest(BaseModel):
+    policy_scenarios: List[Dict[str, float]] = Field(..., description="政策シナリオ（政策別投資額）一覧")
+    population_change: float = Field(0.0, description="人口変化率（%）")
+    years_ahead: int = Field(5, ge=1, le=10, description="予測期間（年）")
+
 class LivabilityPredictionRequest(BaseModel):
     current_indicators: Dict[str, Dict[str, float]] = Field(..., description="現在の住みやすさ指標")
     policy_effects: Dict[str, Dict[str, float]] = Field(..., description="政策による指標変化")
 
+class LivabilityScenarioBatchRequest(BaseModel):
+    municipalities: Dict[str, Dict[str, Dict[str, float]]] = Field(..., description="市町村別の現在の住みやすさ指標")
+    policy_scenarios: List[Dict[str, Dict[str, float]]] = Field(..., description="政策シナリオ（指標変化）一覧")
+
+class ModelActivationRequest(BaseModel):
+    version: str = Field(..., description="有効化するモデルバージョン")
+
 class OptimizationRequest(BaseModel):
     objective: str = Field("total_benefit", description="最適化目標")
     budget_constraint: float = Field(100.0, ge=10, le=500, description="予算制約（億円）")
@@ -49,6 +71,19 @@ population_model = PopulationPredictor()
 economic_model = EconomicImpactPredictor()
 livability_model = LivabilityScorePredictor()
 policy_optimizer = PolicyOptimizer(population_model, economic_model, livability_model)
+livability_indicator_rules = LivabilityIndicatorRules()
+
+def active_model_version() -> str:
+    """レスポンスに記載するモデルバージョン（レジストリで有効な読み込み済みバージョン。未登録時は初期版）"""
+    return population_model.model_version or "1.0.0"
+
+def refresh_livability_rules() -> None:
+    """指標マスターの変更を住みやすさモデルに反映（確認は一定間隔に間引く）"""
+    db = SessionLocal()
+    try:
+        livability_indicator_rules.apply(db, livability_model)
+    finally:
+        db.close()
 
 @router.post("/population", response_model=Dict[str, Any])
 async def predict_population(request: PopulationPredictionRequest):
@@ -58,19 +93,24 @@ async def predict_population(request: PopulationPredictionRequest):
     try:
         logger.info(f"人口予測リクエスト: {request.model_type}, {request.years_ahead}年")
         
+        # 有効モデルバージョンが切り替わっていれば再起動なしで入れ替え
+        await run_in_threadpool(population_model.refresh_models)
+        
         # 政策シナリオを辞書に変換
         policy_scenario = None
         if request.policy_scenario:
             policy_scenario = request.policy_scenario.dict()
         
-        # 予測実行
+        # 予測実行（CPU処理のためイベントループをブロックしないようスレッドプールで実行）
         if request.model_type == "ensemble":
-            result = population_model.ensemble_predict(
+            result = await run_in_threadpool(
+                population_model.ensemble_predict,
                 years_ahead=request.years_ahead,
                 policy_scenario=policy_scenario
             )
         else:
-            result = population_model.predict_population(
+            result = await run_in_threadpool(
+                population_model.predict_population,
                 model_type=request.model_type,
                 years_ahead=request.years_ahead,
                 policy_scenario=policy_scenario
@@ -81,20 +121,25 @@ async def predict_population(request: PopulationPredictionRequest):
             "prediction_type": "population",
             "model_type": request.model_type,
             "years_ahead": request.years_ahead,
-            "forecast": result.get("forecast", []),
+            "forecast": np.asarray(result.get("forecast", []), dtype=float).tolist(),
             "dates": [date.isoformat() if hasattr(date, 'isoformat') else str(date) 
                      for date in result.get("dates", [])],
             "confidence_intervals": {
-                "lower": result.get("lower_bound", []),
-                "upper": result.get("upper_bound", [])
+                "lower": np.asarray(result.get("lower_bound", []), dtype=float).tolist(),
+                "upper": np.asarray(result.get("upper_bound", []), dtype=float).tolist()
             },
             "policy_scenario": policy_scenario,
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
-                "model_version": "1.0.0"
+                "model_version": active_model_version()
             }
         }
         
+        # 市町村別の再帰予測結果
+        if "series_forecasts" in result:
+            response["series"] = list(result["series"])
+            response["series_forecasts"] = np.asarray(result["series_forecasts"], dtype=float).tolist()
+        
         if request.model_type == "ensemble":
             response["individual_predictions"] = result.get("individual_predictions", {})
             response["model_weights"] = result.get("weights", {})
@@ -106,6 +151,53 @@ async def predict_population(request: PopulationPredictionRequest):
         logger.error(f"人口予測エラー: {e}")
         raise HTTPException(status_code=500, detail=f"人口予測に失敗しました: {str(e)}")
 
+@router.post("/population/scenarios", response_model=Dict[str, Any])
+async def predict_population_scenarios(request: PopulationScenarioBatchRequest):
+    """
+    人口予測 一括What-ifシナリオ評価API
+    """
+    try:
+        logger.info(f"一括シナリオ予測リクエスト: {request.model_type}, {len(request.scenarios)}シナリオ")
+        
+        await run_in_threadpool(population_model.refresh_models)
+        scenarios = [scenario.dict() for scenario in request.scenarios]
+        
+        # 基本予測1回 + 行列積で全シナリオを評価
+        result = await run_in_threadpool(
+            population_model.predict_population_scenarios,
+            scenarios=scenarios,
+            model_type=request.model_type,
+            years_ahead=request.years_ahead
+        )
+        
+        # 列指向のコンパクトな形式で返却（trajectories[i] がシナリオiの予測系列）
+        response = {
+            "prediction_type": "population_scenarios",
+            "model_type": request.model_type,
+            "years_ahead": request.years_ahead,
+            "scenario_count": len(scenarios),
+            "dates": [date.isoformat() if hasattr(date, 'isoformat') else str(date)
+                     for date in result.get("dates", [])],
+            "base_forecast": result["forecast"].tolist(),
+            "policy_effect_factors": result["policy_effect_factors"].tolist(),
+            "trajectories": result["trajectories"].tolist(),
+            "confidence_intervals": {
+                "lower": result["lower_bounds"].tolist() if "lower_bounds" in result else [],
+                "upper": result["upper_bounds"].tolist() if "upper_bounds" in result else []
+            },
+            "metadata": {
+                "generated_at": datetime.now().isoformat(),
+                "model_version": active_model_version()
+            }
+        }
+        
+        logger.info("一括シナリオ予測完了")
+        return response
+        
+    except Exception as e:
+        logger.error(f"一括シナリオ予測エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"一括シナリオ予測に失敗しました: {str(e)}")
+
 @router.post("/economic-impact", response_model=Dict[str, Any])
 async def predict_economic_impact(request: EconomicPredictionRequest):
     """
@@ -145,7 +237,7 @@ async def predict_economic_impact(request: EconomicPredictionRequest):
             "years": list(range(1, request.years_ahead + 1)),
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
-                "model_version": "1.0.0"
+                "model_version": active_model_version()
             }
         }
         
@@ -156,6 +248,61 @@ async def predict_economic_impact(request: EconomicPredictionRequest):
         logger.error(f"経済効果予測エラー: {e}")
         raise HTTPException(status_code=500, detail=f"経済効果予測に失敗しました: {str(e)}")
 
+@router.post("/economic-impact/scenarios", response_model=Dict[str, Any])
+async def predict_economic_scenarios(request: EconomicScenarioBatchRequest):
+    """
+    経済効果予測 一括シナリオ評価API
+    """
+    try:
+        logger.info(f"経済効果一括シナリオ予測リクエスト: {len(request.policy_scenarios)}シナリオ")
+        
+        # 全シナリオの最終需要をまとめて産業連関表の LU 分解で1回で解く
+        result = await run_in_threadpool(
+            economic_model.comprehensive_economic_analysis_batch,
+            policy_scenarios=request.policy_scenarios,
+            population_change=request.population_change,
+            years_ahead=request.years_ahead
+        )
+        
+        # 列指向のコンパクトな形式で返却（配列の i 番目がシナリオ i、回収できない場合の回収期間は None）
+        payback_period = result["payback_period"].astype(object)
+        payback_period[np.isinf(result["payback_period"])] = None
+        response = {
+            "prediction_type": "economic_scenarios",
+            "scenario_count": len(request.policy_scenarios),
+            "policies": result["policies"],
+            "sectors": result["sectors"],
+            "years": result["years"],
+            "total_investment": result["total_investment"].tolist(),
+            "economic_impact": {
+                "gdp_impact": result["total_gdp_impact"].tolist(),
+                "employment_impact": result["employment_impact"].tolist(),
+                "tax_revenue_impact": result["total_tax_revenue"].tolist(),
+                "multiplier_effect": result["multiplier_effect"].tolist()
+            },
+            "time_series_projections": {
+                "gdp_annual": result["gdp_projections"].tolist(),
+                "employment_annual": result["employment_projections"].tolist(),
+                "tax_revenue_annual": result["annual_tax_revenue"].tolist()
+            },
+            "industry_breakdown": result["industry_breakdown"].tolist(),
+            "roi_analysis": {
+                "roi_percent": result["roi_percent"].tolist(),
+                "payback_period": payback_period.tolist()
+            },
+            "metadata": {
+                "generated_at": datetime.now().isoformat(),
+                "model_version": active_model_version()
+            }
+        }
+        
+        logger.info("経済効果一括シナリオ予測完了")
+        return response
+        
+    except Exception as e:
+        logger.error(f"経済効果一括シナリオ予測エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"経済効果一括シナリオ予測に失敗しました: {str(e)}")
+
 @router.post("/livability-score", response_model=Dict[str, Any])
 async def predict_livability_score(request: LivabilityPredictionRequest):
     """
@@ -163,6 +310,7 @@ async def predict_livability_score(request: LivabilityPredictionRequest):
     """
     try:
         logger.info("住みやすさスコア予測リクエスト")
+        await run_in_threadpool(refresh_livability_rules)
         
         # 現在のスコア計算
         current_result = livability_model.calculate_livability_score(request.current_indicators)
@@ -195,7 +343,7 @@ async def predict_livability_score(request: LivabilityPredictionRequest):
             "detailed_breakdown": current_result["detailed_breakdown"],
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
-                "model_version": "1.0.0"
+                "model_version": active_model_version()
             }
         }
         
@@ -206,6 +354,56 @@ async def predict_livability_score(request: LivabilityPredictionRequest):
         logger.error(f"住みやすさスコア予測エラー: {e}")
         raise HTTPException(status_code=500, detail=f"住みやすさスコア予測に失敗しました: {str(e)}")
 
+@router.post("/livability-score/scenarios", response_model=Dict[str, Any])
+async def predict_livability_scenarios(request: LivabilityScenarioBatchRequest):
+    """
+    住みやすさスコア 一括政策シナリオ評価API
+    """
+    try:
+        logger.info(
+            f"住みやすさ一括シナリオ予測リクエスト: {len(request.municipalities)}市町村, "
+            f"{len(request.policy_scenarios)}シナリオ"
+        )
+        await run_in_threadpool(refresh_livability_rules)
+        
+        # シナリオ × 市町村 × 指標 の配列で全組み合わせを一括評価
+        result = await run_in_threadpool(
+            livability_model.predict_score_changes_batch,
+            municipalities_data=request.municipalities,
+            policy_scenarios=request.policy_scenarios
+        )
+        
+        # 列指向のコンパクトな形式で返却（[シナリオ][市町村][カテゴリ] の順）
+        efficiency = result["efficiency"].astype(object)
+        efficiency[np.isnan(result["efficiency"])] = None
+        response = {
+            "prediction_type": "livability_scenarios",
+            "scenario_count": len(request.policy_scenarios),
+            "municipalities": result["municipalities"],
+            "categories": result["categories"],
+            "current_scores": result["current_scores"].tolist(),
+            "current_ranks": result["current"]["grades"].tolist(),
+            "future_scores": result["future_scores"].tolist(),
+            "score_changes": result["score_changes"].tolist(),
+            "future_ranks": result["future_grades"].tolist(),
+            "rank_changed": result["rank_changed"].tolist(),
+            "category_changes": result["category_changes"].tolist(),
+            "policy_inputs": result["policy_inputs"].tolist(),
+            "policy_efficiency": efficiency.tolist(),
+            "effectiveness_levels": result["effectiveness"].tolist(),
+            "metadata": {
+                "generated_at": datetime.now().isoformat(),
+                "model_version": active_model_version()
+            }
+        }
+        
+        logger.info("住みやすさ一括シナリオ予測完了")
+        return response
+        
+    except Exception as e:
+        logger.error(f"住みやすさ一括シナリオ予測エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"住みやすさ一括シナリオ予測に失敗しました: {str(e)}")
+
 @router.post("/policy-optimization", response_model=Dict[str, Any])
 async def optimize_policy_allocation(request: OptimizationRequest):
     """
@@ -259,7 +457,7 @@ async def optimize_policy_allocation(request: OptimizationRequest):
             "effect_uncertainty": optimization_result.get("effect_uncertainty", {}),
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
-                "model_version": "1.0.0"
+                "model_version": active_model_version()
             }
         }
         
@@ -280,6 +478,8 @@ async def get_model_status():
         status = {
             "population_model": {
                 "available_models": list(population_model.models.keys()),
+                "model_version": population_model.model_version,
+                "training_data_version": population_model.training_data_version,
                 "feature_columns_count": len(population_model.feature_columns),
                 "status": "ready" if population_model.models else "not_trained"
             },
@@ -300,7 +500,7 @@ async def get_model_status():
             },
             "system": {
                 "last_updated": datetime.now().isoformat(),
-                "version": "1.0.0"
+                "version": active_model_version()
             }
         }
         
@@ -310,6 +510,43 @@ async def get_model_status():
         logger.error(f"モデル状態取得エラー: {e}")
         raise HTTPException(status_code=500, detail=f"モデル状態取得に失敗しました: {str(e)}")
 
+@router.get("/models/population/versions", response_model=Dict[str, Any])
+async def list_population_model_versions():
+    """
+    人口予測モデルの登録済みバージョン一覧API
+    """
+    try:
+        registry = population_model.registry
+        return {
+            "active_version": registry.get_active_version(population_model.REGISTRY_NAMESPACE),
+            "loaded_version": population_model.model_version,
+            "versions": registry.list_versions(population_model.REGISTRY_NAMESPACE)
+        }
+        
+    except Exception as e:
+        logger.error(f"モデルバージョン一覧取得エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"モデルバージョン一覧取得に失敗しました: {str(e)}")
+
+@router.post("/models/population/activate", response_model=Dict[str, Any])
+async def activate_population_model_version(request: ModelActivationRequest):
+    """
+    人口予測モデルの有効バージョン切替API（他ワーカーはポーリングで追従）
+    """
+    try:
+        # モデル読み込み・ACTIVEファイル書き込みはイベントループを塞がないようスレッドプールで実行
+        await run_in_threadpool(population_model.activate_version, request.version)
+        return {
+            "active_version": population_model.model_version,
+            "available_models": list(population_model.models.keys()),
+            "activated_at": datetime.now().isoformat()
+        }
+        
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"モデルバージョン切替エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"モデルバージョン切替に失敗しました: {str(e)}")
+
 @router.post("/comprehensive-analysis", response_model=Dict[str, Any])
 async def comprehensive_policy_analysis(
     request: dict,
@@ -329,7 +566,8 @@ async def comprehensive_policy_analysis(
         results = {}
         
         # 1. 人口予測
-        population_result = population_model.ensemble_predict(
+        population_result = await run_in_threadpool(
+            population_model.ensemble_predict,
             years_ahead=years_ahead,
             policy_scenario=policy_scenario
         )
@@ -380,7 +618,7 @@ async def comprehensive_policy_analysis(
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
                 "analysis_duration": "background",
-                "version": "1.0.0"
+                "version": active_model_version()
             }
         }
         
@@ -394,17 +632,49 @@ async def comprehensive_policy_analysis(
         logger.error(f"包括的政策分析エラー: {e}")
         raise HTTPException(status_code=500, detail=f"包括的政策分析に失敗しました: {str(e)}")
 
-async def update_models_with_new_data():
+def update_models_with_new_data():
     """
-    バックグラウンドでのモデル更新タスク
+    バックグラウンドでのモデル増分更新タスク
+    
+    DB参照・増分学習・レジストリ保存はいずれも同期処理のため通常の関数とし、
+    Starlette のスレッドプールで実行させる（イベントループを塞がない）。
     """
     try:
         logger.info("バックグラウンドモデル更新開始")
         
-        # 新しいデータでモデルを再学習（簡略化）
-        # 実際の実装では、最新の統計データを取得してモデルを更新
+        last_date = population_model.last_observed_date
+        if last_date is None:
+            logger.info("特徴量キャッシュがないため増分更新をスキップします")
+            return
         
-        logger.info("バックグラウンドモデル更新完了")
+        # 最終観測年より新しい県全体の人口データを取得
+        db = SessionLocal()
+        try:
+            rows = db.query(PopulationData.year, PopulationData.total_population).filter(
+                PopulationData.prefecture_code == "31",
+                PopulationData.municipality_code.is_(None),
+                PopulationData.year > last_date.year
+            ).order_by(PopulationData.year).all()
+        finally:
+            db.close()
+        
+        if not rows:
+            logger.info("新しいデータがないため増分更新をスキップします")
+            return
+        
+        new_rows = pd.DataFrame({
+            "date": [datetime(row.year, 1, 1) for row in rows],
+            "population": [float(row.total_population) for row in rows]
+        })
+        
+        # 全量再学習せず既存モデルを増分更新し、新バージョンとして登録（他ワーカーはホットスワップ）
+        update_results = population_model.update_models_with_new_data(new_rows)
+        version = population_model.save_models(metadata={
+            "update_type": "incremental",
+            "incremental_update": update_results
+        })
+        
+        logger.info(f"バックグラウンドモデル更新完了: {version}")
         
     except Exception as e:
         logger.error(f"バックグラウンドモデル更新エラー: {e}")
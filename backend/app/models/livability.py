@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, JSON, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from app.db.database import Base
 
@@ -6,6 +6,10 @@ from app.db.database import Base
 class LivabilityScore(Base):
     """住みやすさスコアモデル"""
     __tablename__ = "livability_scores"
+    __table_args__ = (
+        # 市町村ごとの最新年の選択・比較クエリ用
+        Index("ix_livability_scores_municipality_year", "municipality_code", "year"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     prefecture_code = Column(String(2), nullable=False)
@@ -37,6 +41,38 @@ class LivabilityScore(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 
+class LivabilityIndicatorValue(Base):
+    """住みやすさ指標値（市町村 × 年 × 指標 の縦持ち形式）
+
+    detailed_metrics の JSON を読まずに指標単位の絞り込み・集計（順位・相関・時系列）を
+    SQLで行うための正規化テーブル。スコア書き込み時（LivabilityDeltaUpdater）に同期し、
+    既存データは backfill_indicator_values で detailed_metrics から作成する。
+    """
+    __tablename__ = "livability_indicator_values"
+    __table_args__ = (
+        # 市町村・指標ごとの時系列、および同期時の既存行の照合用
+        UniqueConstraint(
+            "municipality_code", "indicator_code", "year", "category",
+            name="uq_livability_indicator_values_municipality_indicator_year"
+        ),
+        # 指標・年ごとの順位・相関の集計用
+        Index("ix_livability_indicator_values_indicator_year", "indicator_code", "year"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    prefecture_code = Column(String(2), nullable=False)
+    municipality_code = Column(String(5), nullable=False)
+    year = Column(Integer, nullable=False)
+    category = Column(String(50), nullable=False)  # カテゴリー
+    indicator_code = Column(String(50), nullable=False)  # 指標コード
+    
+    raw_value = Column(Float, nullable=False)  # 元の値
+    normalized_value = Column(Float, nullable=True)  # 正規化値（0-100）
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
 class LivabilityIndicator(Base):
     """住みやすさ指標マスターデータ"""
     __tablename__ = "livability_indicators"
@@ -1,5 +1,5 @@
-from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 
@@ -63,9 +63,56 @@ class LivabilityComparisonResponse(BaseModel):
     percentile: Optional[float] = None
 
 
+class LivabilityRankingRequest(BaseModel):
+    """カスタム重みランキングリクエストモデル"""
+    custom_weights: Dict[str, float] = Field(default_factory=dict, description="カテゴリー別重み（<カテゴリー>_weight）")
+    profile_id: Optional[int] = Field(None, description="保存済み重みプロファイルID（指定時は custom_weights より優先）")
+    prefecture_code: str = "31"
+    year: Optional[int] = None
+    top_k: int = Field(10, ge=1, le=2000, description="取得件数")
+
+
+class LivabilityRankingResponse(BaseModel):
+    """カスタム重みランキングレスポンスモデル"""
+    prefecture_code: str
+    year: Optional[int] = None
+    total_count: int
+    profile_id: Optional[int] = None
+    applied_weights: Dict[str, float]
+    rankings: List[Dict[str, Any]]
+
+
+class LivabilityRankStabilityRequest(BaseModel):
+    """順位安定性分析リクエストモデル"""
+    custom_weights: Dict[str, float] = Field(default_factory=dict, description="基準とするカテゴリー別重み")
+    profile_id: Optional[int] = Field(None, description="基準とする保存済み重みプロファイルID")
+    prefecture_code: str = "31"
+    year: Optional[int] = None
+    municipality_codes: Optional[List[str]] = Field(None, description="比較対象（省略時は都道府県内の全市町村）")
+    n_samples: int = Field(2000, ge=100, le=20000, description="重みの標本数")
+    concentration: float = Field(50.0, gt=0, le=10000, description="Dirichlet分布の集中度")
+    top_k: int = Field(10, ge=1, description="上位何位以内に入る確率を求めるか")
+    include_distribution: bool = Field(False, description="順位分布を含めるか")
+    seed: Optional[int] = None
+
+
+class IndicatorValueChange(BaseModel):
+    """指標値の変更"""
+    municipality_code: str
+    category: str
+    indicator_code: str
+    value: Optional[float] = Field(None, description="新しい値（null で指標を削除）")
+
+
+class IndicatorValuesUpdateRequest(BaseModel):
+    """指標値更新リクエストモデル"""
+    prefecture_code: str = "31"
+    year: int
+    changes: List[IndicatorValueChange] = Field(..., min_items=1, description="変更する指標値")
+
+
 class UserWeightProfile(BaseModel):
-    """ユーザー重み設定モデル"""
-    user_id: int
+    """ユーザー重み設定モデル（所有者は認証ユーザー）"""
     profile_name: Optional[str] = None
     infrastructure_weight: float = 1.0
     healthcare_weight: float = 1.0
@@ -0,0 +1,107 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.services.livability_ranking import LivabilityScoreMatrix, SCORE_CATEGORIES
+
+# 類型ラベル用のカテゴリー表示名
+CATEGORY_NAMES = {
+    "infrastructure": "インフラ",
+    "healthcare": "医療・健康",
+    "education": "教育",
+    "environment": "環境",
+    "economy": "経済・雇用",
+    "community": "コミュニティ",
+    "transport": "交通",
+    "culture": "文化・娯楽"
+}
+
+
+def typology_label(high: list, low: list) -> str:
+    """類型の特徴から表示用ラベルを作成（例: 「環境、コミュニティが高い／交通が低い」）"""
+    parts = []
+    if high:
+        parts.append("、".join(CATEGORY_NAMES[category] for category in high[:2]) + "が高い")
+    if low:
+        parts.append("、".join(CATEGORY_NAMES[category] for category in low[:2]) + "が低い")
+    return "／".join(parts) or "平均的"
+
+
+class LivabilityClusterCache:
+    """全国の市町村類型クラスタのキャッシュ
+
+    全国のスコア行列（LivabilityScoreMatrix）のバージョンが変わったときだけ
+    クラスタリングと描画用のPCA埋め込みを再計算し、APIには計算済みの結果を返す。
+    """
+
+    def __init__(self, predictor, score_matrix: LivabilityScoreMatrix, n_clusters: int = 6):
+        """
+        Args:
+            predictor: LivabilityScorePredictor
+            score_matrix: スコア行列キャッシュ
+            n_clusters: 既定のクラスタ数
+        """
+        self.predictor = predictor
+        self.score_matrix = score_matrix
+        self.n_clusters = n_clusters
+        self._entries: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, year: Optional[int] = None, n_clusters: Optional[int] = None,
+            force: bool = False) -> Dict[str, Any]:
+        """
+        クラスタリング結果を取得（データのバージョンが変わったときだけ再計算）
+
+        Args:
+            db: DBセッション
+            year: 対象年（省略時は最新年）
+            n_clusters: クラスタ数（省略時は既定値）
+            force: バージョン確認の間隔を無視するか
+
+        Returns:
+            year, version, computed_at, codes, labels, embedding, clusters など
+        """
+        n_clusters = n_clusters or self.n_clusters
+        matrix = self.score_matrix.get(db, None, year, force=force)
+        key = (year, n_clusters)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["version"] == matrix["version"]:
+                return entry
+
+            entry = self._compute(matrix, n_clusters)
+            self._entries[key] = entry
+            return entry
+
+    def _compute(self, matrix: Dict[str, Any], n_clusters: int) -> Dict[str, Any]:
+        """スコア行列からクラスタと埋め込みを計算"""
+        result = self.predictor.cluster_municipalities(
+            matrix["scores"], SCORE_CATEGORIES, n_clusters=n_clusters
+        )
+        clusters = []
+        for cluster in result["clusters"]:
+            k = cluster["cluster"]
+            clusters.append({
+                **cluster,
+                "label": typology_label(cluster["high"], cluster["low"]),
+                "center": dict(zip(SCORE_CATEGORIES, result["centers"][k].tolist())),
+                "center_embedding": result["center_embedding"][k].tolist()
+            })
+
+        return {
+            "year": matrix["year"],
+            "version": matrix["version"],
+            "computed_at": datetime.now().isoformat(),
+            "codes": matrix["codes"],
+            "labels": result["labels"],
+            "embedding": result["embedding"],
+            "explained_variance_ratio": result["explained_variance_ratio"].tolist(),
+            "clusters": clusters
+        }
+
+    def invalidate(self) -> None:
+        """キャッシュを破棄"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,401 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.livability import LivabilityScore, LivabilityIndicatorValue
+
+# スコア計算エンジンのカテゴリ → livability_scores のカテゴリー別スコア列
+# total_score はエンジンの全カテゴリスコア × カテゴリ重み の合計で、全カテゴリのスコアは
+# detailed_metrics の category_scores に保存する（列のない safety・housing はここにのみ保存）。
+ENGINE_SCORE_COLUMNS = {
+    "education": "education_score",
+    "healthcare": "healthcare_score",
+    "transportation": "transport_score",
+    "economy": "economy_score",
+    "environment": "environment_score",
+    "culture": "culture_score"
+}
+# 対応するエンジンのカテゴリがない列。total_score に含まれないため、書き込む行では
+# 古い値が新しい total_score と食い違ったまま残らないよう None にする
+UNSCORED_SCORE_COLUMNS = ["infrastructure_score", "community_score"]
+
+
+def indicator_data_from_metrics(metrics: Dict[str, Any], categories: List[str]) -> Dict[str, Dict[str, float]]:
+    """
+    detailed_metrics の JSON から指標の元の値（カテゴリ → 項目 → 値）を取り出す
+
+    LivabilityDeltaUpdater が書き込む indicator_values（カテゴリ → 項目 → 値）を優先し、
+    なければ calculate_livability_score の detailed_breakdown 形式（項目 → {"raw_value": ...}）と、
+    カテゴリ → 項目 → 値 の形式に対応する。category_scores・rank などカテゴリ以外のキーと
+    数値でない値は無視する。
+
+    Args:
+        metrics: livability_scores.detailed_metrics
+        categories: スコア計算エンジンのカテゴリ
+
+    Returns:
+        カテゴリ → 項目 → 値
+    """
+    source = metrics.get("indicator_values") or metrics.get("detailed_breakdown", metrics)
+    data = {}
+    for category in categories:
+        items = source.get(category)
+        if not isinstance(items, dict):
+            continue
+        values = {}
+        for item, value in items.items():
+            if isinstance(value, dict):
+                value = value.get("raw_value")
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and np.isfinite(value):
+                values[item] = float(value)
+        if values:
+            data[category] = values
+    return data
+
+
+def backfill_indicator_values(db: Session, engine, prefecture_code: Optional[str] = None,
+                              year: Optional[int] = None, commit: bool = True) -> Dict[str, int]:
+    """
+    既存の livability_scores.detailed_metrics から livability_indicator_values を作成（一括移行用）
+
+    都道府県・年ごとに指標値を LivabilityDeltaUpdater と同じ方法で正規化して全件同期する
+    （livability_scores は更新しない）。同一市町村・年の重複行は最後に登録された行を使用する。
+
+    Args:
+        db: DBセッション
+        engine: LivabilityScoringEngine
+        prefecture_code: 対象の都道府県コード（省略時は全国）
+        year: 対象年（省略時は全年）
+        commit: 同期後にコミットするか
+
+    Returns:
+        同期した都道府県・年の数、市町村数、追加・更新・削除した行数
+    """
+    query = db.query(
+        LivabilityScore.prefecture_code, LivabilityScore.municipality_code,
+        LivabilityScore.year, LivabilityScore.detailed_metrics
+    ).filter(
+        LivabilityScore.municipality_code.isnot(None),
+        LivabilityScore.detailed_metrics.isnot(None)
+    )
+    if prefecture_code is not None:
+        query = query.filter(LivabilityScore.prefecture_code == prefecture_code)
+    if year is not None:
+        query = query.filter(LivabilityScore.year == year)
+
+    groups: Dict[Tuple[str, int], Dict[str, Dict[str, Dict[str, float]]]] = {}
+    for row in query.order_by(LivabilityScore.id):
+        data = indicator_data_from_metrics(row.detailed_metrics or {}, engine.categories)
+        if data:
+            groups.setdefault((row.prefecture_code, row.year), {})[row.municipality_code] = data
+
+    report = {"groups": len(groups), "municipalities": 0, "inserted": 0, "updated": 0, "deleted": 0}
+    for (group_prefecture, group_year), municipalities_data in groups.items():
+        updater = LivabilityDeltaUpdater(
+            engine, municipalities_data, score_ids={}, prefecture_code=group_prefecture, year=group_year
+        )
+        for key, count in updater.sync_indicator_values(db).items():
+            report[key] += count
+        report["municipalities"] += len(municipalities_data)
+
+    if commit:
+        db.commit()
+    return report
+
+
+class LivabilityDeltaUpdater:
+    """指標の部分変更に対する住みやすさスコアの差分更新
+
+    全市町村のスコア計算結果を保持し、変化した (市町村, 指標) セルについて
+    影響するカテゴリスコア・総合スコア・順位・パーセンタイルだけを再計算して、
+    スコアか順位が変わった行だけを bulk_update_mappings で更新する。
+    順位・パーセンタイルと指標の元の値（indicator_values）は detailed_metrics に保存し、
+    次回は from_stored_metrics でその値から状態を復元する。
+    都道府県・年を指定した場合は指標値（元の値・正規化値）を livability_indicator_values に
+    同期する（全件書き込み時は全指標、差分更新時は変化したセルのみ）。
+    """
+
+    def __init__(self,
+                 engine,
+                 municipalities_data: Dict[str, Dict[str, Dict[str, float]]],
+                 score_ids: Dict[str, int],
+                 detailed_metrics: Optional[Dict[str, Dict[str, Any]]] = None,
+                 prefecture_code: Optional[str] = None,
+                 year: Optional[int] = None):
+        """
+        Args:
+            engine: LivabilityScoringEngine
+            municipalities_data: 市町村コード → カテゴリ → 項目 → 値
+            score_ids: 市町村コード → livability_scores.id
+            detailed_metrics: 市町村コード → 既存の detailed_metrics（更新時に保持する）
+            prefecture_code: 都道府県コード（指標値の同期に使用）
+            year: 対象年（指定時のみ指標値を同期）
+        """
+        self.engine = engine
+        self.score_ids = score_ids
+        self.detailed_metrics = detailed_metrics or {}
+        self.prefecture_code = prefecture_code
+        self.year = year
+        self.state = engine.score_municipalities(municipalities_data)
+
+    @classmethod
+    def from_db(cls, db: Session, engine,
+                municipalities_data: Dict[str, Dict[str, Dict[str, float]]],
+                prefecture_code: str, year: int) -> "LivabilityDeltaUpdater":
+        """既存の livability_scores 行と対応付けて作成"""
+        rows = db.query(
+            LivabilityScore.id, LivabilityScore.municipality_code, LivabilityScore.detailed_metrics
+        ).filter(
+            LivabilityScore.prefecture_code == prefecture_code,
+            LivabilityScore.year == year,
+            LivabilityScore.municipality_code.in_(list(municipalities_data.keys()))
+        ).order_by(LivabilityScore.id).all()
+        
+        return cls(
+            engine,
+            municipalities_data,
+            score_ids={row.municipality_code: row.id for row in rows},
+            detailed_metrics={row.municipality_code: row.detailed_metrics or {} for row in rows},
+            prefecture_code=prefecture_code,
+            year=year
+        )
+
+    @classmethod
+    def from_stored_metrics(cls, db: Session, engine,
+                            prefecture_code: str, year: int) -> "LivabilityDeltaUpdater":
+        """
+        livability_scores の detailed_metrics に保存された指標値から都道府県・年の全市町村分を作成
+        
+        同一市町村・年の重複行は最後に登録された行を使用する。
+        
+        Args:
+            db: DBセッション
+            engine: LivabilityScoringEngine
+            prefecture_code: 都道府県コード
+            year: 対象年
+        
+        Returns:
+            LivabilityDeltaUpdater
+        """
+        rows = db.query(
+            LivabilityScore.id, LivabilityScore.municipality_code, LivabilityScore.detailed_metrics
+        ).filter(
+            LivabilityScore.prefecture_code == prefecture_code,
+            LivabilityScore.year == year,
+            LivabilityScore.municipality_code.isnot(None)
+        ).order_by(LivabilityScore.id).all()
+        if not rows:
+            raise LookupError(f"住みやすさスコアが見つかりません: {prefecture_code}, {year}年")
+        
+        latest = {row.municipality_code: row for row in rows}
+        return cls(
+            engine,
+            {
+                code: indicator_data_from_metrics(row.detailed_metrics or {}, engine.categories)
+                for code, row in latest.items()
+            },
+            score_ids={code: row.id for code, row in latest.items()},
+            detailed_metrics={code: row.detailed_metrics or {} for code, row in latest.items()},
+            prefecture_code=prefecture_code,
+            year=year
+        )
+
+    def score_mappings(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """指定行の bulk_update_mappings 用の辞書（livability_scores に行のない市町村は除く）"""
+        state = self.state
+        n = len(state["municipalities"])
+        mappings = []
+        for row in rows:
+            municipality_code = state["municipalities"][row]
+            if municipality_code not in self.score_ids:
+                continue
+            
+            category_scores = {
+                category: float(state["category_scores"][row, k])
+                for k, category in enumerate(self.engine.categories)
+                if state["category_present"][row, k]
+            }
+            indicator_values = {}
+            for (category, item), value in zip(state["indicators"], state["values"][row]):
+                if not np.isnan(value):
+                    indicator_values.setdefault(category, {})[item] = float(value)
+            position = int(state["positions"][row])
+            metrics = dict(self.detailed_metrics.get(municipality_code, {}))
+            metrics.update({
+                "indicator_values": indicator_values,
+                "category_scores": category_scores,
+                "rank": position,
+                "percentile": (n - (position - 1)) / n * 100
+            })
+            self.detailed_metrics[municipality_code] = metrics
+            
+            mapping = {
+                "id": self.score_ids[municipality_code],
+                "total_score": float(state["total_scores"][row]),
+                "detailed_metrics": metrics
+            }
+            for category, column in ENGINE_SCORE_COLUMNS.items():
+                mapping[column] = category_scores.get(category)
+            for column in UNSCORED_SCORE_COLUMNS:
+                mapping[column] = None
+            mappings.append(mapping)
+        return mappings
+
+    def sync_indicator_values(self, db: Session,
+                              cells: Optional[List[Tuple[int, int]]] = None) -> Dict[str, int]:
+        """
+        指標値を livability_indicator_values に同期
+
+        Args:
+            db: DBセッション
+            cells: 同期する (行, 列) のリスト（None なら全市町村・全指標を同期し、
+                   現在のデータにない指標の行も削除する）
+
+        Returns:
+            追加・更新・削除した行数
+        """
+        if self.year is None:
+            return {"inserted": 0, "updated": 0, "deleted": 0}
+
+        state = self.state
+        full = cells is None
+        if full:
+            n_rows, n_columns = state["values"].shape
+            cells = [(row, column) for row in range(n_rows) for column in range(n_columns)]
+        targets = {
+            (state["municipalities"][row], *state["indicators"][column]): (row, column)
+            for row, column in cells
+        }
+        if not targets:
+            return {"inserted": 0, "updated": 0, "deleted": 0}
+
+        query = db.query(
+            LivabilityIndicatorValue.id,
+            LivabilityIndicatorValue.municipality_code,
+            LivabilityIndicatorValue.category,
+            LivabilityIndicatorValue.indicator_code
+        ).filter(
+            LivabilityIndicatorValue.year == self.year,
+            LivabilityIndicatorValue.municipality_code.in_(sorted({key[0] for key in targets}))
+        )
+        if not full:
+            query = query.filter(LivabilityIndicatorValue.indicator_code.in_(sorted({key[2] for key in targets})))
+        existing = {(row.municipality_code, row.category, row.indicator_code): row.id for row in query}
+
+        inserts, updates, deletes = [], [], []
+        for key, (row, column) in targets.items():
+            raw_value = state["values"][row, column]
+            if np.isnan(raw_value):
+                if key in existing:
+                    deletes.append(existing[key])
+                continue
+            mapping = {
+                "raw_value": float(raw_value),
+                "normalized_value": float(state["normalized"][row, column])
+            }
+            if key in existing:
+                updates.append({"id": existing[key], **mapping})
+            else:
+                inserts.append({
+                    "prefecture_code": self.prefecture_code or key[0][:2],
+                    "municipality_code": key[0],
+                    "year": self.year,
+                    "category": key[1],
+                    "indicator_code": key[2],
+                    **mapping
+                })
+        if full:
+            deletes.extend(existing[key] for key in existing.keys() - targets.keys())
+
+        if inserts:
+            db.bulk_insert_mappings(LivabilityIndicatorValue, inserts)
+        if updates:
+            db.bulk_update_mappings(LivabilityIndicatorValue, updates)
+        if deletes:
+            db.query(LivabilityIndicatorValue).filter(
+                LivabilityIndicatorValue.id.in_(deletes)
+            ).delete(synchronize_session=False)
+        return {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes)}
+
+    def write_all(self, db: Session, commit: bool = True) -> int:
+        """全行を書き込む（初回登録・全件再計算時）"""
+        mappings = self.score_mappings(np.arange(len(self.state["municipalities"])))
+        db.bulk_update_mappings(LivabilityScore, mappings)
+        self.sync_indicator_values(db)
+        if commit:
+            db.commit()
+        return len(mappings)
+
+    def apply(self, db: Session, changes: List[Tuple[str, str, str, Optional[float]]],
+              commit: bool = True) -> Dict[str, Any]:
+        """
+        指標の変更を差分計算し、スコアか順位が変わった行だけを更新
+        
+        Args:
+            db: DBセッション
+            changes: (市町村コード, カテゴリ, 項目, 新しい値) のリスト（値が None なら項目を削除）
+            commit: 更新後にコミットするか
+        
+        Returns:
+            変更セル数・再計算した行数・順位が変わった行数・更新した行数・指標値の同期件数
+        """
+        delta = self.engine.update_scores(self.state, changes)
+        rows = np.union1d(delta["rows"], delta["rank_changed_rows"])
+        
+        # 変化したセル（スコア計算の対象外のカテゴリは除く）
+        row_index = {municipality: row for row, municipality in enumerate(self.state["municipalities"])}
+        column_index = {indicator: column for column, indicator in enumerate(self.state["indicators"])}
+        cells = {
+            (row_index[municipality], column_index[(category, item)])
+            for municipality, category, item, _ in changes
+            if (category, item) in column_index
+        }
+        
+        mappings = self.score_mappings(rows)
+        if mappings:
+            db.bulk_update_mappings(LivabilityScore, mappings)
+        indicator_values = self.sync_indicator_values(db, sorted(cells))
+        if commit and (mappings or any(indicator_values.values())):
+            db.commit()
+        
+        return {
+            "changed_cells": delta["n_cells"],
+            "rescored_rows": len(delta["rows"]),
+            "rescored_categories": [self.engine.categories[k] for k in delta["categories"]],
+            "rank_changed_rows": len(delta["rank_changed_rows"]),
+            "updated_rows": len(mappings),
+            "indicator_values": indicator_values
+        }
+
+
+def main():
+    """
+    既存データの指標値テーブルへの一括移行
+
+    実行方法（リポジトリルートから。アプリケーションと同じく backend も import パスに含める）:
+        PYTHONPATH=backend python -m app.services.livability_delta --prefecture 31
+    """
+    import argparse
+    import json
+
+    from app.db.database import SessionLocal
+    from backend.ml_models.livability_score import LivabilityScorePredictor
+
+    parser = argparse.ArgumentParser(description="detailed_metrics から指標値テーブルを作成")
+    parser.add_argument("--prefecture", default=None, help="都道府県コード（省略時は全国）")
+    parser.add_argument("--year", type=int, default=None, help="対象年（省略時は全年）")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = backfill_indicator_values(
+            db, LivabilityScorePredictor().scoring_engine, prefecture_code=args.prefecture, year=args.year
+        )
+    finally:
+        db.close()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
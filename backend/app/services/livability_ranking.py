@@ -0,0 +1,386 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.livability import LivabilityScore, UserLivabilityWeight
+
+# LivabilityScore のカテゴリー別スコア列（スコア行列の列順）
+SCORE_CATEGORIES = [
+    "infrastructure", "healthcare", "education", "environment",
+    "economy", "community", "transport", "culture"
+]
+
+
+class LivabilityScoreMatrix:
+    """市町村 × カテゴリー のスコア行列キャッシュ
+
+    都道府県・年ごとに livability_scores を (市町村 × 8カテゴリー) の配列として保持し、
+    重みベクトルとの行列積で全市町村のカスタムスコアを一度に計算する。
+    行数・最終作成/更新日時をバージョンとして扱い、変化したときだけ読み直す。
+    バージョン確認も poll_interval 秒に1回に間引く。
+    """
+
+    def __init__(self, poll_interval: float = 60.0):
+        self.poll_interval = poll_interval
+        self._entries: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def table_version(self, db: Session, prefecture_code: Optional[str]) -> str:
+        """都道府県（None なら全国）のスコアデータのバージョン（行数・最終作成日時・最終更新日時）"""
+        query = db.query(
+            func.count(LivabilityScore.id),
+            func.max(LivabilityScore.created_at),
+            func.max(LivabilityScore.updated_at)
+        )
+        if prefecture_code is not None:
+            query = query.filter(LivabilityScore.prefecture_code == prefecture_code)
+        count, last_created, last_updated = query.one()
+        return f"{count}:{last_created}:{last_updated}"
+
+    def get(self, db: Session, prefecture_code: Optional[str], year: Optional[int] = None,
+            force: bool = False) -> Dict[str, Any]:
+        """
+        スコア行列を取得（変更がなければキャッシュを返す）
+
+        Args:
+            db: DBセッション
+            prefecture_code: 都道府県コード（None なら全国）
+            year: 対象年（省略時は最新年）
+            force: 確認間隔を無視してバージョンを確認するか
+
+        Returns:
+            year, version, codes（市町村コード）, scores（市町村 × カテゴリー、欠損は0）,
+            original_totals（登録済みの総合スコア）
+        """
+        key = (prefecture_code, year)
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and not force and now - entry["checked_at"] < self.poll_interval:
+                return entry
+
+            version = self.table_version(db, prefecture_code)
+            if entry is not None and entry["version"] == version:
+                entry["checked_at"] = now
+                return entry
+
+            entry = self._load(db, prefecture_code, year)
+            entry["version"] = version
+            entry["checked_at"] = now
+            self._entries[key] = entry
+            return entry
+
+    def _load(self, db: Session, prefecture_code: Optional[str], year: Optional[int]) -> Dict[str, Any]:
+        """スコアデータを読み込んで配列化"""
+        conditions = [LivabilityScore.municipality_code.isnot(None)]
+        if prefecture_code is not None:
+            conditions.append(LivabilityScore.prefecture_code == prefecture_code)
+
+        if year is None:
+            year = db.query(func.max(LivabilityScore.year)).filter(*conditions).scalar()
+
+        columns = [getattr(LivabilityScore, f"{category}_score") for category in SCORE_CATEGORIES]
+        rows = db.query(
+            LivabilityScore.municipality_code, LivabilityScore.total_score, *columns
+        ).filter(
+            *conditions,
+            LivabilityScore.year == year
+        ).order_by(LivabilityScore.municipality_code, LivabilityScore.id).all()
+
+        # 同一市町村・年の重複行は最後に登録された行を使用
+        latest = {row[0]: row for row in rows}
+        codes = list(latest.keys())
+        scores = np.array(
+            [[value or 0 for value in row[2:]] for row in latest.values()], dtype=float
+        ).reshape(len(codes), len(SCORE_CATEGORIES))
+
+        return {
+            "year": year,
+            "codes": codes,
+            "scores": scores,
+            "original_totals": np.array([row[1] for row in latest.values()], dtype=float)
+        }
+
+    def invalidate(self, prefecture_code: Optional[str] = None) -> None:
+        """キャッシュを破棄（スコア一括更新の直後に使用。都道府県指定時も全国の行列は破棄）"""
+        with self._lock:
+            if prefecture_code is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] in (prefecture_code, None)]:
+                    del self._entries[key]
+
+
+def weight_vector(custom_weights: Dict[str, float]) -> np.ndarray:
+    """
+    カテゴリー重みの辞書を重みベクトルに変換（未指定は1.0）
+
+    Args:
+        custom_weights: "<カテゴリー>_weight" をキーとする重み
+
+    Returns:
+        SCORE_CATEGORIES 順の重みベクトル
+    """
+    weights = np.array(
+        [float(custom_weights.get(f"{category}_weight", 1.0)) for category in SCORE_CATEGORIES]
+    )
+    # NaN は比較が常に偽になるため、有限値であることを先に確認する
+    if not np.all(np.isfinite(weights)) or np.any(weights < 0) or weights.sum() <= 0:
+        raise ValueError("重みは0以上の有限値で、合計が正である必要があります")
+    return weights
+
+
+def rank_top_k(scores: np.ndarray, weights: np.ndarray, top_k: int) -> Dict[str, np.ndarray]:
+    """
+    重み付き平均スコアの上位k件を抽出
+
+    全件のソートは行わず、argpartition で上位k件を選んでからk件だけを並べ替える。
+    順位は同点を同順位とする（1 + 自分より高いスコアの件数）。自分より高いスコアは
+    すべて上位k件に含まれるため、順位も上位k件の中だけで求まる。
+
+    Args:
+        scores: 市町村 × カテゴリー のスコア行列
+        weights: カテゴリー重みベクトル
+        top_k: 抽出件数
+
+    Returns:
+        totals（全市町村の重み付きスコア）, indices（上位k件の行番号、スコア降順）,
+        ranks, percentiles
+    """
+    totals = scores @ (weights / weights.sum())
+    n = len(totals)
+    k = min(top_k, n)
+    if k == 0:
+        empty = np.empty(0, dtype=int)
+        return {"totals": totals, "indices": empty, "ranks": empty, "percentiles": np.empty(0)}
+
+    indices = np.argpartition(-totals, k - 1)[:k]
+    indices = indices[np.lexsort((indices, -totals[indices]))]
+    descending = -totals[indices]
+    ranks = 1 + np.searchsorted(descending, descending, side='left')
+    percentiles = (n - (ranks - 1)) / n * 100
+
+    return {"totals": totals, "indices": indices, "ranks": ranks, "percentiles": percentiles}
+
+
+def rank_stability(scores: np.ndarray,
+                   weights: np.ndarray,
+                   n_samples: int = 2000,
+                   concentration: float = 50.0,
+                   top_k: int = 10,
+                   chunk_size: int = 500,
+                   seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    重みの揺らぎに対する順位の安定性をモンテカルロ法で評価
+
+    重みベクトルを Dirichlet(concentration × 正規化した重み) から標本抽出し、
+    chunk_size 件ごとに1回の行列積で全市町村 × 全標本のスコアを計算する。
+    順位は (市町村 × 順位) の度数表に集計するため、使用メモリは標本数によらず
+    市町村数² + 市町村数 × chunk_size に収まる。
+
+    Args:
+        scores: 市町村 × カテゴリー のスコア行列
+        weights: 基準となるカテゴリー重みベクトル
+        n_samples: 重みの標本数
+        concentration: Dirichlet 分布の集中度（大きいほど基準の重みの近くに集中）
+        top_k: 上位何位以内に入る確率を求めるか
+        chunk_size: 1回の行列積で処理する標本数
+        seed: 乱数シード
+
+    Returns:
+        baseline_ranks（基準の重みでの順位）, rank_distribution（市町村 × 順位 の確率）,
+        mean_ranks, rank_std, rank_p05, rank_median, rank_p95, probability_top_k
+    """
+    rng = np.random.default_rng(seed)
+    n = len(scores)
+    # 重み0のカテゴリーも Dirichlet の定義域に収まるよう下限を設ける
+    alpha = np.maximum(concentration * weights / weights.sum(), 1e-3)
+
+    counts = np.zeros(n * n, dtype=np.int64)
+    offsets = (np.arange(n) * n)[:, None]
+    positions = np.arange(n)[:, None]
+    for start in range(0, n_samples, chunk_size):
+        samples = rng.dirichlet(alpha, size=min(chunk_size, n_samples - start))
+        totals = scores @ samples.T
+        order = np.argsort(-totals, axis=0, kind='stable')
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.broadcast_to(positions, order.shape), axis=0)
+        counts += np.bincount((offsets + ranks).ravel(), minlength=n * n)
+
+    distribution = counts.reshape(n, n) / n_samples
+    rank_values = np.arange(1, n + 1)
+    mean_ranks = distribution @ rank_values
+    rank_std = np.sqrt(np.maximum(distribution @ rank_values ** 2 - mean_ranks ** 2, 0))
+    cumulative = np.cumsum(distribution, axis=1)
+
+    def quantile(q: float) -> np.ndarray:
+        return 1 + np.argmax(cumulative >= q - 1e-12, axis=1)
+
+    baseline = scores @ weights
+    baseline_ranks = np.empty(n, dtype=int)
+    baseline_ranks[np.argsort(-baseline, kind='stable')] = rank_values
+
+    return {
+        "baseline_ranks": baseline_ranks,
+        "rank_distribution": distribution,
+        "mean_ranks": mean_ranks,
+        "rank_std": rank_std,
+        "rank_p05": quantile(0.05),
+        "rank_median": quantile(0.5),
+        "rank_p95": quantile(0.95),
+        "probability_top_k": distribution[:, :min(top_k, n)].sum(axis=1)
+    }
+
+
+def profile_weight_vector(profile) -> np.ndarray:
+    """UserLivabilityWeight のカテゴリー別重みを重みベクトルに変換"""
+    return weight_vector({
+        f"{category}_weight": getattr(profile, f"{category}_weight")
+        for category in SCORE_CATEGORIES
+        if getattr(profile, f"{category}_weight") is not None
+    })
+
+
+class ProfileScoreCache:
+    """保存済み重みプロファイル（UserLivabilityWeight）ごとの重み付きスコアキャッシュ
+
+    プロファイルの重みベクトルと、都道府県・年ごとの全市町村の重み付きスコア・
+    スコア降順の並び・順位・パーセンタイルを保持する。同じプロセスでのプロファイル更新時は
+    invalidate_profile で破棄し、他のワーカーでの更新は poll_interval 秒ごとにプロファイル行を
+    読み直して重みの変化で検知する。スコアデータの更新はスコア行列のバージョン変化で検知する。
+    """
+
+    def __init__(self, score_matrix: LivabilityScoreMatrix, poll_interval: float = 60.0):
+        self.score_matrix = score_matrix
+        self.poll_interval = poll_interval
+        self._profiles: Dict[int, Dict[str, Any]] = {}
+        self._scores: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def profile(self, db: Session, profile_id: int, force: bool = False) -> Dict[str, Any]:
+        """
+        プロファイルの重みベクトルを取得（確認間隔ごとにDBの重みと照合し、変化していれば読み直す）
+
+        Args:
+            db: DBセッション
+            profile_id: プロファイルID
+            force: 確認間隔を無視してDBと照合するか
+
+        Returns:
+            profile_id, user_id, profile_name, weights
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._profiles.get(profile_id)
+        if entry is not None and not force and now - entry["checked_at"] < self.poll_interval:
+            return entry
+
+        profile = db.query(UserLivabilityWeight).filter(UserLivabilityWeight.id == profile_id).first()
+        if profile is None:
+            self.invalidate_profile(profile_id)
+            raise LookupError(f"重みプロファイルが見つかりません: {profile_id}")
+
+        weights = profile_weight_vector(profile)
+        with self._lock:
+            entry = self._profiles.get(profile_id)
+            # 重みが変わっていなければ同じ重みベクトルを使い続ける（計算済みスコアも有効なまま）
+            if entry is not None and entry["profile_name"] == profile.profile_name \
+                    and np.array_equal(entry["weights"], weights):
+                entry["checked_at"] = now
+                return entry
+
+            entry = {
+                "profile_id": profile.id,
+                "user_id": profile.user_id,
+                "profile_name": profile.profile_name,
+                "weights": weights,
+                "checked_at": now
+            }
+            self._profiles[profile_id] = entry
+            return entry
+
+    def scores(self, db: Session, profile_id: int, prefecture_code: str,
+               year: Optional[int] = None) -> Dict[str, Any]:
+        """
+        プロファイルの重み付きスコア（全市町村）を取得
+
+        Args:
+            db: DBセッション
+            profile_id: プロファイルID
+            prefecture_code: 都道府県コード
+            year: 対象年（省略時は最新年）
+
+        Returns:
+            year, matrix（計算元のスコア行列）, codes, totals, order（スコア降順の行番号）,
+            ranks, percentiles
+        """
+        profile = self.profile(db, profile_id)
+        matrix = self.score_matrix.get(db, prefecture_code, year)
+        key = (profile_id, prefecture_code, matrix["year"])
+
+        with self._lock:
+            entry = self._scores.get(key)
+        if entry is not None and entry["matrix_version"] == matrix["version"] \
+                and entry["weights"] is profile["weights"]:
+            return entry
+
+        entry = self._compute(matrix, profile["weights"])
+        with self._lock:
+            self._scores[key] = entry
+        return entry
+
+    def _compute(self, matrix: Dict[str, Any], weights: np.ndarray) -> Dict[str, Any]:
+        """全市町村の重み付きスコアと順位を計算"""
+        totals = matrix["scores"] @ (weights / weights.sum())
+        n = len(totals)
+        order = np.argsort(-totals, kind='stable')
+        descending = -totals[order]
+        # 同点は同順位（1 + 自分より高いスコアの件数）
+        ranks = np.empty(n, dtype=int)
+        ranks[order] = 1 + np.searchsorted(descending, descending, side='left')
+        percentiles = (n - (ranks - 1)) / n * 100 if n else np.empty(0)
+
+        return {
+            "year": matrix["year"],
+            "matrix_version": matrix["version"],
+            "matrix": matrix,
+            "weights": weights,
+            "codes": matrix["codes"],
+            "totals": totals,
+            "order": order,
+            "ranks": ranks,
+            "percentiles": percentiles
+        }
+
+    def precompute(self, db: Session, profile_id: int, prefecture_code: str) -> List[int]:
+        """
+        プロファイルの重み付きスコアを全年分まとめて計算
+
+        Args:
+            db: DBセッション
+            profile_id: プロファイルID
+            prefecture_code: 都道府県コード
+
+        Returns:
+            計算した年のリスト
+        """
+        years = [
+            row[0] for row in db.query(LivabilityScore.year).filter(
+                LivabilityScore.prefecture_code == prefecture_code,
+                LivabilityScore.municipality_code.isnot(None)
+            ).distinct().order_by(LivabilityScore.year).all()
+        ]
+        for year in years:
+            self.scores(db, profile_id, prefecture_code, year)
+        return years
+
+    def invalidate_profile(self, profile_id: int) -> None:
+        """プロファイル更新時にキャッシュを破棄"""
+        with self._lock:
+            self._profiles.pop(profile_id, None)
+            for key in [key for key in self._scores if key[0] == profile_id]:
+                del self._scores[key]
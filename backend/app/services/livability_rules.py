@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.livability import LivabilityIndicator
+
+
+class LivabilityIndicatorRules:
+    """指標マスター（livability_indicators）の正規化ルールキャッシュ
+
+    テーブルの行数・最終作成/更新日時をバージョンとして扱い、
+    変化したときだけ有効な指標を読み直す。バージョン確認自体も
+    poll_interval 秒に1回に間引くため、スコア計算のたびにDBを読むことはない。
+    """
+
+    def __init__(self, poll_interval: float = 60.0):
+        self.poll_interval = poll_interval
+        self.version: Optional[str] = None
+        self.indicators: List[Dict[str, Any]] = []
+        self._last_check = float('-inf')
+        self._lock = threading.Lock()
+
+    def table_version(self, db: Session) -> str:
+        """指標マスターのバージョン（行数・最終作成日時・最終更新日時）"""
+        count, last_created, last_updated = db.query(
+            func.count(LivabilityIndicator.id),
+            func.max(LivabilityIndicator.created_at),
+            func.max(LivabilityIndicator.updated_at)
+        ).one()
+        return f"{count}:{last_created}:{last_updated}"
+
+    def refresh(self, db: Session, force: bool = False) -> bool:
+        """
+        指標マスターが変わっていれば有効な指標を読み直す
+        
+        Args:
+            db: DBセッション
+            force: 確認間隔を無視して確認するか
+        
+        Returns:
+            読み直した場合True
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.poll_interval:
+                return False
+            self._last_check = now
+            
+            version = self.table_version(db)
+            if version == self.version:
+                return False
+            
+            rows = db.query(LivabilityIndicator).filter(
+                LivabilityIndicator.is_active == True
+            ).order_by(LivabilityIndicator.category, LivabilityIndicator.indicator_code).all()
+            
+            self.indicators = [
+                {
+                    "indicator_code": row.indicator_code,
+                    "category": row.category,
+                    "min_value": row.min_value,
+                    "max_value": row.max_value,
+                    "optimal_value": row.optimal_value,
+                    "higher_is_better": row.higher_is_better,
+                    "default_weight": row.default_weight
+                }
+                for row in rows
+            ]
+            self.version = version
+            return True
+
+    def apply(self, db: Session, predictor, force: bool = False) -> bool:
+        """
+        最新の指標マスターを予測器に反映（反映済みのバージョンなら何もしない）
+        
+        Args:
+            db: DBセッション
+            predictor: LivabilityScorePredictor
+            force: 確認間隔を無視して確認するか
+        
+        Returns:
+            予測器のルールを更新した場合True
+        """
+        self.refresh(db, force=force)
+        with self._lock:
+            version, indicators = self.version, self.indicators
+        if version is None or predictor.indicator_rules_version == version:
+            return False
+        predictor.apply_indicator_rules(indicators, version=version)
+        return True
+
+    def invalidate(self) -> None:
+        """次回の refresh で必ずバージョンを確認させる（指標マスター更新直後に使用）"""
+        self._last_check = float('-inf')
@@ -1,14 +1,41 @@
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy import and_, func, desc
-from app.models.livability import LivabilityScore, LivabilityIndicator, UserLivabilityWeight
-from app.schemas.livability import LivabilityScoreResponse, LivabilityIndicatorResponse
+from fastapi.concurrency import run_in_threadpool
+from app.models.livability import LivabilityScore, LivabilityIndicator, LivabilityIndicatorValue, UserLivabilityWeight
+from app.schemas.livability import (
+    LivabilityScoreResponse, LivabilityIndicatorResponse, IndicatorValueChange, UserWeightProfile
+)
+from app.services.livability_ranking import (
+    LivabilityScoreMatrix, ProfileScoreCache, SCORE_CATEGORIES, weight_vector, rank_top_k, rank_stability
+)
+from app.services.livability_clusters import LivabilityClusterCache
+from app.services.livability_delta import LivabilityDeltaUpdater
+from app.services.livability_rules import LivabilityIndicatorRules
+from app.services.livability_similarity import (
+    MunicipalitySimilarityIndex, SIMILARITY_FEATURES, feature_weight_vector
+)
+from backend.ml_models.livability_score import LivabilityScorePredictor
 import json
+import numpy as np
 
 
 class LivabilityService:
     """住みやすさ関連サービス"""
 
+    def __init__(self):
+        # 都道府県・年ごとのスコア行列キャッシュ
+        self.score_matrix = LivabilityScoreMatrix()
+        # 保存済み重みプロファイルごとの重み付きスコアキャッシュ
+        self.profile_scores = ProfileScoreCache(self.score_matrix)
+        # 全国の市町村類型クラスタ（データ更新時のみ再計算）
+        self.clusters = LivabilityClusterCache(LivabilityScorePredictor(), self.score_matrix)
+        # 全国の類似市町村検索インデックス（データ更新時のみ再構築）
+        self.similarity_index = MunicipalitySimilarityIndex(self.score_matrix)
+        # 指標値更新時のスコア再計算（指標マスターのルールを反映したエンジン）
+        self.scoring_model = LivabilityScorePredictor()
+        self.indicator_rules = LivabilityIndicatorRules()
+
     async def get_livability_scores(
         self,
         db: Session,
@@ -48,24 +75,23 @@ class LivabilityService:
     ) -> List[Dict[str, Any]]:
         """複数地域の住みやすさ比較データを取得する"""
         
-        query = db.query(LivabilityScore).filter(
-            LivabilityScore.municipality_code.in_(municipality_codes)
-        )
+        candidates = self._latest_score_rows(db, municipality_codes, year)
         
-        if year:
-            query = query.filter(LivabilityScore.year == year)
-        else:
-            # 最新年のデータを取得
-            latest_year = db.query(func.max(LivabilityScore.year)).scalar()
-            if latest_year:
-                query = query.filter(LivabilityScore.year == latest_year)
+        # 順位・パーセンタイルは対象行の中でSQLのウィンドウ関数で計算（同点は同順位）
+        rank = func.rank().over(order_by=desc(candidates.c.total_score))
+        total = func.count().over()
+        ranked = db.query(
+            candidates.c.id.label("id"),
+            rank.label("rank"),
+            ((total - rank + 1) * 100.0 / total).label("percentile")
+        ).filter(candidates.c.latest == 1).subquery()
         
-        scores = query.all()
+        rows = db.query(LivabilityScore, ranked.c.rank, ranked.c.percentile).join(
+            ranked, LivabilityScore.id == ranked.c.id
+        ).order_by(ranked.c.rank, LivabilityScore.id).all()
         
         result = []
-        sorted_scores = sorted(scores, key=lambda x: x.total_score, reverse=True)
-        
-        for idx, score in enumerate(sorted_scores):
+        for score, score_rank, percentile in rows:
             result.append({
                 "municipality_code": score.municipality_code,
                 "municipality_name": self._get_municipality_name(score.municipality_code),
@@ -80,18 +106,69 @@ class LivabilityService:
                     "transport": score.transport_score,
                     "culture": score.culture_score
                 },
-                "rank": idx + 1,
-                "percentile": (len(sorted_scores) - idx) / len(sorted_scores) * 100
+                "rank": score_rank,
+                "percentile": float(percentile)
             })
         
         return result
 
+    async def get_radar_overlay_data(
+        self,
+        db: Session,
+        municipality_codes: List[str],
+        year: Optional[int] = None,
+        user_weights: Optional[str] = None,
+        profile_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """複数地域を重ねて表示するレーダーチャート用データを取得する"""
+        
+        # 全地域の対象行（市町村ごとの最新年）を1クエリで取得
+        latest = self._latest_score_rows(db, municipality_codes, year)
+        rows = db.query(LivabilityScore).join(
+            latest, LivabilityScore.id == latest.c.id
+        ).filter(latest.c.latest == 1).all()
+        
+        if not rows:
+            raise ValueError("指定された地域・年のデータが見つかりません")
+        
+        # 指定順に並べた 地域 × カテゴリー のスコア行列（0-100スケール）
+        by_code = {row.municipality_code: row for row in rows}
+        found = [code for code in municipality_codes if code in by_code]
+        scores = np.array([
+            [getattr(by_code[code], f"{category}_score") or 0 for category in SCORE_CATEGORIES]
+            for code in found
+        ], dtype=float)
+        
+        # 保存済みプロファイルの重み、またはユーザー重みを全地域にまとめて適用
+        if profile_id is not None:
+            scores = scores * self.profile_scores.profile(db, profile_id)["weights"]
+        elif user_weights:
+            try:
+                weights = json.loads(user_weights)
+                scores = scores * np.array(
+                    [weights.get(f"{category}_weight", 1.0) for category in SCORE_CATEGORIES], dtype=float
+                )
+            except (json.JSONDecodeError, AttributeError):
+                # JSON解析エラーの場合は元のスコアを使用
+                pass
+        
+        return [
+            {
+                "municipality_code": code,
+                "municipality_name": self._get_municipality_name(code),
+                "year": by_code[code].year,
+                "scores": scores[i].tolist()
+            }
+            for i, code in enumerate(found)
+        ]
+
     async def get_radar_chart_data(
         self,
         db: Session,
         municipality_code: str,
         year: Optional[int] = None,
-        user_weights: Optional[str] = None
+        user_weights: Optional[str] = None,
+        profile_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """レーダーチャート用データを取得する"""
         
@@ -126,8 +203,12 @@ class LivabilityService:
             score_data.culture_score or 0
         ]
         
+        # 保存済みプロファイルの重み（キャッシュ済みの重みベクトル）を適用
+        if profile_id is not None:
+            weights = self.profile_scores.profile(db, profile_id)["weights"]
+            scores = (np.array(scores, dtype=float) * weights).tolist()
         # ユーザー重みが指定されている場合は重み付けスコアを計算
-        if user_weights:
+        elif user_weights:
             try:
                 weights = json.loads(user_weights)
                 weighted_scores = []
@@ -235,6 +316,419 @@ class LivabilityService:
             "original_total_score": base_score.total_score
         }
 
+    async def rank_with_custom_weights(
+        self,
+        db: Session,
+        custom_weights: Optional[Dict[str, float]] = None,
+        prefecture_code: str = "31",
+        year: Optional[int] = None,
+        top_k: int = 10,
+        profile_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """カスタム重み（または保存済みプロファイル）で全市町村を再ランキングし、上位k件を返す"""
+        
+        if profile_id is not None:
+            # 保存済みプロファイルは事前計算済みの順位を切り出すだけ
+            cached = self.profile_scores.scores(db, profile_id, prefecture_code, year)
+            matrix, weights, totals = cached["matrix"], cached["weights"], cached["totals"]
+            indices = cached["order"][:top_k]
+            ranks, percentiles = cached["ranks"][indices], cached["percentiles"][indices]
+        else:
+            weights = weight_vector(custom_weights or {})
+            matrix = self.score_matrix.get(db, prefecture_code, year)
+            ranking = rank_top_k(matrix["scores"], weights, top_k)
+            totals, indices = ranking["totals"], ranking["indices"]
+            ranks, percentiles = ranking["ranks"], ranking["percentiles"]
+        
+        rankings = []
+        for row, rank, percentile in zip(indices, ranks, percentiles):
+            municipality_code = matrix["codes"][row]
+            rankings.append({
+                "municipality_code": municipality_code,
+                "municipality_name": self._get_municipality_name(municipality_code),
+                "custom_total_score": float(totals[row]),
+                "original_total_score": float(matrix["original_totals"][row]),
+                "category_scores": dict(zip(SCORE_CATEGORIES, matrix["scores"][row].tolist())),
+                "rank": int(rank),
+                "percentile": float(percentile)
+            })
+        
+        return {
+            "prefecture_code": prefecture_code,
+            "year": matrix["year"],
+            "total_count": len(matrix["codes"]),
+            "profile_id": profile_id,
+            "applied_weights": {
+                f"{category}_weight": float(weight) for category, weight in zip(SCORE_CATEGORIES, weights)
+            },
+            "rankings": rankings
+        }
+
+    async def update_indicator_values(
+        self,
+        db: Session,
+        prefecture_code: str,
+        year: int,
+        changes: List[IndicatorValueChange]
+    ) -> Dict[str, Any]:
+        """指標値の変更を反映し、影響する市町村のスコア・順位だけを再計算して保存する"""
+        
+        self.indicator_rules.apply(db, self.scoring_model)
+        updater = LivabilityDeltaUpdater.from_stored_metrics(
+            db, self.scoring_model.scoring_engine, prefecture_code, year
+        )
+        result = updater.apply(db, [
+            (change.municipality_code, change.category, change.indicator_code, change.value)
+            for change in changes
+        ])
+        
+        # ランキング等のスコア行列をすぐに読み直させる
+        self.score_matrix.invalidate(prefecture_code)
+        
+        return {"prefecture_code": prefecture_code, "year": year, **result}
+
+    async def save_weight_profile(
+        self,
+        db: Session,
+        profile_data: UserWeightProfile,
+        user_id: int,
+        profile_id: Optional[int] = None,
+        prefecture_code: str = "31"
+    ) -> Dict[str, Any]:
+        """重みプロファイルを保存し、全年分の重み付きスコアを事前計算する（更新は所有者のみ）"""
+        
+        values = {**profile_data.dict(), "user_id": user_id}
+        weight_vector({key: value for key, value in values.items() if key.endswith("_weight")})
+        
+        if profile_id is None:
+            profile = UserLivabilityWeight(**values)
+            db.add(profile)
+        else:
+            profile = db.query(UserLivabilityWeight).filter(UserLivabilityWeight.id == profile_id).first()
+            if not profile:
+                raise LookupError(f"重みプロファイルが見つかりません: {profile_id}")
+            if profile.user_id != user_id:
+                raise PermissionError(f"他のユーザーの重みプロファイルは更新できません: {profile_id}")
+            for key, value in values.items():
+                setattr(profile, key, value)
+        db.commit()
+        db.refresh(profile)
+        
+        # 古い重みのスコアを破棄してから再計算
+        self.profile_scores.invalidate_profile(profile.id)
+        years = self.profile_scores.precompute(db, profile.id, prefecture_code)
+        
+        return {
+            "id": profile.id,
+            **{key: getattr(profile, key) for key in values},
+            "precomputed_years": years
+        }
+
+    async def analyze_rank_stability(
+        self,
+        db: Session,
+        custom_weights: Optional[Dict[str, float]] = None,
+        prefecture_code: str = "31",
+        year: Optional[int] = None,
+        municipality_codes: Optional[List[str]] = None,
+        n_samples: int = 2000,
+        concentration: float = 50.0,
+        top_k: int = 10,
+        include_distribution: bool = False,
+        seed: Optional[int] = None,
+        profile_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """重みの揺らぎに対する順位の安定性を分析する（モンテカルロ法）"""
+        
+        if profile_id is not None:
+            weights = self.profile_scores.profile(db, profile_id)["weights"]
+        else:
+            weights = weight_vector(custom_weights or {})
+        matrix = self.score_matrix.get(db, prefecture_code, year)
+        
+        rows = list(range(len(matrix["codes"])))
+        if municipality_codes:
+            code_rows = {code: row for row, code in enumerate(matrix["codes"])}
+            rows = [code_rows[code] for code in municipality_codes if code in code_rows]
+        if not rows:
+            raise ValueError("指定された地域・年のデータが見つかりません")
+        
+        # 標本数に比例して重いためイベントループを塞がないよう別スレッドで計算
+        stability = await run_in_threadpool(
+            rank_stability, matrix["scores"][rows], weights,
+            n_samples=n_samples, concentration=concentration, top_k=top_k, seed=seed
+        )
+        
+        results = []
+        for i in np.argsort(stability["baseline_ranks"]):
+            municipality_code = matrix["codes"][rows[i]]
+            item = {
+                "municipality_code": municipality_code,
+                "municipality_name": self._get_municipality_name(municipality_code),
+                "baseline_rank": int(stability["baseline_ranks"][i]),
+                "mean_rank": float(stability["mean_ranks"][i]),
+                "rank_std": float(stability["rank_std"][i]),
+                "median_rank": int(stability["rank_median"][i]),
+                "rank_interval_90": [int(stability["rank_p05"][i]), int(stability["rank_p95"][i])],
+                "probability_top_k": float(stability["probability_top_k"][i])
+            }
+            if include_distribution:
+                item["rank_distribution"] = stability["rank_distribution"][i].tolist()
+            results.append(item)
+        
+        return {
+            "prefecture_code": prefecture_code,
+            "year": matrix["year"],
+            "total_count": len(rows),
+            "n_samples": n_samples,
+            "concentration": concentration,
+            "top_k": top_k,
+            "applied_weights": {
+                f"{category}_weight": float(weight) for category, weight in zip(SCORE_CATEGORIES, weights)
+            },
+            "municipalities": results
+        }
+
+    async def get_municipality_clusters(
+        self,
+        db: Session,
+        year: Optional[int] = None,
+        n_clusters: Optional[int] = None,
+        prefecture_code: Optional[str] = None,
+        include_embedding: bool = True
+    ) -> Dict[str, Any]:
+        """全国の市町村類型クラスタ（計算済み）を取得する"""
+        
+        # データ更新後の初回のみ再計算が走るためイベントループを塞がないよう別スレッドで取得
+        entry = await run_in_threadpool(self.clusters.get, db, year, n_clusters)
+        if not entry["codes"]:
+            raise ValueError("指定された年のデータが見つかりません")
+        
+        rows = range(len(entry["codes"]))
+        if prefecture_code:
+            rows = [row for row, code in enumerate(entry["codes"]) if code[:2] == prefecture_code]
+        
+        municipalities = []
+        for row in rows:
+            item = {
+                "municipality_code": entry["codes"][row],
+                "cluster": int(entry["labels"][row])
+            }
+            if include_embedding:
+                item["x"] = float(entry["embedding"][row, 0])
+                item["y"] = float(entry["embedding"][row, 1]) if entry["embedding"].shape[1] > 1 else 0.0
+            municipalities.append(item)
+        
+        return {
+            "year": entry["year"],
+            "computed_at": entry["computed_at"],
+            "total_count": len(entry["codes"]),
+            "clusters": entry["clusters"],
+            "explained_variance_ratio": entry["explained_variance_ratio"],
+            "municipalities": municipalities
+        }
+
+    async def find_similar_municipalities(
+        self,
+        db: Session,
+        municipality_code: str,
+        k: int = 10,
+        year: Optional[int] = None,
+        weights: Optional[Dict[str, float]] = None,
+        exclude_same_prefecture: bool = False
+    ) -> Dict[str, Any]:
+        """全国から指定市町村に類似した市町村を検索する（k近傍）"""
+        
+        weight_values = feature_weight_vector(weights)
+        # 再構築はデータ更新後の初回のみのためイベントループを塞がないよう別スレッドで取得
+        entry = await run_in_threadpool(self.similarity_index.get, db, year)
+        result = self.similarity_index.query(
+            entry, municipality_code, k=k, weights=weight_values,
+            exclude_prefecture=municipality_code[:2] if exclude_same_prefecture else None
+        )
+        
+        base_row = entry["rows"][municipality_code]
+        neighbors = []
+        for row, distance in zip(result["rows"], result["distances"]):
+            code = entry["codes"][row]
+            neighbors.append({
+                "municipality_code": code,
+                "municipality_name": self._get_municipality_name(code),
+                "distance": float(distance),
+                "similarity": 1.0 / (1.0 + float(distance)),
+                # 標準化済み特徴量の差（正なら基準の市町村より高い）
+                "feature_differences": dict(zip(
+                    SIMILARITY_FEATURES,
+                    (entry["features"][row] - entry["features"][base_row]).round(3).tolist()
+                ))
+            })
+        
+        return {
+            "municipality_code": municipality_code,
+            "municipality_name": self._get_municipality_name(municipality_code),
+            "year": entry["year"],
+            "features": SIMILARITY_FEATURES,
+            "applied_weights": (
+                {f"{name}_weight": float(w) for name, w in zip(SIMILARITY_FEATURES, weight_values)}
+                if weight_values is not None else None
+            ),
+            "index_built_at": entry["built_at"],
+            "neighbors": neighbors
+        }
+
+    async def get_indicator_ranking(
+        self,
+        db: Session,
+        indicator_code: str,
+        year: Optional[int] = None,
+        prefecture_code: Optional[str] = None,
+        top_k: int = 50
+    ) -> Dict[str, Any]:
+        """指標の正規化値による市町村順位（SQLのウィンドウ関数で計算）"""
+        
+        values = LivabilityIndicatorValue
+        conditions = [values.indicator_code == indicator_code]
+        if prefecture_code:
+            conditions.append(values.prefecture_code == prefecture_code)
+        if year is None:
+            year = db.query(func.max(values.year)).filter(*conditions).scalar()
+        if year is None:
+            raise ValueError(f"指標 {indicator_code} のデータが見つかりません")
+        conditions.append(values.year == year)
+        
+        rank = func.rank().over(order_by=desc(values.normalized_value))
+        total = func.count().over()
+        ranked = db.query(
+            values.municipality_code.label("municipality_code"),
+            values.raw_value.label("raw_value"),
+            values.normalized_value.label("normalized_value"),
+            rank.label("rank"),
+            total.label("total"),
+            ((total - rank + 1) * 100.0 / total).label("percentile")
+        ).filter(*conditions).subquery()
+        rows = db.query(ranked).order_by(ranked.c.rank, ranked.c.municipality_code).limit(top_k).all()
+        
+        return {
+            "indicator_code": indicator_code,
+            "year": year,
+            "total_count": rows[0].total if rows else 0,
+            "rankings": [
+                {
+                    "municipality_code": row.municipality_code,
+                    "municipality_name": self._get_municipality_name(row.municipality_code),
+                    "raw_value": row.raw_value,
+                    "normalized_value": row.normalized_value,
+                    "rank": row.rank,
+                    "percentile": float(row.percentile)
+                }
+                for row in rows
+            ]
+        }
+
+    async def get_indicator_time_series(
+        self,
+        db: Session,
+        indicator_code: str,
+        municipality_codes: List[str],
+        start_year: Optional[int] = None,
+        end_year: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """市町村ごとの指標値の時系列"""
+        
+        values = LivabilityIndicatorValue
+        query = db.query(values.municipality_code, values.year, values.raw_value, values.normalized_value).filter(
+            values.indicator_code == indicator_code,
+            values.municipality_code.in_(municipality_codes)
+        )
+        if start_year:
+            query = query.filter(values.year >= start_year)
+        if end_year:
+            query = query.filter(values.year <= end_year)
+        
+        series = {code: [] for code in municipality_codes}
+        for row in query.order_by(values.municipality_code, values.year):
+            series[row.municipality_code].append({
+                "year": row.year,
+                "raw_value": row.raw_value,
+                "normalized_value": row.normalized_value
+            })
+        
+        return {"indicator_code": indicator_code, "series": series}
+
+    async def get_indicator_correlation(
+        self,
+        db: Session,
+        indicator_codes: List[str],
+        year: Optional[int] = None,
+        prefecture_code: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        指標間の相関係数行列（市町村をサンプルとするピアソン相関）
+        
+        全指標ペアの件数・和・二乗和・積和を自己結合の集約クエリ1回で求め、相関係数に変換する。
+        値は尺度の揃った正規化値（0-100）を使用する。
+        """
+        
+        values = LivabilityIndicatorValue
+        if year is None:
+            year = db.query(func.max(values.year)).filter(values.indicator_code.in_(indicator_codes)).scalar()
+        if year is None:
+            raise ValueError("指定された指標のデータが見つかりません")
+        
+        a = aliased(values)
+        b = aliased(values)
+        conditions = [
+            a.year == year,
+            a.indicator_code.in_(indicator_codes),
+            b.indicator_code.in_(indicator_codes),
+            a.normalized_value.isnot(None),
+            b.normalized_value.isnot(None)
+        ]
+        if prefecture_code:
+            conditions.append(a.prefecture_code == prefecture_code)
+        x, y = a.normalized_value, b.normalized_value
+        rows = db.query(
+            a.indicator_code, b.indicator_code,
+            func.count(), func.sum(x), func.sum(y), func.sum(x * x), func.sum(y * y), func.sum(x * y)
+        ).join(
+            b, and_(a.municipality_code == b.municipality_code, a.year == b.year)
+        ).filter(*conditions).group_by(a.indicator_code, b.indicator_code).all()
+        
+        index = {code: i for i, code in enumerate(indicator_codes)}
+        matrix = np.full((len(indicator_codes), len(indicator_codes)), np.nan)
+        counts = np.zeros((len(indicator_codes), len(indicator_codes)), dtype=int)
+        for code_a, code_b, n, sx, sy, sxx, syy, sxy in rows:
+            i, j = index[code_a], index[code_b]
+            counts[i, j] = n
+            denominator = np.sqrt(max(n * sxx - sx * sx, 0.0) * max(n * syy - sy * sy, 0.0))
+            if n >= 2 and denominator > 0:
+                matrix[i, j] = np.clip((n * sxy - sx * sy) / denominator, -1.0, 1.0)
+        
+        return {
+            "indicator_codes": indicator_codes,
+            "year": year,
+            # 分散0・データ不足のペアは None
+            "correlation": [[None if np.isnan(value) else float(value) for value in row] for row in matrix],
+            "sample_counts": counts.tolist()
+        }
+
+    def _latest_score_rows(self, db: Session, municipality_codes: List[str], year: Optional[int] = None):
+        """市町村ごとの対象行（年指定なしなら最新年）に latest = 1 を付けたサブクエリ"""
+        latest = func.row_number().over(
+            partition_by=LivabilityScore.municipality_code,
+            order_by=(desc(LivabilityScore.year), desc(LivabilityScore.id))
+        )
+        query = db.query(
+            LivabilityScore.id.label("id"),
+            LivabilityScore.total_score.label("total_score"),
+            latest.label("latest")
+        ).filter(
+            LivabilityScore.municipality_code.in_(municipality_codes)
+        )
+        if year:
+            query = query.filter(LivabilityScore.year == year)
+        return query.subquery()
+
     def _get_municipality_name(self, municipality_code: str) -> str:
         """市町村コードから名称を取得する（仮実装）"""
         # 実際の実装では、市町村マスターテーブルから名称を取得
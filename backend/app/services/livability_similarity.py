@@ -0,0 +1,213 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.neighbors import KDTree
+from sqlalchemy import func, desc
+from sqlalchemy.orm import Session
+
+from app.models.population import PopulationData
+from app.services.livability_ranking import LivabilityScoreMatrix, SCORE_CATEGORIES
+
+# 人口構造の特徴量（特徴量ベクトルでは住みやすさのカテゴリー別スコアの後に並べる）
+POPULATION_FEATURES = [
+    "log_population", "aging_rate", "youth_rate", "natural_increase_rate", "net_migration_rate"
+]
+SIMILARITY_FEATURES = SCORE_CATEGORIES + POPULATION_FEATURES
+
+
+def population_features(row) -> List[float]:
+    """人口データ1行から人口構造の特徴量を計算（欠損は NaN）"""
+    total = row.total_population or 0
+    if total <= 0:
+        return [np.nan] * len(POPULATION_FEATURES)
+
+    def rate(value, scale=1.0):
+        return np.nan if value is None else value / total * scale
+
+    return [
+        float(np.log10(total)),
+        rate(row.age_65_plus),
+        rate(row.age_0_14),
+        rate(row.natural_increase, 1000),
+        rate(row.net_migration, 1000)
+    ]
+
+
+def feature_weight_vector(weights: Optional[Dict[str, float]]) -> Optional[np.ndarray]:
+    """
+    特徴量の重みの辞書を重みベクトルに変換（未指定は1.0、重みなしなら None）
+
+    Args:
+        weights: "<特徴量名>_weight" をキーとする重み
+
+    Returns:
+        SIMILARITY_FEATURES 順の重みベクトル
+    """
+    if not weights:
+        return None
+    vector = np.array([float(weights.get(f"{name}_weight", 1.0)) for name in SIMILARITY_FEATURES])
+    if not np.all(np.isfinite(vector)) or np.any(vector < 0) or vector.sum() <= 0:
+        raise ValueError("重みは0以上の有限値で、合計が正である必要があります")
+    return vector
+
+
+class MunicipalitySimilarityIndex:
+    """全国の類似市町村検索インデックス
+
+    住みやすさのカテゴリー別スコアと人口構造の特徴量を標準化したベクトルに KD-tree を構築し、
+    k近傍を返す。スコア行列・人口データのバージョンが変わったときだけ再構築する。
+    特徴量ごとの重みを指定した検索は距離の尺度が変わるため、重みで伸縮した行列に対する
+    全件計算（全国でも数千行）で求める。
+    """
+
+    def __init__(self, score_matrix: LivabilityScoreMatrix, poll_interval: float = 60.0,
+                 leaf_size: int = 30):
+        self.score_matrix = score_matrix
+        self.poll_interval = poll_interval
+        self.leaf_size = leaf_size
+        self._entries: Dict[Optional[int], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def population_version(self, db: Session) -> str:
+        """人口データのバージョン（行数・最終作成日時・最終更新日時）"""
+        count, last_created, last_updated = db.query(
+            func.count(PopulationData.id),
+            func.max(PopulationData.created_at),
+            func.max(PopulationData.updated_at)
+        ).one()
+        return f"{count}:{last_created}:{last_updated}"
+
+    def get(self, db: Session, year: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        インデックスを取得（データのバージョンが変わったときだけ再構築）
+
+        Args:
+            db: DBセッション
+            year: 住みやすさスコアの対象年（省略時は最新年）
+            force: 確認間隔を無視してバージョンを確認するか
+
+        Returns:
+            codes, features（標準化済み）, raw_features, tree, version, built_at
+        """
+        with self._lock:
+            entry = self._entries.get(year)
+            now = time.monotonic()
+            if entry is not None and not force and now - entry["checked_at"] < self.poll_interval:
+                return entry
+
+            matrix = self.score_matrix.get(db, None, year, force=True)
+            version = f"{matrix['version']}|{self.population_version(db)}"
+            if entry is not None and entry["version"] == version:
+                entry["checked_at"] = now
+                return entry
+
+            entry = self._build(db, matrix)
+            entry["version"] = version
+            entry["checked_at"] = now
+            self._entries[year] = entry
+            return entry
+
+    def _load_population(self, db: Session) -> Dict[str, List[float]]:
+        """市町村ごとの最新の人口データ（年次データを優先）から特徴量を計算"""
+        latest = func.row_number().over(
+            partition_by=PopulationData.municipality_code,
+            order_by=(
+                desc(PopulationData.year),
+                desc(func.coalesce(PopulationData.month, 13)),
+                desc(PopulationData.id)
+            )
+        )
+        candidates = db.query(PopulationData.id.label("id"), latest.label("latest")).filter(
+            PopulationData.municipality_code.isnot(None)
+        ).subquery()
+        rows = db.query(PopulationData).join(
+            candidates, PopulationData.id == candidates.c.id
+        ).filter(candidates.c.latest == 1).all()
+        return {row.municipality_code: population_features(row) for row in rows}
+
+    def _build(self, db: Session, matrix: Dict[str, Any]) -> Dict[str, Any]:
+        """特徴量行列を標準化して KD-tree を構築"""
+        codes = matrix["codes"]
+        population = self._load_population(db)
+        missing = [np.nan] * len(POPULATION_FEATURES)
+        raw = np.hstack([
+            matrix["scores"],
+            np.array([population.get(code, missing) for code in codes], dtype=float).reshape(
+                len(codes), len(POPULATION_FEATURES)
+            )
+        ])
+
+        # 標準化（欠損は平均値＝0で補完、分散0の特徴量は尺度1）。人口データがない場合など
+        # 値のない特徴量は平均0・尺度1とし、平均・分散は値のある行だけで計算する
+        observed = ~np.isnan(raw)
+        counts = observed.sum(axis=0)
+        has_values = counts > 0
+        mean = np.divide(np.where(observed, raw, 0.0).sum(axis=0), counts,
+                         out=np.zeros(raw.shape[1]), where=has_values)
+        deviations = np.where(observed, raw - mean, 0.0)
+        std = np.sqrt(np.divide((deviations ** 2).sum(axis=0), counts,
+                                out=np.zeros(raw.shape[1]), where=has_values))
+        features = deviations / np.where(std == 0, 1.0, std)
+
+        return {
+            "year": matrix["year"],
+            "codes": codes,
+            "rows": {code: row for row, code in enumerate(codes)},
+            "features": features,
+            "raw_features": raw,
+            "tree": KDTree(features, leaf_size=self.leaf_size) if len(codes) else None,
+            "built_at": datetime.now().isoformat()
+        }
+
+    def query(self, entry: Dict[str, Any], municipality_code: str, k: int = 10,
+              weights: Optional[np.ndarray] = None,
+              exclude_prefecture: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        類似市町村の k近傍検索
+
+        Args:
+            entry: get() で取得したインデックス
+            municipality_code: 基準の市町村コード
+            k: 取得件数（基準の市町村自身は含まない）
+            weights: 特徴量の重みベクトル（指定時は全件計算）
+            exclude_prefecture: 除外する都道府県コード（同じ県の市町村を除く場合）
+
+        Returns:
+            rows（インデックスの行番号）, distances
+        """
+        if municipality_code not in entry["rows"]:
+            raise ValueError(f"市町村 {municipality_code} のデータが見つかりません")
+        row = entry["rows"][municipality_code]
+        codes = entry["codes"]
+
+        excluded = np.zeros(len(codes), dtype=bool)
+        excluded[row] = True
+        if exclude_prefecture:
+            excluded |= np.array([code[:2] == exclude_prefecture for code in codes], dtype=bool)
+        k = min(k, int((~excluded).sum()))
+        if k <= 0:
+            return {"rows": np.array([], dtype=int), "distances": np.array([])}
+
+        if weights is None:
+            # 除外される行の数だけ多めに取得してから除く
+            distances, rows = entry["tree"].query(
+                entry["features"][row:row + 1], k=k + int(excluded.sum())
+            )
+            distances, rows = distances[0], rows[0]
+            keep = ~excluded[rows]
+            return {"rows": rows[keep][:k], "distances": distances[keep][:k]}
+
+        scaled = entry["features"] * np.sqrt(weights)
+        distances = np.sqrt(((scaled - scaled[row]) ** 2).sum(axis=1))
+        distances[excluded] = np.inf
+        rows = np.argpartition(distances, k - 1)[:k] if k < len(codes) else np.arange(len(codes))
+        rows = rows[np.lexsort((rows, distances[rows]))]
+        return {"rows": rows, "distances": distances[rows]}
+
+    def invalidate(self) -> None:
+        """キャッシュを破棄"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,134 @@
+"""
+経済効果 一括シナリオ評価ベンチマーク
+
+ランダムな政策投資シナリオを N 件生成し、
+「comprehensive_economic_analysis を1シナリオずつ実行」と
+「comprehensive_economic_analysis_batch で一括実行」のスループット（シナリオ/秒）を比較する。
+
+- 産業連関表は既定ではサンプル表（3部門）。--sectors を指定すると
+  その部門数の合成取引基本表を load_io_table で読み込んで計測する
+- LU 分解は計測前に1回実行してキャッシュしておく（どちらの方式も分解済みの表を使う）
+
+実行方法（リポジトリルートから）:
+    python -m backend.benchmarks.economic_scenarios --scenarios 10 100 1000
+    python -m backend.benchmarks.economic_scenarios --sectors 187 --scenarios 1000
+"""
+import argparse
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.ml_models.economic_impact import EconomicImpactPredictor
+
+POLICIES = list(EconomicImpactPredictor.POLICY_SECTOR_ALLOCATION)
+
+
+def _median_seconds(func: Callable, repeats: int) -> float:
+    """関数の所要時間の中央値（秒）"""
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return float(np.median(seconds))
+
+
+def generate_scenarios(n_scenarios: int, seed: int = 0) -> List[Dict[str, float]]:
+    """政策別投資額（億円）のランダムなシナリオ"""
+    rng = np.random.default_rng(seed)
+    scenarios = []
+    for _ in range(n_scenarios):
+        policies = rng.choice(POLICIES, size=rng.integers(1, len(POLICIES) + 1), replace=False)
+        scenarios.append({str(policy): float(rng.uniform(1, 50)) for policy in policies})
+    return scenarios
+
+
+def generate_io_table(n_sectors: int, seed: int = 0) -> pd.DataFrame:
+    """合成の取引基本表（中間取引・県内生産額・雇用者所得・粗付加価値・移輸入など）"""
+    rng = np.random.default_rng(seed)
+    sectors = [f"部門{i:03d}" for i in range(n_sectors)]
+    output = rng.uniform(100, 10000, n_sectors)
+    shares = rng.uniform(0, 1, (n_sectors, n_sectors)) * (rng.uniform(0, 1, (n_sectors, n_sectors)) < 0.2)
+    shares = shares / shares.sum(axis=0).clip(min=1e-9) * rng.uniform(0.3, 0.6, n_sectors)
+    transactions = shares * output
+    
+    table = pd.DataFrame(transactions, index=sectors, columns=sectors)
+    demand = transactions.sum(axis=1) + rng.uniform(0.2, 0.5, n_sectors) * output
+    table["民間消費支出"] = rng.uniform(0, 1, n_sectors) * output * 0.3
+    table["県内需要合計"] = demand
+    table["（控除）移輸入"] = -rng.uniform(0.1, 0.5, n_sectors) * demand
+    table["県内生産額"] = output
+    table.loc["雇用者所得", sectors] = output * rng.uniform(0.2, 0.4, n_sectors)
+    table.loc["粗付加価値部門計", sectors] = output - transactions.sum(axis=0)
+    table.loc["県内生産額", sectors] = output
+    return table
+
+
+def run_benchmark(scenario_counts: List[int] = None, n_sectors: Optional[int] = None,
+                  years_ahead: int = 5, repeats: int = 3, seed: int = 0) -> Dict:
+    """シナリオ数ごとに逐次評価と一括評価のスループットを計測"""
+    logging.getLogger('backend.ml_models').setLevel(logging.WARNING)
+    scenario_counts = scenario_counts or [10, 100, 1000]
+    
+    predictor = EconomicImpactPredictor()
+    if n_sectors:
+        sectors = [f"部門{i:03d}" for i in range(n_sectors)]
+        rng = np.random.default_rng(seed)
+        allocation = {
+            policy: dict(zip(rng.choice(sectors, size=3, replace=False), [0.5, 0.3, 0.2])) for policy in POLICIES
+        }
+        predictor.load_io_table(generate_io_table(n_sectors, seed), policy_sector_allocation=allocation)
+    predictor.io_engine.solve(np.zeros(predictor.io_engine.n_sectors))
+    
+    results = {}
+    for n_scenarios in scenario_counts:
+        scenarios = generate_scenarios(n_scenarios, seed)
+        
+        def sequential() -> None:
+            for scenario in scenarios:
+                predictor.comprehensive_economic_analysis(scenario, years_ahead=years_ahead)
+        
+        sequential_seconds = _median_seconds(sequential, repeats)
+        batch_seconds = _median_seconds(
+            lambda: predictor.comprehensive_economic_analysis_batch(scenarios, years_ahead=years_ahead), repeats
+        )
+        results[str(n_scenarios)] = {
+            'sequential_seconds': sequential_seconds,
+            'batch_seconds': batch_seconds,
+            'sequential_scenarios_per_second': n_scenarios / sequential_seconds,
+            'batch_scenarios_per_second': n_scenarios / batch_seconds,
+            'speedup': sequential_seconds / batch_seconds
+        }
+    
+    return {
+        'config': {
+            'scenario_counts': scenario_counts,
+            'n_sectors': predictor.io_engine.n_sectors,
+            'sparse': predictor.io_engine.is_sparse,
+            'years_ahead': years_ahead,
+            'repeats': repeats,
+            'seed': seed
+        },
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='経済効果 一括シナリオ評価ベンチマーク')
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[10, 100, 1000], help='シナリオ数')
+    parser.add_argument('--sectors', type=int, default=None, help='合成産業連関表の部門数（省略時はサンプル表）')
+    parser.add_argument('--years', type=int, default=5, help='予測期間（年）')
+    parser.add_argument('--repeats', type=int, default=3, help='計測回数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    args = parser.parse_args()
+    
+    report = run_benchmark(args.scenarios, args.sectors, args.years, args.repeats, args.seed)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
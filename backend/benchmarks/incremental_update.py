@@ -0,0 +1,90 @@
+"""
+人口予測モデルの増分更新ベンチマーク
+
+新年度データ到着時の「全量再学習」と「増分更新」の所要時間を比較する。
+
+実行方法（リポジトリルートから）:
+    python -m backend.benchmarks.incremental_update --years 60 --new-years 1
+"""
+import argparse
+import json
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from backend.ml_models.population_forecast import PopulationPredictor
+
+warnings.filterwarnings('ignore')
+
+
+def generate_series(n_years: int, seed: int = 0) -> pd.DataFrame:
+    """減少トレンドの年次人口系列を生成"""
+    rng = np.random.default_rng(seed)
+    population = 600000 - np.arange(n_years) * 1500 + rng.normal(0, 300, n_years).cumsum()
+    return pd.DataFrame({
+        'date': pd.date_range('1950-01-01', periods=n_years, freq='YS'),
+        'population': population
+    })
+
+
+def _arima_series(df: pd.DataFrame) -> pd.Series:
+    return pd.Series(df['population'].values, index=pd.DatetimeIndex(df['date'], freq='YS'))
+
+
+def full_retrain(df: pd.DataFrame) -> float:
+    """全データで特徴量作成・全モデル学習を行う所要時間（秒）"""
+    start = time.perf_counter()
+    predictor = PopulationPredictor(n_jobs=1)
+    X, y = predictor.prepare_features(df)
+    predictor.fit_arima(_arima_series(df), order=(1, 1, 0))
+    predictor.fit_xgboost(X, y)
+    predictor.fit_random_forest(X, y)
+    return time.perf_counter() - start
+
+
+def run_benchmark(n_years: int = 60, new_years: int = 1, repeats: int = 3) -> dict:
+    """全量再学習と増分更新の所要時間を比較"""
+    df = generate_series(n_years + new_years)
+    history, new_rows = df.iloc[:n_years], df.iloc[n_years:]
+
+    full_times = [full_retrain(df) for _ in range(repeats)]
+
+    incremental_times = []
+    breakdown = {}
+    for _ in range(repeats):
+        predictor = PopulationPredictor(n_jobs=1)
+        X, y = predictor.prepare_features(history)
+        predictor.fit_arima(_arima_series(history), order=(1, 1, 0))
+        predictor.fit_xgboost(X, y)
+        predictor.fit_random_forest(X, y)
+
+        start = time.perf_counter()
+        breakdown = predictor.update_models_with_new_data(new_rows)
+        incremental_times.append(time.perf_counter() - start)
+
+    full_median = float(np.median(full_times))
+    incremental_median = float(np.median(incremental_times))
+    return {
+        'n_years': n_years,
+        'new_years': new_years,
+        'full_retrain_seconds': full_median,
+        'incremental_update_seconds': incremental_median,
+        'speedup': full_median / incremental_median if incremental_median > 0 else None,
+        'incremental_breakdown_seconds': {name: result['seconds'] for name, result in breakdown.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='人口予測モデル 増分更新ベンチマーク')
+    parser.add_argument('--years', type=int, default=60, help='学習済み期間（年）')
+    parser.add_argument('--new-years', type=int, default=1, help='追加する期間（年）')
+    parser.add_argument('--repeats', type=int, default=3, help='計測回数')
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.years, args.new_years, args.repeats), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
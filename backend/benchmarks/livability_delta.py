@@ -0,0 +1,140 @@
+"""
+住みやすさスコア差分更新ベンチマーク
+
+一部の (市町村, 指標) が変化したときの「全件再計算 + 全行更新」と
+「差分計算 + 変化した行のみ更新」の所要時間を比較する。
+DB更新はインメモリSQLiteの livability_scores に対する bulk_update_mappings で計測する。
+
+- compute_*: スコア・順位の計算のみ
+- full / delta: 計算 + DB更新（順位は detailed_metrics に保存するため、
+  順位が動いた行も更新対象になる。指標値テーブルは full では全件、delta では変化したセルのみ同期）
+
+実行方法（リポジトリルートから。アプリケーションと同じく backend も import パスに含める）:
+    PYTHONPATH=backend python -m backend.benchmarks.livability_delta --municipalities 1700 --changes 1 10 100
+"""
+import argparse
+import copy
+import json
+import logging
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.livability import LivabilityScore
+from app.services.livability_delta import LivabilityDeltaUpdater
+from backend.benchmarks.livability_engine import generate_municipalities
+from backend.ml_models.livability_score import LivabilityScorePredictor
+
+
+def _median_seconds(func: Callable, repeats: int) -> float:
+    """関数の所要時間の中央値（秒）"""
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return float(np.median(seconds))
+
+
+def _random_changes(predictor: LivabilityScorePredictor, municipalities: List[str],
+                    n_changes: int, rng: np.random.Generator) -> List[tuple]:
+    """ランダムな (市町村, カテゴリ, 項目, 新しい値) の変更"""
+    categories = list(predictor.detailed_indicators)
+    changes = []
+    for _ in range(n_changes):
+        category = categories[rng.integers(len(categories))]
+        items = list(predictor.detailed_indicators[category])
+        changes.append((
+            municipalities[rng.integers(len(municipalities))],
+            category,
+            items[rng.integers(len(items))],
+            float(rng.uniform(0, 100))
+        ))
+    return changes
+
+
+def run_benchmark(n_municipalities: int = 1700, change_counts: List[int] = None,
+                  repeats: int = 5, seed: int = 0) -> Dict:
+    """変更セル数ごとに全件再計算と差分更新の所要時間を計測"""
+    logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+    change_counts = change_counts or [1, 10, 100]
+    rng = np.random.default_rng(seed)
+    
+    predictor = LivabilityScorePredictor()
+    engine = predictor.scoring_engine
+    data = generate_municipalities(predictor, n_municipalities, seed=seed)
+    municipalities = list(data)
+    
+    db_engine = create_engine("sqlite://")
+    Base.metadata.create_all(db_engine)
+    db = sessionmaker(bind=db_engine)()
+    db.add_all([
+        LivabilityScore(prefecture_code="31", municipality_code=code, year=2023, total_score=0)
+        for code in municipalities
+    ])
+    db.commit()
+    
+    results = {}
+    for n_changes in change_counts:
+        updater = LivabilityDeltaUpdater.from_db(db, engine, data, "31", 2023)
+        updater.write_all(db)
+        change_sets = [_random_changes(predictor, municipalities, n_changes, rng) for _ in range(repeats)]
+        
+        def full() -> None:
+            changed = copy.deepcopy(data)
+            for municipality, category, item, value in change_sets[0]:
+                changed[municipality].setdefault(category, {})[item] = value
+            full_updater = LivabilityDeltaUpdater(engine, changed, updater.score_ids, prefecture_code="31", year=2023)
+            full_updater.write_all(db)
+        
+        # スコア計算のみ（DB更新を含まない）
+        state = engine.score_municipalities(data)
+        compute_iter = iter(change_sets)
+        compute_full_seconds = _median_seconds(lambda: engine.score_municipalities(data), repeats)
+        compute_delta_seconds = _median_seconds(lambda: engine.update_scores(state, next(compute_iter)), repeats)
+        
+        reports = []
+        delta_iter = iter(change_sets)
+        full_seconds = _median_seconds(full, repeats)
+        delta_seconds = _median_seconds(lambda: reports.append(updater.apply(db, next(delta_iter))), repeats)
+        
+        results[str(n_changes)] = {
+            'compute_full_seconds': compute_full_seconds,
+            'compute_delta_seconds': compute_delta_seconds,
+            'compute_speedup': compute_full_seconds / compute_delta_seconds,
+            'full_seconds': full_seconds,
+            'delta_seconds': delta_seconds,
+            'speedup': full_seconds / delta_seconds,
+            'updated_rows_median': float(np.median([report['updated_rows'] for report in reports])),
+            'rank_changed_rows_median': float(np.median([report['rank_changed_rows'] for report in reports]))
+        }
+    
+    return {
+        'config': {
+            'n_municipalities': n_municipalities,
+            'change_counts': change_counts,
+            'repeats': repeats,
+            'seed': seed
+        },
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='住みやすさスコア差分更新ベンチマーク')
+    parser.add_argument('--municipalities', type=int, default=1700, help='市町村数')
+    parser.add_argument('--changes', type=int, nargs='+', default=[1, 10, 100], help='変更セル数')
+    parser.add_argument('--repeats', type=int, default=5, help='計測回数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    args = parser.parse_args()
+    
+    report = run_benchmark(args.municipalities, args.changes, args.repeats, args.seed)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+住みやすさスコア一括計算ベンチマーク
+
+市町村ごとに calculate_livability_score を呼ぶ従来のループと、
+LivabilityScoringEngine による行列一括計算の所要時間を比較する。
+
+- loop: 市町村ごとの calculate_livability_score（compare_municipalities の旧実装相当）
+- engine: 入れ子辞書 → 配列変換を含む一括計算
+- engine_matrix: 配列化済みの指標に対するスコア・順位計算のみ
+
+実行方法（リポジトリルートから）:
+    python -m backend.benchmarks.livability_engine --municipalities 1700
+"""
+import argparse
+import json
+import logging
+import time
+from typing import Callable, Dict
+
+import numpy as np
+
+from backend.ml_models.livability_score import LivabilityScorePredictor
+
+
+def generate_municipalities(predictor: LivabilityScorePredictor, n_municipalities: int,
+                            seed: int = 0) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    合成の市町村別指標データを生成
+    
+    正規化ルールのある指標はルールの範囲を少しはみ出す値、
+    ルールのない指標は 0-100 の値とし、一部のカテゴリを欠損させる。
+    """
+    rng = np.random.default_rng(seed)
+    rules = predictor.normalization_rules
+    data = {}
+    for i in range(n_municipalities):
+        indicators = {}
+        for category, items in predictor.detailed_indicators.items():
+            if rng.random() < 0.05:
+                continue
+            values = {}
+            for item in items:
+                if item in rules:
+                    low, high = rules[item]['min'], rules[item]['max']
+                    margin = (high - low) * 0.1
+                    values[item] = float(rng.uniform(low - margin, high + margin))
+                else:
+                    values[item] = float(rng.uniform(0, 100))
+            indicators[category] = values
+        data[f"{i:05d}"] = indicators
+    return data
+
+
+def _median_seconds(func: Callable, repeats: int) -> float:
+    """関数の所要時間の中央値（秒）"""
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return float(np.median(seconds))
+
+
+def run_benchmark(n_municipalities: int = 1700, repeats: int = 5, seed: int = 0) -> Dict:
+    """ループ計算と一括計算の所要時間・結果の一致を計測"""
+    # 市町村ごとの info ログが計測を歪めないよう抑制
+    logging.getLogger('backend.ml_models.livability_score').setLevel(logging.WARNING)
+    
+    predictor = LivabilityScorePredictor()
+    engine = predictor.scoring_engine
+    data = generate_municipalities(predictor, n_municipalities, seed=seed)
+    matrix = engine.build_matrix(data)
+    
+    loop = lambda: {name: predictor.calculate_livability_score(values) for name, values in data.items()}
+    results = {
+        'loop': _median_seconds(loop, repeats),
+        'engine': _median_seconds(lambda: engine.score_municipalities(data), repeats),
+        'engine_matrix': _median_seconds(
+            lambda: engine.score(matrix['values'], matrix['indicators'], matrix['category_present']), repeats
+        )
+    }
+    
+    expected = np.array([result['total_score'] for result in loop().values()])
+    actual = engine.score_municipalities(data)['total_scores']
+    
+    return {
+        'config': {
+            'n_municipalities': n_municipalities,
+            'n_indicators': len(matrix['indicators']),
+            'repeats': repeats,
+            'seed': seed
+        },
+        'seconds': results,
+        'speedup': {
+            'engine': results['loop'] / results['engine'],
+            'engine_matrix': results['loop'] / results['engine_matrix']
+        },
+        'max_abs_difference': float(np.max(np.abs(expected - actual)))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='住みやすさスコア一括計算ベンチマーク')
+    parser.add_argument('--municipalities', type=int, default=1700, help='市町村数')
+    parser.add_argument('--repeats', type=int, default=5, help='計測回数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    args = parser.parse_args()
+    
+    report = run_benchmark(args.municipalities, args.repeats, args.seed)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
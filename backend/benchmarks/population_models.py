@@ -0,0 +1,205 @@
+"""
+人口予測モデル 精度・レイテンシベンチマーク
+
+合成した市町村別年次人口系列で、モデル種別ごとに
+学習時間・予測時間・ピークメモリ・バックテスト誤差を計測し、JSONレポートを出力する。
+
+- 学習期間: 各系列の末尾 horizon 年を除いた期間
+- バックテスト: 除いた期間の合計人口（全系列の和）に対する誤差
+- ARIMA は合計人口系列、機械学習モデルは全系列をまとめて学習・予測する
+- ピークメモリは tracemalloc による Python / numpy 割り当ての計測値
+  （XGBoost など C++ 側の割り当ては含まない）。計測のオーバーヘッドが
+  所要時間に影響しないよう、メモリは時間計測とは別の1回の実行で計測する
+
+実行方法（リポジトリルートから）:
+    python -m backend.benchmarks.population_models --series 19 --years 40 --horizon 5
+    python -m backend.benchmarks.population_models --output population_models.json
+"""
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+import warnings
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import sklearn
+import xgboost
+
+from backend.ml_models.population_forecast import PopulationPredictor
+
+warnings.filterwarnings('ignore')
+
+MODEL_TYPES = ['arima', 'xgboost', 'random_forest', 'ensemble']
+
+
+def generate_panel(n_series: int, n_years: int, seed: int = 0) -> pd.DataFrame:
+    """
+    市町村別の合成人口系列を生成
+
+    規模・減少率の異なる系列に、自然動態の揺らぎ（ランダムウォーク）と
+    一時的な転入超過ショックを加える。
+    """
+    rng = np.random.default_rng(seed)
+    years = np.arange(n_years)
+    frames = []
+    for i in range(n_series):
+        base = rng.lognormal(mean=10.5, sigma=1.0)
+        growth = rng.uniform(-0.02, 0.005)
+        walk = rng.normal(0, 0.002, n_years).cumsum()
+        shock = np.zeros(n_years)
+        shock_year = rng.integers(n_years)
+        shock[shock_year:] = rng.normal(0, 0.01)
+        frames.append(pd.DataFrame({
+            'date': pd.date_range('1960-01-01', periods=n_years, freq='YS'),
+            'municipality_code': f"31{i:03d}",
+            'population': base * np.exp(growth * years + walk + shock)
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _timed(func: Callable) -> Tuple[object, float]:
+    """関数の戻り値と所要時間（秒）"""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _peak_memory(func: Callable) -> int:
+    """関数実行中のピークメモリ（バイト）"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _fit(predictor: PopulationPredictor, model_type: str, train: pd.DataFrame) -> None:
+    """モデル種別ごとの学習（アンサンブルは構成モデルすべて）"""
+    if model_type in ('arima', 'ensemble'):
+        total = train.groupby('date')['population'].sum()
+        predictor.fit_arima(pd.Series(total.values, index=pd.DatetimeIndex(total.index, freq='YS')),
+                            order=(1, 1, 0))
+    if model_type in ('xgboost', 'random_forest', 'ensemble'):
+        X, y = predictor.prepare_features(train)
+        if model_type in ('xgboost', 'ensemble'):
+            predictor.fit_xgboost(X, y)
+        if model_type in ('random_forest', 'ensemble'):
+            predictor.fit_random_forest(X, y)
+
+
+def _predict(predictor: PopulationPredictor, model_type: str, horizon: int) -> np.ndarray:
+    """合計人口の予測（ARIMAの予測期間は月数換算のため先頭 horizon 件を使用）"""
+    if model_type == 'ensemble':
+        result = predictor.ensemble_predict(years_ahead=horizon)
+    else:
+        result = predictor.predict_population(model_type, years_ahead=horizon)
+    return np.asarray(result['forecast'], dtype=float)[:horizon]
+
+
+def benchmark_model(model_type: str, train: pd.DataFrame, actual: np.ndarray,
+                    repeats: int, n_jobs: int, with_intervals: bool) -> Dict:
+    """1モデル種別の計測（所要時間は中央値）"""
+    horizon = len(actual)
+
+    def fitted_predictor() -> PopulationPredictor:
+        predictor = PopulationPredictor(model_dir=os.devnull, n_jobs=n_jobs)
+        _fit(predictor, model_type, train)
+        if not with_intervals:
+            predictor.residuals = {}
+        return predictor
+
+    fit_seconds, predict_seconds = [], []
+    forecast = None
+    for _ in range(repeats):
+        predictor, seconds = _timed(fitted_predictor)
+        fit_seconds.append(seconds)
+        forecast, seconds = _timed(lambda: _predict(predictor, model_type, horizon))
+        predict_seconds.append(seconds)
+
+    fit_peak = _peak_memory(fitted_predictor)
+    predict_peak = _peak_memory(lambda: _predict(predictor, model_type, horizon))
+
+    errors = forecast - actual
+    return {
+        'fit_seconds': float(np.median(fit_seconds)),
+        'predict_seconds': float(np.median(predict_seconds)),
+        'fit_peak_memory_bytes': int(fit_peak),
+        'predict_peak_memory_bytes': int(predict_peak),
+        'backtest': {
+            'mae': float(np.mean(np.abs(errors))),
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'mape': float(np.mean(np.abs(errors) / actual) * 100),
+            'final_year_error_pct': float(errors[-1] / actual[-1] * 100)
+        }
+    }
+
+
+def run_benchmark(n_series: int = 19, n_years: int = 40, horizon: int = 5,
+                  model_types: List[str] = None, repeats: int = 1, n_jobs: int = 1,
+                  with_intervals: bool = False, seed: int = 0) -> Dict:
+    """全モデル種別の精度・レイテンシを計測"""
+    model_types = model_types or MODEL_TYPES
+    panel = generate_panel(n_series, n_years, seed=seed)
+    cutoff = panel['date'].sort_values().unique()[-horizon]
+    train = panel[panel['date'] < cutoff]
+    actual = panel[panel['date'] >= cutoff].groupby('date')['population'].sum().to_numpy()
+
+    results = {
+        model_type: benchmark_model(model_type, train, actual, repeats, n_jobs, with_intervals)
+        for model_type in model_types
+    }
+
+    return {
+        'generated_at': pd.Timestamp.now().isoformat(),
+        'config': {
+            'n_series': n_series,
+            'n_years': n_years,
+            'horizon': horizon,
+            'repeats': repeats,
+            'n_jobs': n_jobs,
+            'with_intervals': with_intervals,
+            'seed': seed
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit-learn': sklearn.__version__,
+            'xgboost': xgboost.__version__,
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='人口予測モデル 精度・レイテンシベンチマーク')
+    parser.add_argument('--series', type=int, default=19, help='系列数（市町村数）')
+    parser.add_argument('--years', type=int, default=40, help='系列の長さ（年）')
+    parser.add_argument('--horizon', type=int, default=5, help='バックテスト期間（年）')
+    parser.add_argument('--models', nargs='+', default=MODEL_TYPES, choices=MODEL_TYPES, help='計測対象')
+    parser.add_argument('--repeats', type=int, default=1, help='計測回数')
+    parser.add_argument('--n-jobs', type=int, default=1, help='交差検証の並列数')
+    parser.add_argument('--with-intervals', action='store_true', help='予測区間の推定を予測時間に含める')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    parser.add_argument('--output', help='レポートの出力先（省略時は標準出力）')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.series, args.years, args.horizon, args.models,
+                           args.repeats, args.n_jobs, args.with_intervals, args.seed)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
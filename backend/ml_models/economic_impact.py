@@ -11,20 +11,57 @@ import xgboost as xgb
 import joblib
 import warnings
 
+from .io_engine import InputOutputEngine
+
 warnings.filterwarnings('ignore')
 logger = logging.getLogger(__name__)
 
 class EconomicImpactPredictor:
     """経済効果予測モデルクラス"""
     
+    # サンプル産業連関表の部門（簡略化された産業分類）
+    SAMPLE_SECTORS = ['agriculture', 'manufacturing', 'services']
+    
+    # 政策と産業の対応関係（政策投資の部門別配分、サンプル表の部門）
+    POLICY_SECTOR_ALLOCATION = {
+        'childcare_support': {'agriculture': 0.1, 'manufacturing': 0.2, 'services': 0.7},       # 子育て支援 → 主にサービス業
+        'migration_support': {'agriculture': 0.05, 'manufacturing': 0.3, 'services': 0.65},     # 移住支援 → 製造業・サービス業
+        'agriculture_support': {'agriculture': 0.8, 'manufacturing': 0.1, 'services': 0.1},     # 農業支援 → 主に農業
+        'manufacturing_support': {'agriculture': 0.1, 'manufacturing': 0.7, 'services': 0.2},   # 製造業支援 → 主に製造業
+        'tourism_promotion': {'agriculture': 0.1, 'manufacturing': 0.1, 'services': 0.8},       # 観光振興 → 主にサービス業
+        'infrastructure': {'agriculture': 0.1, 'manufacturing': 0.6, 'services': 0.3}           # インフラ → 主に製造業
+    }
+    
+    # GDP1億円あたりの雇用創出数（産業連関表に雇用表がない場合に使用、仮定）
+    GDP_EMPLOYMENT_RATIO = 0.8
+    
+    # 基準GDP（鳥取県のGDP約1.8兆円を仮定、億円）と平均年収（万円、仮定）
+    BASE_GDP = 18000
+    AVERAGE_INCOME = 300
+    
+    # 政策別雇用創出効果（投資1億円あたりの雇用創出数）
+    POLICY_EMPLOYMENT_COEFFICIENTS = {
+        'childcare_support': 2.5,      # 保育士等の直接雇用
+        'migration_support': 1.2,      # 移住促進による間接雇用
+        'agriculture_support': 1.8,    # 農業従事者増加
+        'manufacturing_support': 2.0,  # 製造業雇用
+        'tourism_promotion': 2.2,      # 観光業雇用
+        'infrastructure': 1.5          # 建設業雇用
+    }
+    
+    # 税収係数
+    TAX_COEFFICIENTS = {
+        'corporate_tax_rate': 0.23,    # 法人税率
+        'income_tax_rate': 0.10,       # 所得税率（実効）
+        'consumption_tax_rate': 0.08,  # 消費税率（実効）
+        'local_tax_rate': 0.05         # 地方税率
+    }
+    
     def __init__(self, model_dir: str = "backend/data/models"):
         self.model_dir = model_dir
         self.models = {}
         self.scalers = {}
         
-        # 産業連関表データ（簡略化版）
-        self.input_output_matrix = self._create_sample_io_matrix()
-        
         # 経済指標の相関関係
         self.economic_relationships = {
             'population_gdp_elasticity': 0.8,  # 人口とGDPの弾性値
@@ -32,6 +69,61 @@ class EconomicImpactPredictor:
             'investment_multiplier': 1.5,      # 投資乗数
             'consumption_propensity': 0.7      # 消費性向
         }
+        
+        # 産業連関表データ（簡略化版）と波及効果計算エンジン（LU分解をキャッシュ）
+        self.input_output_matrix = self._create_sample_io_matrix()
+        self.io_engine = InputOutputEngine(
+            self.input_output_matrix,
+            self.SAMPLE_SECTORS,
+            compensation_ratios=np.array([0.2, 0.25, 0.35]),  # 雇用者所得率（仮定）
+            employment_coefficients=(1 - self.input_output_matrix.sum(axis=0)) * self.GDP_EMPLOYMENT_RATIO,
+            consumption_propensity=self.economic_relationships['consumption_propensity']
+        )
+        self._set_policy_allocation(self.POLICY_SECTOR_ALLOCATION, default=[0.33, 0.33, 0.34])
+    
+    def load_io_table(self,
+                      source: Union[str, pd.DataFrame],
+                      policy_sector_allocation: Optional[Dict[str, Dict[str, float]]] = None,
+                      employment: Optional[Dict[str, float]] = None,
+                      **read_options) -> None:
+        """
+        都道府県の産業連関表（取引基本表）を読み込んで波及効果計算に使用
+        
+        Args:
+            source: 取引基本表のファイルパス（CSV・Excel）またはデータフレーム
+            policy_sector_allocation: 政策 → 部門 → 配分比率（未指定の政策は全部門に均等配分）
+            employment: 部門別の従業者数（省略時は粗付加価値から GDP_EMPLOYMENT_RATIO で換算）
+            read_options: ファイル読み込み時の引数（sheet_name, encoding など）
+        """
+        try:
+            propensity = self.economic_relationships['consumption_propensity']
+            if isinstance(source, pd.DataFrame):
+                engine = InputOutputEngine.from_table(source, employment=employment, consumption_propensity=propensity)
+            else:
+                engine = InputOutputEngine.load(source, employment=employment, consumption_propensity=propensity, **read_options)
+            if employment is None:
+                engine.employment_coefficients = engine.value_added_ratios * self.GDP_EMPLOYMENT_RATIO
+            
+            self.io_engine = engine
+            coefficients = engine.input_coefficients
+            self.input_output_matrix = coefficients.toarray() if engine.is_sparse else coefficients
+            self._set_policy_allocation(policy_sector_allocation or {})
+            logger.info(f"産業連関表を適用: {engine.n_sectors}部門")
+            
+        except Exception as e:
+            logger.error(f"産業連関表読み込みエラー: {e}")
+            raise
+    
+    def _set_policy_allocation(self, allocation: Dict[str, Dict[str, float]],
+                               default: Optional[List[float]] = None) -> None:
+        """政策別の部門配分ベクトルを設定（default 省略時は全部門に均等配分）"""
+        n_sectors = self.io_engine.n_sectors
+        self.policy_allocation = {
+            policy: self.io_engine.sector_vector(shares) for policy, shares in allocation.items()
+        }
+        self.default_allocation = (
+            np.full(n_sectors, 1.0 / n_sectors) if default is None else np.asarray(default, dtype=float)
+        )
     
     def _create_sample_io_matrix(self) -> np.ndarray:
         """
@@ -55,13 +147,14 @@ class EconomicImpactPredictor:
     
     def calculate_economic_impact(self, 
                                 policy_investment: Dict[str, float],
-                                direct_effects: Dict[str, float]) -> Dict:
+                                direct_effects: Optional[Dict[str, float]] = None) -> Dict:
         """
-        政策投資による経済波及効果計算
+        政策投資による経済波及効果計算（産業連関分析）
         
         Args:
             policy_investment: 政策別投資額（億円）
-            direct_effects: 直接効果（雇用創出等）
+            direct_effects: 直接効果（雇用創出等）。2次波及は産業連関表の雇用者所得から
+                計算するため使用しない（互換性のため受け付ける）
             
         Returns:
             経済波及効果の詳細結果
@@ -69,33 +162,25 @@ class EconomicImpactPredictor:
         try:
             logger.info("経済波及効果計算開始")
             
-            # 1. 直接効果
+            # 投資を産業別の最終需要に配分し、レオンチェフ逆行列で波及効果を計算
             total_investment = sum(policy_investment.values())
-            direct_gdp_impact = total_investment * 0.6  # 投資額の60%がGDPに直接寄与
-            
-            # 2. 1次間接効果（産業連関分析）
-            # 投資を産業別に配分
             industry_investment = self._allocate_investment_by_industry(policy_investment)
+            effects = self.io_engine.compute_effects(industry_investment)
             
-            # 産業連関による1次波及効果
-            primary_effects = np.dot(self.input_output_matrix, industry_investment)
-            primary_gdp_impact = np.sum(primary_effects)
+            # 1. 直接効果（域内で賄われる需要の粗付加価値）
+            direct_gdp_impact = float(effects['direct_value_added'].sum())
             
-            # 3. 2次間接効果（消費増加による効果）
-            # 雇用創出による所得増加
-            employment_increase = direct_effects.get('employment_increase', 0)
-            average_income = 300  # 平均年収300万円（仮定）
-            income_increase = employment_increase * average_income / 10000  # 億円単位
+            # 2. 1次間接効果（原材料等の取引による生産誘発）
+            primary_gdp_impact = float(effects['indirect_value_added'].sum())
             
-            # 消費増加による2次効果
-            secondary_gdp_impact = income_increase * self.economic_relationships['consumption_propensity'] * 1.2
+            # 3. 2次間接効果（雇用者所得の増加による消費の誘発）
+            secondary_gdp_impact = float(effects['induced_value_added'].sum())
             
             # 4. 総合経済効果
             total_gdp_impact = direct_gdp_impact + primary_gdp_impact + secondary_gdp_impact
             
             # 5. 雇用効果計算
-            gdp_employment_ratio = 0.8  # GDP1億円あたり0.8人雇用創出（仮定）
-            total_employment_impact = total_gdp_impact * gdp_employment_ratio
+            total_employment_impact = float(effects['total_employment'].sum())
             
             # 6. 税収効果
             tax_rate = 0.15  # 実効税率15%（仮定）
@@ -110,11 +195,14 @@ class EconomicImpactPredictor:
                 'employment_impact': total_employment_impact,
                 'tax_revenue_impact': tax_revenue_impact,
                 'multiplier_effect': total_gdp_impact / total_investment if total_investment > 0 else 0,
-                'industry_breakdown': {
-                    'agriculture': primary_effects[0],
-                    'manufacturing': primary_effects[1],
-                    'services': primary_effects[2]
-                }
+                'production_effects': {
+                    'direct': float(effects['direct'].sum()),
+                    'indirect': float(effects['indirect'].sum()),
+                    'induced': float(effects['induced'].sum()),
+                    'total': float(effects['total'].sum())
+                },
+                # 部門別の生産誘発額（直接・1次・2次の合計）
+                'industry_breakdown': dict(zip(self.io_engine.sectors, effects['total'].tolist()))
             }
             
             logger.info(f"経済波及効果計算完了: 総効果={total_gdp_impact:.2f}億円")
@@ -134,26 +222,11 @@ class EconomicImpactPredictor:
         Returns:
             産業別投資配分
         """
-        # 政策と産業の対応関係（簡略化）
-        policy_industry_mapping = {
-            'childcare_support': [0.1, 0.2, 0.7],     # 子育て支援 → 主にサービス業
-            'migration_support': [0.05, 0.3, 0.65],   # 移住支援 → 製造業・サービス業
-            'agriculture_support': [0.8, 0.1, 0.1],   # 農業支援 → 主に農業
-            'manufacturing_support': [0.1, 0.7, 0.2], # 製造業支援 → 主に製造業
-            'tourism_promotion': [0.1, 0.1, 0.8],     # 観光振興 → 主にサービス業
-            'infrastructure': [0.1, 0.6, 0.3]         # インフラ → 主に製造業
-        }
-        
-        # 産業別投資額を計算
-        industry_investment = np.zeros(3)  # 3産業
+        # 産業別投資額を計算（配分の定義がない政策はデフォルト配分）
+        industry_investment = np.zeros(self.io_engine.n_sectors)
         
         for policy, amount in policy_investment.items():
-            if policy in policy_industry_mapping:
-                allocation = np.array(policy_industry_mapping[policy])
-                industry_investment += allocation * amount
-            else:
-                # デフォルト配分（均等配分）
-                industry_investment += np.array([0.33, 0.33, 0.34]) * amount
+            industry_investment += self.policy_allocation.get(policy, self.default_allocation) * amount
         
         return industry_investment
     
@@ -177,24 +250,10 @@ class EconomicImpactPredictor:
         try:
             logger.info("GDP影響予測開始")
             
-            # 基準GDP（鳥取県のGDP約1.8兆円を仮定）
-            base_gdp = 18000  # 億円
-            
-            gdp_projections = []
-            
-            for year in range(1, years_ahead + 1):
-                # 人口効果
-                population_effect = base_gdp * population_change * self.economic_relationships['population_gdp_elasticity'] * year
-                
-                # 雇用効果
-                employment_effect = base_gdp * employment_change * self.economic_relationships['employment_gdp_ratio'] * year
-                
-                # 投資効果（逓減効果を考慮）
-                investment_effect = investment_amount * self.economic_relationships['investment_multiplier'] * (0.9 ** (year - 1))
-                
-                # 年間GDP予測
-                annual_gdp = base_gdp + population_effect + employment_effect + investment_effect
-                gdp_projections.append(annual_gdp)
+            base_gdp = self.BASE_GDP
+            gdp_projections = self._gdp_projections(
+                population_change, employment_change, investment_amount, years_ahead
+            ).tolist()
             
             # 累積効果
             cumulative_impact = sum(gdp_projections) - base_gdp * years_ahead
@@ -214,6 +273,25 @@ class EconomicImpactPredictor:
             logger.error(f"GDP影響予測エラー: {e}")
             raise
     
+    def _gdp_projections(self, population_change, employment_change, investment_amount,
+                         years_ahead: int) -> np.ndarray:
+        """
+        年次GDP予測（引数がシナリオ別の配列なら シナリオ数 × 年数 の行列、スカラーなら年数の配列）
+        """
+        years = np.arange(1, years_ahead + 1, dtype=float)
+        population_change = np.asarray(population_change, dtype=float)[..., None]
+        employment_change = np.asarray(employment_change, dtype=float)[..., None]
+        investment_amount = np.asarray(investment_amount, dtype=float)[..., None]
+        
+        # 人口効果・雇用効果（年数に比例）
+        population_effect = self.BASE_GDP * population_change * self.economic_relationships['population_gdp_elasticity'] * years
+        employment_effect = self.BASE_GDP * employment_change * self.economic_relationships['employment_gdp_ratio'] * years
+        
+        # 投資効果（逓減効果を考慮）
+        investment_effect = investment_amount * self.economic_relationships['investment_multiplier'] * (0.9 ** (years - 1))
+        
+        return self.BASE_GDP + population_effect + employment_effect + investment_effect
+    
     def predict_employment_impact(self, 
                                  policy_scenario: Dict[str, float],
                                  years_ahead: int = 5) -> Dict:
@@ -230,29 +308,11 @@ class EconomicImpactPredictor:
         try:
             logger.info("雇用創出効果予測開始")
             
-            # 政策別雇用創出効果（投資1億円あたりの雇用創出数）
-            employment_coefficients = {
-                'childcare_support': 2.5,      # 保育士等の直接雇用
-                'migration_support': 1.2,      # 移住促進による間接雇用
-                'agriculture_support': 1.8,    # 農業従事者増加
-                'manufacturing_support': 2.0,  # 製造業雇用
-                'tourism_promotion': 2.2,      # 観光業雇用
-                'infrastructure': 1.5          # 建設業雇用
-            }
-            
-            employment_projections = []
-            
-            for year in range(1, years_ahead + 1):
-                annual_employment = 0
-                
-                for policy, investment in policy_scenario.items():
-                    if policy in employment_coefficients:
-                        coeff = employment_coefficients[policy]
-                        # 時間経過による効果の変化を考慮
-                        time_factor = min(1.0, year * 0.3)  # 3年で最大効果
-                        annual_employment += investment * coeff * time_factor
-                
-                employment_projections.append(annual_employment)
+            full_effect = sum(
+                investment * self.POLICY_EMPLOYMENT_COEFFICIENTS.get(policy, 0.0)
+                for policy, investment in policy_scenario.items()
+            )
+            employment_projections = self._employment_projections(full_effect, years_ahead).tolist()
             
             # 産業別内訳
             industry_breakdown = self._calculate_employment_by_industry(policy_scenario)
@@ -271,6 +331,15 @@ class EconomicImpactPredictor:
             logger.error(f"雇用創出効果予測エラー: {e}")
             raise
     
+    def _employment_projections(self, full_effect, years_ahead: int) -> np.ndarray:
+        """
+        年次雇用創出数（full_effect は効果が最大になったときの年間雇用創出数。
+        シナリオ別の配列なら シナリオ数 × 年数 の行列）
+        """
+        # 時間経過による効果の変化を考慮（3年で最大効果）
+        time_factor = np.minimum(1.0, np.arange(1, years_ahead + 1) * 0.3)
+        return np.asarray(full_effect, dtype=float)[..., None] * time_factor
+    
     def _calculate_employment_by_industry(self, policy_scenario: Dict[str, float]) -> Dict:
         """産業別雇用効果計算"""
         industry_employment = {
@@ -312,42 +381,14 @@ class EconomicImpactPredictor:
         try:
             logger.info("税収影響予測開始")
             
-            # 税収係数
-            tax_coefficients = {
-                'corporate_tax_rate': 0.23,    # 法人税率
-                'income_tax_rate': 0.10,       # 所得税率（実効）
-                'consumption_tax_rate': 0.08,  # 消費税率（実効）
-                'local_tax_rate': 0.05         # 地方税率
-            }
-            
-            annual_tax_revenue = []
-            
-            for year in range(1, years_ahead + 1):
-                # 法人税収増（GDP増加による）
-                corporate_tax = gdp_impact * tax_coefficients['corporate_tax_rate'] * 0.3  # 30%が企業利益
-                
-                # 所得税収増（雇用増加による）
-                average_income = 300  # 万円
-                income_tax = employment_impact * average_income * tax_coefficients['income_tax_rate'] / 10000  # 億円
-                
-                # 消費税収増
-                consumption_tax = gdp_impact * tax_coefficients['consumption_tax_rate'] * 0.6  # 60%が消費
-                
-                # 地方税収増
-                local_tax = gdp_impact * tax_coefficients['local_tax_rate']
-                
-                total_annual_tax = corporate_tax + income_tax + consumption_tax + local_tax
-                annual_tax_revenue.append(total_annual_tax)
+            # 年間の税収増（毎年同額）
+            tax_breakdown = self._annual_tax_components(gdp_impact, employment_impact)
+            annual_tax_revenue = [sum(tax_breakdown.values())] * years_ahead
             
             result = {
                 'annual_tax_revenue': annual_tax_revenue,
                 'total_tax_revenue': sum(annual_tax_revenue),
-                'tax_breakdown': {
-                    'corporate_tax': corporate_tax,
-                    'income_tax': income_tax,
-                    'consumption_tax': consumption_tax,
-                    'local_tax': local_tax
-                },
+                'tax_breakdown': tax_breakdown,
                 'years': list(range(1, years_ahead + 1))
             }
             
@@ -358,6 +399,19 @@ class EconomicImpactPredictor:
             logger.error(f"税収影響予測エラー: {e}")
             raise
     
+    def _annual_tax_components(self, gdp_impact, employment_impact) -> Dict:
+        """税目別の年間税収増（億円、引数はスカラーまたはシナリオ別の配列）"""
+        return {
+            # 法人税収増（GDP増加による、30%が企業利益）
+            'corporate_tax': gdp_impact * self.TAX_COEFFICIENTS['corporate_tax_rate'] * 0.3,
+            # 所得税収増（雇用増加による）
+            'income_tax': employment_impact * self.AVERAGE_INCOME * self.TAX_COEFFICIENTS['income_tax_rate'] / 10000,
+            # 消費税収増（60%が消費）
+            'consumption_tax': gdp_impact * self.TAX_COEFFICIENTS['consumption_tax_rate'] * 0.6,
+            # 地方税収増
+            'local_tax': gdp_impact * self.TAX_COEFFICIENTS['local_tax_rate']
+        }
+    
     def comprehensive_economic_analysis(self, 
                                       policy_scenario: Dict[str, float],
                                       population_change: float = 0,
@@ -424,6 +478,115 @@ class EconomicImpactPredictor:
             logger.error(f"包括的経済分析エラー: {e}")
             raise
     
+    def comprehensive_economic_analysis_batch(self,
+                                              policy_scenarios: List[Dict[str, float]],
+                                              population_change: Union[float, List[float]] = 0,
+                                              years_ahead: int = 5) -> Dict:
+        """
+        複数政策シナリオの一括経済分析
+        
+        N シナリオの投資を（部門 × N）の最終需要行列にまとめてキャッシュ済みの LU 分解で1回で解き、
+        年次の GDP・雇用・税収予測も（N × 年数）の行列として計算する。
+        各シナリオの結果は comprehensive_economic_analysis と同じ値になる。
+        
+        Args:
+            policy_scenarios: 政策シナリオ（政策別投資額）のリスト
+            population_change: 人口変化率（全シナリオ共通またはシナリオ別）
+            years_ahead: 予測期間
+            
+        Returns:
+            列指向の一括分析結果（シナリオ別の値は長さ N の配列、年次予測は N × 年数 の行列、
+            industry_breakdown は N × 部門 の行列）
+        """
+        try:
+            logger.info(f"一括経済分析開始: {len(policy_scenarios)}シナリオ")
+            
+            if not policy_scenarios:
+                raise ValueError("シナリオが指定されていません")
+            n_scenarios = len(policy_scenarios)
+            
+            # (シナリオ数 × 政策数) の投資額行列と (政策数 × 部門数) の配分行列
+            policies = list(dict.fromkeys(policy for scenario in policy_scenarios for policy in scenario))
+            investments = np.array(
+                [[scenario.get(policy, 0.0) for policy in policies] for scenario in policy_scenarios],
+                dtype=float
+            ).reshape(n_scenarios, len(policies))
+            allocation = np.array(
+                [self.policy_allocation.get(policy, self.default_allocation) for policy in policies]
+            ).reshape(len(policies), self.io_engine.n_sectors)
+            total_investment = investments.sum(axis=1)
+            
+            # 1. 経済波及効果（全シナリオを1回の求解で計算）
+            effects = self.io_engine.compute_effects((investments @ allocation).T)
+            direct_gdp_impact = effects['direct_value_added'].sum(axis=0)
+            primary_gdp_impact = effects['indirect_value_added'].sum(axis=0)
+            secondary_gdp_impact = effects['induced_value_added'].sum(axis=0)
+            total_gdp_impact = direct_gdp_impact + primary_gdp_impact + secondary_gdp_impact
+            employment_impact = effects['total_employment'].sum(axis=0)
+            has_investment = total_investment > 0
+            multiplier_effect = np.divide(
+                total_gdp_impact, total_investment, out=np.zeros(n_scenarios), where=has_investment
+            )
+            
+            # 2. GDP影響予測
+            population_change = np.broadcast_to(np.asarray(population_change, dtype=float), (n_scenarios,))
+            employment_change = employment_impact / 300000 * 100
+            gdp_projections = self._gdp_projections(
+                population_change, employment_change, total_investment, years_ahead
+            )
+            cumulative_impact = gdp_projections.sum(axis=1) - self.BASE_GDP * years_ahead
+            
+            # 3. 雇用影響予測
+            employment_coefficients = np.array(
+                [self.POLICY_EMPLOYMENT_COEFFICIENTS.get(policy, 0.0) for policy in policies]
+            )
+            employment_projections = self._employment_projections(investments @ employment_coefficients, years_ahead)
+            
+            # 4. 税収影響予測（毎年同額）
+            annual_tax = sum(self._annual_tax_components(total_gdp_impact, employment_impact).values())
+            annual_tax_revenue = np.repeat(annual_tax[:, None], years_ahead, axis=1)
+            total_tax_revenue = annual_tax_revenue.sum(axis=1)
+            
+            # 5. ROI・回収期間（投資なしは ROI 0、税収増なしは回収期間 inf）
+            roi = np.divide(
+                cumulative_impact + total_tax_revenue - total_investment, total_investment,
+                out=np.zeros(n_scenarios), where=has_investment
+            ) * 100
+            payback_period = np.full(n_scenarios, np.inf)
+            has_tax = total_tax_revenue > 0
+            payback_period[has_tax] = total_investment[has_tax] / (total_tax_revenue[has_tax] / years_ahead)
+            
+            result = {
+                'policies': policies,
+                'sectors': list(self.io_engine.sectors),
+                'years': list(range(1, years_ahead + 1)),
+                'investments': investments,
+                'total_investment': total_investment,
+                'direct_gdp_impact': direct_gdp_impact,
+                'primary_gdp_impact': primary_gdp_impact,
+                'secondary_gdp_impact': secondary_gdp_impact,
+                'total_gdp_impact': total_gdp_impact,
+                'employment_impact': employment_impact,
+                'tax_revenue_impact': total_gdp_impact * 0.15,
+                'multiplier_effect': multiplier_effect,
+                'industry_breakdown': effects['total'].T,
+                'gdp_projections': gdp_projections,
+                'gdp_cumulative_impact': cumulative_impact,
+                'employment_projections': employment_projections,
+                'total_employment_creation': employment_projections.sum(axis=1),
+                'annual_tax_revenue': annual_tax_revenue,
+                'total_tax_revenue': total_tax_revenue,
+                'roi_percent': roi,
+                'payback_period': payback_period
+            }
+            
+            logger.info(f"一括経済分析完了: {n_scenarios}シナリオ × {years_ahead}年")
+            return result
+            
+        except Exception as e:
+            logger.error(f"一括経済分析エラー: {e}")
+            raise
+    
     def save_models(self) -> None:
         """モデル保存"""
         try:
@@ -0,0 +1,369 @@
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class PopulationFeatureStore:
+    """人口予測用特徴量ストア
+    
+    全系列（市町村等）の特徴量を系列・日付順に並べた1本の列としてまとめて計算し、
+    系列の境界をまたぐラグ・移動窓の値はマスクで無効化する。
+    結果はデータバージョンをキーに保持し、各系列の末尾に行が追加された場合は
+    ラグ・移動窓が参照する過去行と追加行のみを再計算する。
+    
+    features / target / source は同じ行順（系列 → 日付）で対応する。
+    """
+    
+    SERIES_KEY = "__series__"
+    
+    def __init__(self,
+                 target_column: str = 'population',
+                 date_column: str = 'date',
+                 series_column: str = 'municipality_code',
+                 lags: Sequence[int] = (1, 2, 3, 5),
+                 windows: Sequence[int] = (3, 5, 10)):
+        self.target_column = target_column
+        self.date_column = date_column
+        self.series_column = series_column
+        self.lags = list(lags)
+        self.windows = list(windows)
+        # 末尾再計算・再帰予測時に参照する過去行数
+        self.lookback = max(self.lags + [window + 1 for window in self.windows] + [2])
+        
+        self.source = None  # 系列キー付きの入力データ（系列・日付順）
+        self.features = None
+        self.target = None
+        self.feature_columns = []
+        self.data_version = None
+    
+    def get_features(self, df: pd.DataFrame,
+                     data_version: Optional[str] = None) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        特徴量を取得（同一データはキャッシュ、末尾追加のみなら差分計算）
+        
+        Args:
+            df: 入力データフレーム（系列列を含まない場合は単一系列として扱う）
+            data_version: データバージョン（省略時は内容ハッシュ）
+        
+        Returns:
+            特徴量データフレームと目的変数シリーズ（系列・日付順）
+        """
+        source = self._sorted(df)
+        version = data_version or self._hash_frame(source)
+        
+        if self.features is not None and version == self.data_version:
+            logger.info(f"特徴量キャッシュ使用: {version[:16]}")
+            return self.features, self.target
+        
+        new_rows = self._appended_rows(source)
+        if new_rows is not None:
+            return self.append(new_rows, data_version=version)
+        
+        X, y = self._compute(source)
+        self._store(source, X, y, version)
+        logger.info(f"特徴量全量計算完了: {len(X)}行, {source[self.SERIES_KEY].nunique()}系列")
+        return X, y
+    
+    def append(self, new_rows: pd.DataFrame,
+               data_version: Optional[str] = None) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        追加行の特徴量のみを計算してキャッシュに追加
+        
+        Args:
+            new_rows: 各系列の既存行より後の日付の追加行
+            data_version: 追加後のデータバージョン（省略時は内容ハッシュ）
+        
+        Returns:
+            全期間の特徴量データフレームと目的変数シリーズ
+        """
+        if self.source is None:
+            raise ValueError("特徴量キャッシュがありません。先に get_features を実行してください")
+        
+        new_rows = self._with_series_key(new_rows)
+        
+        # 追加行のある系列について、直近 lookback 行 + 追加行だけを再計算対象にする
+        affected = self.source[self.SERIES_KEY].isin(new_rows[self.SERIES_KEY].unique())
+        context = self.source[affected].groupby(self.SERIES_KEY, sort=False).tail(self.lookback)
+        
+        combined = pd.concat([context, new_rows], ignore_index=True)
+        is_new = np.r_[np.zeros(len(context), dtype=bool), np.ones(len(new_rows), dtype=bool)]
+        order = np.lexsort(self._sort_keys(combined))
+        subset = combined.iloc[order].reset_index(drop=True)
+        is_new = is_new[order]
+        
+        # 系列内の通し位置 = 既存行数 - 文脈行数 + 部分集合内の位置
+        cached_counts = self.source[self.SERIES_KEY].value_counts()
+        context_counts = context[self.SERIES_KEY].value_counts()
+        offsets = cached_counts.sub(context_counts, fill_value=0)
+        X_subset, y_subset = self._compute(subset, position_offsets=offsets)
+        
+        # 末尾で計算できない値（短い系列など）は既存の最終行から前方補完
+        last_rows = self.features.groupby(self.source[self.SERIES_KEY].to_numpy(), sort=False).tail(1)
+        last_keys = self.source.loc[last_rows.index, self.SERIES_KEY]
+        tail_keys = subset.loc[is_new, self.SERIES_KEY]
+        X_tail = pd.concat([last_rows, X_subset[is_new]], ignore_index=True)
+        X_tail = X_tail.groupby(np.r_[last_keys.to_numpy(), tail_keys.to_numpy()], sort=False).ffill()
+        X_tail = X_tail.iloc[len(last_rows):]
+        
+        # 既存行と追加行を系列・日付順に並べ直す
+        source = pd.concat([self.source, subset[is_new]], ignore_index=True)
+        order = np.lexsort(self._sort_keys(source))
+        source = source.iloc[order].reset_index(drop=True)
+        X = pd.concat([self.features, X_tail], ignore_index=True).iloc[order].reset_index(drop=True)
+        y = pd.concat([self.target, y_subset[is_new]], ignore_index=True).iloc[order].reset_index(drop=True)
+        
+        # 短い系列で既存行に欠損が残っている場合のみ、追加行の値で後方補完し直す
+        keys = source[self.SERIES_KEY]
+        refill = keys.isin(tail_keys.unique()) & keys.isin(keys[X.isna().any(axis=1)].unique())
+        if refill.any():
+            X.loc[refill] = X[refill].groupby(keys[refill].to_numpy(), sort=False).bfill()
+        
+        self._store(source, X, y, data_version or self._hash_frame(source))
+        logger.info(f"特徴量末尾更新完了: {int(is_new.sum())}行追加")
+        return X, y
+    
+    def recursive_forecast(self, predict: Callable[[pd.DataFrame], np.ndarray],
+                           horizon: int, freq: Optional[str] = None) -> Dict[str, Any]:
+        """
+        全系列の再帰的多段予測
+        
+        系列 × (lookback + horizon) の値バッファと 系列 × 特徴量数 の特徴量バッファを
+        事前確保し、各ステップで全系列の特徴量をバッファ上で更新して predict を1回だけ呼ぶ。
+        予測値はバッファに書き戻され、次ステップのラグ・移動窓に使われる。
+        
+        Args:
+            predict: 特徴量データフレーム → 予測値 の関数（学習済みモデルの predict）
+            horizon: 予測ステップ数
+            freq: 日付の間隔（省略時は履歴から推定し、推定できなければ年次）
+        
+        Returns:
+            series（系列キー）, dates（系列 × horizon）, forecast（系列 × horizon）
+        """
+        if self.features is None:
+            raise ValueError("特徴量キャッシュがありません。先に get_features を実行してください")
+        
+        keys = self.source[self.SERIES_KEY]
+        counts = keys.groupby(keys, sort=False).size()
+        series = counts.index.tolist()
+        n_series, n_features = len(series), len(self.feature_columns)
+        lookback = self.lookback
+        column = {name: i for i, name in enumerate(self.feature_columns)}
+        
+        # 値バッファ: 各系列の直近 lookback 件を右詰めで配置（短い系列は左側が欠損）
+        values = np.full((n_series, lookback + horizon), np.nan)
+        history = self.source.groupby(self.SERIES_KEY, sort=False).tail(lookback)
+        history_keys = history[self.SERIES_KEY]
+        row = history_keys.map(pd.Series(np.arange(n_series), index=series)).to_numpy()
+        history_counts = history_keys.map(history_keys.value_counts()).to_numpy()
+        offset = history_keys.groupby(history_keys, sort=False).cumcount().to_numpy()
+        values[row, lookback - history_counts + offset] = history[self.target_column].to_numpy(dtype=float)
+        
+        # 計算できない特徴量・外生変数は各系列の最終観測行の値を引き継ぐ
+        last_features = self.features.groupby(keys.to_numpy(), sort=False).tail(1).to_numpy(dtype=float)
+        step_features = np.empty((n_series, n_features))
+        n_observed = counts.to_numpy()
+        
+        dates = self._future_dates(series, horizon, freq)
+        target = self.target_column
+        
+        for step in range(horizon):
+            position = lookback + step
+            step_features[:] = np.nan
+            
+            for lag in self.lags:
+                step_features[:, column[f'{target}_lag_{lag}']] = values[:, position - lag]
+            
+            for window in self.windows:
+                window_values = values[:, position - window:position]
+                step_features[:, column[f'{target}_ma_{window}']] = window_values.mean(axis=1)
+                step_features[:, column[f'{target}_std_{window}']] = window_values.std(axis=1, ddof=1)
+            
+            previous, before_previous = values[:, position - 1], values[:, position - 2]
+            step_features[:, column[f'{target}_pct_change']] = previous / before_previous - 1
+            step_features[:, column[f'{target}_diff']] = previous - before_previous
+            
+            trend = n_observed + step
+            step_features[:, column['trend']] = trend
+            step_features[:, column['trend_squared']] = trend ** 2
+            
+            if dates is not None and 'year' in column:
+                step_dates = pd.DatetimeIndex(dates[:, step])
+                step_features[:, column['year']] = step_dates.year
+                step_features[:, column['month']] = step_dates.month
+                step_features[:, column['quarter']] = step_dates.quarter
+            
+            np.copyto(step_features, last_features, where=np.isnan(step_features))
+            values[:, position] = predict(pd.DataFrame(step_features, columns=self.feature_columns))
+        
+        return {
+            'series': series,
+            'dates': dates,
+            'forecast': values[:, lookback:]
+        }
+    
+    def _future_dates(self, series: List[Any], horizon: int,
+                      freq: Optional[str] = None) -> Optional[np.ndarray]:
+        """各系列の最終日以降の予測日付（系列 × horizon）"""
+        if self.date_column not in self.source.columns:
+            return None
+        
+        dates = pd.to_datetime(self.source[self.date_column])
+        grouped = dates.groupby(self.source[self.SERIES_KEY].to_numpy(), sort=False)
+        if freq is None:
+            longest = self.source[self.SERIES_KEY].value_counts().index[0]
+            observed = pd.DatetimeIndex(dates[self.source[self.SERIES_KEY] == longest])
+            freq = pd.infer_freq(observed) if len(observed) >= 3 else None
+        offset = pd.tseries.frequencies.to_offset(freq or 'YS')
+        
+        last_dates = grouped.max().reindex(series)
+        future = np.empty((len(series), horizon), dtype='datetime64[ns]')
+        for last_date in last_dates.unique():
+            future[(last_dates == last_date).to_numpy()] = pd.date_range(
+                last_date, periods=horizon + 1, freq=offset
+            )[1:].to_numpy()
+        return future
+    
+    def _compute(self, df: pd.DataFrame,
+                 position_offsets: Optional[pd.Series] = None) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        系列・日付順に並んだデータの特徴量を一括計算
+        
+        Args:
+            df: 系列キー付き・並べ替え済みのデータフレーム
+            position_offsets: 系列ごとのトレンド開始位置（末尾のみ再計算する場合）
+        
+        Returns:
+            特徴量データフレームと目的変数シリーズ
+        """
+        target = df[self.target_column].astype(float)
+        keys = df[self.SERIES_KEY]
+        
+        # 系列内の位置（並べ替え済みのため cumcount で算出）
+        local_position = keys.groupby(keys, sort=False).cumcount().to_numpy()
+        position = local_position
+        if position_offsets is not None:
+            position = local_position + keys.map(position_offsets).fillna(0).to_numpy(dtype=int)
+        
+        features = df.drop(columns=[self.target_column])
+        new_columns = {}
+        
+        # 日付特徴量
+        if self.date_column in features.columns:
+            dates = pd.to_datetime(features[self.date_column])
+            new_columns['year'] = dates.dt.year
+            new_columns['month'] = dates.dt.month
+            new_columns['quarter'] = dates.dt.quarter
+        
+        # ラグ特徴量（系列の先頭 lag 行は前の系列の値になるため無効化）
+        for lag in self.lags:
+            shifted = target.shift(lag).to_numpy()
+            shifted[local_position < lag] = np.nan
+            new_columns[f'{self.target_column}_lag_{lag}'] = shifted
+        
+        # 移動平均特徴量（当期の値を含めないよう前期までの値で計算）
+        lagged = target.shift(1)
+        for window in self.windows:
+            rolling = lagged.rolling(window=window)
+            invalid = local_position < window
+            mean = rolling.mean().to_numpy()
+            std = rolling.std().to_numpy()
+            mean[invalid] = np.nan
+            std[invalid] = np.nan
+            new_columns[f'{self.target_column}_ma_{window}'] = mean
+            new_columns[f'{self.target_column}_std_{window}'] = std
+        
+        # 人口増減率（前期・前々期の値から計算）
+        previous = lagged.to_numpy()
+        before_previous = target.shift(2).to_numpy()
+        before_previous[local_position < 2] = np.nan
+        new_columns[f'{self.target_column}_pct_change'] = previous / before_previous - 1
+        new_columns[f'{self.target_column}_diff'] = previous - before_previous
+        
+        # トレンド特徴量
+        new_columns['trend'] = position
+        new_columns['trend_squared'] = position ** 2
+        
+        features = pd.concat([features, pd.DataFrame(new_columns, index=features.index)], axis=1)
+        
+        # 特徴量列選択（日付・系列識別子は除外）
+        feature_columns = [
+            col for col in features.columns
+            if col not in [self.date_column, self.series_column, self.SERIES_KEY]
+            and not col.startswith('Unnamed')
+        ]
+        self.feature_columns = feature_columns
+        
+        # 系列内で後方補完 → 前方補完
+        grouped = features[feature_columns].groupby(keys.to_numpy(), sort=False)
+        X = grouped.bfill().groupby(keys.to_numpy(), sort=False).ffill()
+        y = target.rename(self.target_column)
+        return X, y
+    
+    def _appended_rows(self, source: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """キャッシュ済みデータの各系列末尾に行が追加されただけの場合、その追加行を返す"""
+        if (self.source is None or self.date_column not in source.columns
+                or len(source) <= len(self.source)
+                or list(source.columns) != list(self.source.columns)):
+            return None
+        
+        keys = pd.MultiIndex.from_arrays(
+            [source[self.SERIES_KEY], pd.to_datetime(source[self.date_column])]
+        )
+        cached_keys = pd.MultiIndex.from_arrays(
+            [self.source[self.SERIES_KEY], pd.to_datetime(self.source[self.date_column])]
+        )
+        is_new = ~keys.isin(cached_keys)
+        
+        # 既存行が変更されていないことを確認
+        existing = source[~is_new].reset_index(drop=True)
+        if len(existing) != len(self.source) or not existing.equals(self.source):
+            return None
+        
+        # 追加行が各系列の最終日より後であることを確認
+        new_rows = source[is_new]
+        last_dates = pd.to_datetime(self.source[self.date_column]).groupby(self.source[self.SERIES_KEY]).max()
+        previous_last = new_rows[self.SERIES_KEY].map(last_dates)
+        new_dates = pd.to_datetime(new_rows[self.date_column])
+        if (previous_last.notna() & (new_dates <= previous_last)).any():
+            return None
+        
+        return new_rows
+    
+    def _with_series_key(self, df: pd.DataFrame) -> pd.DataFrame:
+        """系列キー列を付与（系列列がなければ単一系列）"""
+        if self.SERIES_KEY in df.columns:
+            return df
+        df = df.copy()
+        df[self.SERIES_KEY] = df[self.series_column].astype(str) if self.series_column in df.columns else ''
+        return df
+    
+    def _sort_keys(self, df: pd.DataFrame) -> List[np.ndarray]:
+        """np.lexsort用のソートキー（系列 → 日付 → 入力順）"""
+        keys = [np.arange(len(df))]
+        if self.date_column in df.columns:
+            keys.append(pd.to_datetime(df[self.date_column]).to_numpy())
+        keys.append(df[self.SERIES_KEY].to_numpy())
+        return keys
+    
+    def _sorted(self, df: pd.DataFrame) -> pd.DataFrame:
+        """系列キーを付与して系列・日付順に並べ替え"""
+        df = self._with_series_key(df)
+        return df.iloc[np.lexsort(self._sort_keys(df))].reset_index(drop=True)
+    
+    def _store(self, source: pd.DataFrame, X: pd.DataFrame, y: pd.Series, version: str) -> None:
+        self.source = source
+        self.features = X
+        self.target = y
+        self.data_version = version
+    
+    @staticmethod
+    def _hash_frame(df: pd.DataFrame) -> str:
+        """データフレームの内容ハッシュ（データバージョン）"""
+        digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        digest.update(','.join(map(str, df.columns)).encode())
+        return digest.hexdigest()
@@ -0,0 +1,337 @@
+import logging
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse.linalg import splu
+
+logger = logging.getLogger(__name__)
+
+# 産業連関表（取引基本表）の行・列ラベル（都道府県表の表記、複数候補は先に見つかったものを使用）
+OUTPUT_LABELS = ["域内生産額", "県内生産額", "国内生産額", "道内生産額", "都内生産額", "府内生産額"]
+COMPENSATION_LABELS = ["雇用者所得"]
+VALUE_ADDED_LABELS = ["粗付加価値部門計", "粗付加価値計"]
+IMPORT_LABELS = ["（控除）移輸入", "(控除)移輸入", "移輸入計", "移輸入"]
+DOMESTIC_DEMAND_LABELS = ["域内需要合計", "県内需要合計", "国内需要合計"]
+CONSUMPTION_LABELS = ["民間消費支出", "家計外消費支出以外の民間消費支出"]
+
+# 疎行列で分解する規模・密度の目安
+SPARSE_MIN_SECTORS = 200
+SPARSE_MAX_DENSITY = 0.1
+
+
+def _find_label(labels, candidates: List[str]) -> Optional[str]:
+    """候補のうち最初に見つかったラベル"""
+    for candidate in candidates:
+        if candidate in labels:
+            return candidate
+    return None
+
+
+class InputOutputEngine:
+    """産業連関分析（レオンチェフ逆行列）による経済波及効果の計算エンジン
+    
+    競争移輸入型の地域表を想定し、域内自給率 s で移輸入を控除した
+    (I - diag(s) A) の LU 分解を初回の計算時に1回だけ行ってキャッシュする。
+    最終需要は (部門 × シナリオ) の行列として一括で解く。
+    
+    - 直接効果: 最終需要のうち域内で賄われる分 diag(s) Δf
+    - 1次波及（Type I）: X1 = (I - diag(s) A)^-1 diag(s) Δf、間接効果 = X1 - 直接効果
+    - 2次波及（Type II、誘発効果）: X1 の雇用者所得 × 消費転換係数を民間消費の構成比で
+      配分した需要を、同じ逆行列で解いた生産誘発額
+    - 粗付加価値（GDP）・雇用者数は部門別の係数（生産額あたり）から計算
+    """
+    
+    def __init__(self,
+                 input_coefficients: Union[np.ndarray, sparse.spmatrix],
+                 sectors: List[str],
+                 value_added_ratios: Optional[np.ndarray] = None,
+                 compensation_ratios: Optional[np.ndarray] = None,
+                 employment_coefficients: Optional[np.ndarray] = None,
+                 self_sufficiency: Optional[np.ndarray] = None,
+                 consumption_pattern: Optional[np.ndarray] = None,
+                 consumption_propensity: float = 0.7):
+        """
+        Args:
+            input_coefficients: 投入係数行列 A（部門 × 部門、密行列または疎行列）
+            sectors: 部門名（行列の並び順）
+            value_added_ratios: 粗付加価値率（省略時は 1 - 投入係数の列和）
+            compensation_ratios: 雇用者所得率（省略時は 0）
+            employment_coefficients: 雇用係数（生産額あたりの雇用者数、省略時は 0）
+            self_sufficiency: 域内自給率（省略時は 1）
+            consumption_pattern: 民間消費支出の部門別構成比（省略時は均等）
+            consumption_propensity: 雇用者所得からの消費転換係数
+        """
+        n = len(sectors)
+        if input_coefficients.shape != (n, n):
+            raise ValueError(f"投入係数行列の形状が部門数と一致しません: {input_coefficients.shape} != {(n, n)}")
+        
+        self.sectors = list(sectors)
+        self._sector_index = {sector: i for i, sector in enumerate(self.sectors)}
+        self.is_sparse = sparse.issparse(input_coefficients)
+        self.input_coefficients = (
+            sparse.csc_matrix(input_coefficients) if self.is_sparse else np.asarray(input_coefficients, dtype=float)
+        )
+        column_sums = np.asarray(self.input_coefficients.sum(axis=0)).ravel()
+        
+        def vector(values, default):
+            return np.full(n, default, dtype=float) if values is None else np.asarray(values, dtype=float).reshape(n)
+        
+        self.value_added_ratios = 1.0 - column_sums if value_added_ratios is None else vector(value_added_ratios, 0.0)
+        self.compensation_ratios = vector(compensation_ratios, 0.0)
+        self.employment_coefficients = vector(employment_coefficients, 0.0)
+        self.self_sufficiency = vector(self_sufficiency, 1.0)
+        pattern = vector(consumption_pattern, 1.0 / n)
+        self.consumption_pattern = pattern / pattern.sum() if pattern.sum() > 0 else np.full(n, 1.0 / n)
+        self.consumption_propensity = consumption_propensity
+        
+        self._factorization = None
+    
+    @classmethod
+    def from_transactions(cls,
+                          transactions: np.ndarray,
+                          output: np.ndarray,
+                          sectors: List[str],
+                          value_added: Optional[np.ndarray] = None,
+                          compensation: Optional[np.ndarray] = None,
+                          employment: Optional[np.ndarray] = None,
+                          imports: Optional[np.ndarray] = None,
+                          domestic_demand: Optional[np.ndarray] = None,
+                          consumption: Optional[np.ndarray] = None,
+                          consumption_propensity: float = 0.7) -> "InputOutputEngine":
+        """
+        取引基本表（金額）から係数を計算して作成
+        
+        Args:
+            transactions: 中間取引額（部門 × 部門）
+            output: 域内生産額
+            sectors: 部門名
+            value_added: 粗付加価値額
+            compensation: 雇用者所得
+            employment: 従業者数
+            imports: 移輸入額（控除項目のため負値でもよい）
+            domestic_demand: 域内需要合計
+            consumption: 民間消費支出
+            consumption_propensity: 消費転換係数
+        
+        Returns:
+            InputOutputEngine
+        """
+        output = np.asarray(output, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 生産額0の部門は係数0
+            inverse_output = np.where(output > 0, 1.0 / output, 0.0)
+            
+            def ratio(values):
+                return None if values is None else np.asarray(values, dtype=float) * inverse_output
+            
+            self_sufficiency = None
+            if imports is not None and domestic_demand is not None:
+                demand = np.asarray(domestic_demand, dtype=float)
+                import_ratio = np.where(demand > 0, np.abs(np.asarray(imports, dtype=float)) / demand, 0.0)
+                self_sufficiency = np.clip(1.0 - import_ratio, 0.0, 1.0)
+        
+        if sparse.issparse(transactions):
+            coefficients = sparse.csc_matrix(transactions) @ sparse.diags(inverse_output)
+        else:
+            coefficients = np.asarray(transactions, dtype=float) * inverse_output
+            n = len(sectors)
+            density = np.count_nonzero(coefficients) / max(n * n, 1)
+            if n >= SPARSE_MIN_SECTORS and density <= SPARSE_MAX_DENSITY:
+                coefficients = sparse.csc_matrix(coefficients)
+        
+        return cls(
+            coefficients,
+            sectors,
+            value_added_ratios=ratio(value_added),
+            compensation_ratios=ratio(compensation),
+            employment_coefficients=ratio(employment),
+            self_sufficiency=self_sufficiency,
+            consumption_pattern=consumption,
+            consumption_propensity=consumption_propensity
+        )
+    
+    @classmethod
+    def from_table(cls,
+                   table: pd.DataFrame,
+                   employment: Optional[Dict[str, float]] = None,
+                   consumption_propensity: float = 0.7) -> "InputOutputEngine":
+        """
+        取引基本表のデータフレームから作成
+        
+        行・列の両方に現れるラベルを部門（中間取引）とし、域内生産額・雇用者所得・粗付加価値の行、
+        移輸入・域内需要合計・民間消費支出の列を表記の候補から探す（見つからない項目は既定値）。
+        
+        Args:
+            table: 行ラベルをインデックスとする取引基本表（37部門・100部門以上の都道府県表）
+            employment: 部門別の従業者数
+            consumption_propensity: 消費転換係数
+        
+        Returns:
+            InputOutputEngine
+        """
+        table = table.apply(pd.to_numeric, errors='coerce')
+        row_labels = [str(label).strip() for label in table.index]
+        column_labels = [str(label).strip() for label in table.columns]
+        table.index, table.columns = row_labels, column_labels
+        
+        # 生産額などの合計項目は行・列の両方に現れるため部門から除く
+        summary_labels = set(
+            OUTPUT_LABELS + COMPENSATION_LABELS + VALUE_ADDED_LABELS + IMPORT_LABELS
+            + DOMESTIC_DEMAND_LABELS + CONSUMPTION_LABELS
+        )
+        sectors = [
+            label for label in column_labels if label in set(row_labels) and label not in summary_labels
+        ]
+        if not sectors:
+            raise ValueError("取引基本表に中間取引の部門が見つかりません")
+        transactions = table.loc[sectors, sectors].fillna(0).to_numpy()
+        
+        def row(candidates):
+            label = _find_label(row_labels, candidates)
+            return None if label is None else table.loc[label, sectors].fillna(0).to_numpy()
+        
+        def column(candidates):
+            label = _find_label(column_labels, candidates)
+            return None if label is None else table.loc[sectors, label].fillna(0).to_numpy()
+        
+        output = row(OUTPUT_LABELS)
+        if output is None:
+            output = column(OUTPUT_LABELS)
+        if output is None:
+            raise ValueError("取引基本表に生産額の行・列が見つかりません")
+        
+        engine = cls.from_transactions(
+            transactions,
+            output,
+            sectors,
+            value_added=row(VALUE_ADDED_LABELS),
+            compensation=row(COMPENSATION_LABELS),
+            employment=None if employment is None else [employment.get(sector, 0.0) for sector in sectors],
+            imports=column(IMPORT_LABELS),
+            domestic_demand=column(DOMESTIC_DEMAND_LABELS),
+            consumption=column(CONSUMPTION_LABELS),
+            consumption_propensity=consumption_propensity
+        )
+        logger.info(f"産業連関表読み込み完了: {len(sectors)}部門")
+        return engine
+    
+    @classmethod
+    def load(cls, path: str, employment: Optional[Dict[str, float]] = None,
+             consumption_propensity: float = 0.7, **read_options) -> "InputOutputEngine":
+        """
+        取引基本表のファイル（CSV・Excel）から作成
+        
+        Args:
+            path: ファイルパス（1列目を行ラベルとする）
+            employment: 部門別の従業者数
+            consumption_propensity: 消費転換係数
+            read_options: pandas の読み込み関数に渡す引数（sheet_name, encoding など）
+        
+        Returns:
+            InputOutputEngine
+        """
+        reader = pd.read_excel if str(path).endswith(('.xls', '.xlsx')) else pd.read_csv
+        table = reader(path, index_col=0, **read_options)
+        return cls.from_table(table, employment=employment, consumption_propensity=consumption_propensity)
+    
+    @property
+    def n_sectors(self) -> int:
+        return len(self.sectors)
+    
+    def sector_vector(self, values: Dict[str, float]) -> np.ndarray:
+        """部門名 → 値 の辞書を部門順のベクトルに変換（未知の部門はエラー）"""
+        vector = np.zeros(self.n_sectors)
+        for sector, value in values.items():
+            if sector not in self._sector_index:
+                raise ValueError(f"未知の部門です: {sector}")
+            vector[self._sector_index[sector]] += value
+        return vector
+    
+    def _factorize(self):
+        """(I - diag(s) A) の LU 分解（初回のみ計算してキャッシュ）"""
+        if self._factorization is None:
+            n = self.n_sectors
+            if self.is_sparse:
+                system = sparse.identity(n, format='csc') - sparse.diags(self.self_sufficiency) @ self.input_coefficients
+                self._factorization = splu(sparse.csc_matrix(system))
+            else:
+                system = np.eye(n) - self.self_sufficiency[:, None] * self.input_coefficients
+                self._factorization = lu_factor(system, check_finite=False)
+            logger.info(f"レオンチェフ逆行列の LU 分解完了: {n}部門（{'疎' if self.is_sparse else '密'}行列）")
+        return self._factorization
+    
+    def solve(self, demand: np.ndarray) -> np.ndarray:
+        """
+        (I - diag(s) A) X = demand を解く（キャッシュ済みの分解を使用）
+        
+        Args:
+            demand: 部門 × シナリオ の需要行列（1次元なら1シナリオ）
+        
+        Returns:
+            生産誘発額（demand と同じ形状）
+        """
+        factorization = self._factorize()
+        demand = np.asarray(demand, dtype=float)
+        if self.is_sparse:
+            return factorization.solve(demand)
+        return lu_solve(factorization, demand, check_finite=False)
+    
+    def leontief_inverse(self) -> np.ndarray:
+        """レオンチェフ逆行列（確認・表示用。計算には solve を使用）"""
+        return self.solve(np.eye(self.n_sectors))
+    
+    def compute_effects(self, final_demand: np.ndarray, induced: bool = True) -> Dict[str, np.ndarray]:
+        """
+        最終需要の変化による経済波及効果を一括計算
+        
+        Args:
+            final_demand: 部門 × シナリオ の最終需要の変化（1次元なら1シナリオ）
+            induced: 2次波及（雇用者所得による消費の誘発）を計算するか
+        
+        Returns:
+            生産誘発額（direct, indirect, induced, total）、粗付加価値誘発額（*_value_added）、
+            雇用誘発数（*_employment）。いずれも部門 × シナリオ（入力が1次元なら部門）
+        """
+        final_demand = np.asarray(final_demand, dtype=float)
+        single = final_demand.ndim == 1
+        demand = final_demand[:, None] if single else final_demand
+        
+        direct = self.self_sufficiency[:, None] * demand
+        first_round = self.solve(direct)
+        indirect = first_round - direct
+        
+        if induced:
+            # 雇用者所得 → 消費 → 域内で賄われる需要 → 生産誘発
+            income = self.compensation_ratios @ first_round
+            consumption = self.consumption_pattern[:, None] * (income * self.consumption_propensity)
+            induced_output = self.solve(self.self_sufficiency[:, None] * consumption)
+        else:
+            induced_output = np.zeros_like(first_round)
+        
+        effects = {
+            'direct': direct,
+            'indirect': indirect,
+            'induced': induced_output,
+            'total': first_round + induced_output
+        }
+        for name in list(effects):
+            effects[f'{name}_value_added'] = self.value_added_ratios[:, None] * effects[name]
+            effects[f'{name}_employment'] = self.employment_coefficients[:, None] * effects[name]
+        
+        if single:
+            effects = {name: values[:, 0] for name, values in effects.items()}
+        return effects
+    
+    def output_multipliers(self) -> Dict[str, np.ndarray]:
+        """部門別の生産誘発係数（Type I: 逆行列の列和、Type II: 誘発効果を含む列和）"""
+        effects = self.compute_effects(np.eye(self.n_sectors))
+        first_round = effects['direct'] + effects['indirect']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(self.self_sufficiency > 0, 1.0 / self.self_sufficiency, 0.0)
+        return {
+            'type_i': first_round.sum(axis=0) * scale,
+            'type_ii': effects['total'].sum(axis=0) * scale
+        }
@@ -0,0 +1,539 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# スコア → ランク判定の閾値（昇順）とラベル
+RANK_THRESHOLDS = np.array([40, 50, 60, 70, 80])
+RANK_LABELS = np.array([
+    "E (改善要)",
+    "D (やや課題あり)",
+    "C (普通)",
+    "B (やや住みやすい)",
+    "A (住みやすい)",
+    "S (非常に住みやすい)"
+])
+
+# 政策効果効率（スコア変化 / 政策投入量）の分類閾値（昇順）とラベル
+EFFECTIVENESS_THRESHOLDS = np.array([0.5, 1.0, 2.0])
+EFFECTIVENESS_LABELS = np.array(["効果限定的", "やや効果的", "効果的", "非常に効果的"])
+
+
+def compile_indicator_rules(indicators: List[Dict]) -> Dict[str, Dict]:
+    """
+    指標マスター（LivabilityIndicator）の行から正規化ルールと項目の重みを構築
+    
+    Args:
+        indicators: indicator_code, category, min_value, max_value, optimal_value,
+            higher_is_better, default_weight を持つ辞書のリスト（有効な指標のみ）
+    
+    Returns:
+        normalization_rules（指標コード → min/max/reverse/optimal）,
+        detailed_indicators（カテゴリ → 指標コード → カテゴリ内で合計1に正規化した重み）
+    """
+    normalization_rules = {}
+    category_weights = {}
+    for indicator in indicators:
+        code = indicator['indicator_code']
+        weight = indicator.get('default_weight')
+        category_weights.setdefault(indicator['category'], {})[code] = 1.0 if weight is None else float(weight)
+        
+        min_val, max_val = indicator.get('min_value'), indicator.get('max_value')
+        if min_val is None or max_val is None or max_val <= min_val:
+            continue
+        
+        # 最適値が範囲の端にある場合は単調な Min-Max 正規化として扱う
+        optimal = indicator.get('optimal_value')
+        reverse = indicator.get('higher_is_better') is False
+        if optimal is not None and not min_val < optimal < max_val:
+            reverse = optimal <= min_val
+            optimal = None
+        
+        normalization_rules[code] = {
+            'min': float(min_val),
+            'max': float(max_val),
+            'reverse': reverse,
+            'optimal': None if optimal is None else float(optimal)
+        }
+    
+    detailed_indicators = {}
+    for category, weights in category_weights.items():
+        total = sum(weights.values())
+        if total > 0:
+            detailed_indicators[category] = {code: weight / total for code, weight in weights.items()}
+    
+    return {
+        'normalization_rules': normalization_rules,
+        'detailed_indicators': detailed_indicators
+    }
+
+
+class LivabilityScoringEngine:
+    """住みやすさスコアの行列計算エンジン
+    
+    指標を (市町村 × 指標) の配列として扱い、正規化・カテゴリスコア・総合スコア・
+    順位を numpy の一括演算で計算する。LivabilityScorePredictor.calculate_livability_score
+    と同じ計算規則に従う:
+    
+    - 正規化: ルールのある指標は Min-Max（逆転指標は 100 から引く）、
+      最適値のある指標は最適値で 100・min/max で 0 となる山型、
+      ルールのない指標は値をそのまま使用し、いずれも 0-100 にクリップ
+    - 項目の重み: detailed_indicators の重み、未定義の項目は
+      1 / （その市町村で当該カテゴリに含まれる項目数）
+    - カテゴリスコア: 正規化値 × 項目の重み の合計
+    - 総合スコア: カテゴリスコア × カテゴリの重み の合計を 0-100 にクリップ
+    """
+    
+    def __init__(self,
+                 indicator_weights: Dict[str, float],
+                 detailed_indicators: Dict[str, Dict[str, float]],
+                 normalization_rules: Dict[str, Dict]):
+        self.categories = list(indicator_weights.keys())
+        self.category_weights = np.array([indicator_weights[c] for c in self.categories], dtype=float)
+        self.detailed_indicators = detailed_indicators
+        self.normalization_rules = normalization_rules
+        self._category_index = {category: k for k, category in enumerate(self.categories)}
+        self._vector_cache = {}
+    
+    def build_matrix(self, municipalities_data: Dict[str, Dict[str, Dict[str, float]]]) -> Dict:
+        """
+        市町村別の入れ子辞書を指標配列に変換
+        
+        Args:
+            municipalities_data: 市町村 → カテゴリ → 項目 → 値
+        
+        Returns:
+            municipalities, indicators（(カテゴリ, 項目) のリスト）,
+            values（市町村 × 指標、欠損は NaN）, category_present（市町村 × カテゴリ）
+        """
+        municipalities = list(municipalities_data.keys())
+        column_index = {}
+        for indicators in municipalities_data.values():
+            for category, items in indicators.items():
+                if category in self._category_index:
+                    for item in items:
+                        column_index.setdefault((category, item), len(column_index))
+        
+        values = np.full((len(municipalities), len(column_index)), np.nan)
+        category_present = np.zeros((len(municipalities), len(self.categories)), dtype=bool)
+        for row, indicators in enumerate(municipalities_data.values()):
+            for category, items in indicators.items():
+                if category in self._category_index:
+                    category_present[row, self._category_index[category]] = True
+                    for item, value in items.items():
+                        values[row, column_index[(category, item)]] = value
+        
+        return {
+            'municipalities': municipalities,
+            'indicators': list(column_index.keys()),
+            'values': values,
+            'category_present': category_present
+        }
+    
+    def indicator_vectors(self, indicators: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+        """
+        指標列ごとの正規化パラメータ・重み・カテゴリ所属を事前計算（列構成ごとにキャッシュ）
+        
+        Args:
+            indicators: (カテゴリ, 項目) のリスト
+        
+        Returns:
+            min, span, reverse, optimal, peaked, lower_span, upper_span, has_rule,
+            known_weight（未定義は NaN）,
+            membership（指標 × カテゴリ の 0/1 行列）
+        """
+        key = tuple(indicators)
+        if key in self._vector_cache:
+            return self._vector_cache[key]
+        
+        n_indicators = len(indicators)
+        minimum = np.zeros(n_indicators)
+        span = np.ones(n_indicators)
+        reverse = np.zeros(n_indicators, dtype=bool)
+        optimal = np.zeros(n_indicators)
+        peaked = np.zeros(n_indicators, dtype=bool)
+        has_rule = np.zeros(n_indicators, dtype=bool)
+        known_weight = np.full(n_indicators, np.nan)
+        membership = np.zeros((n_indicators, len(self.categories)))
+        
+        for j, (category, item) in enumerate(indicators):
+            membership[j, self._category_index[category]] = 1.0
+            rule = self.normalization_rules.get(item)
+            if rule is not None:
+                minimum[j] = rule['min']
+                span[j] = rule['max'] - rule['min']
+                reverse[j] = rule['reverse']
+                has_rule[j] = True
+                if rule.get('optimal') is not None:
+                    optimal[j] = rule['optimal']
+                    peaked[j] = True
+            weight = self.detailed_indicators.get(category, {}).get(item)
+            if weight is not None:
+                known_weight[j] = weight
+        
+        vectors = {
+            'min': minimum,
+            'span': span,
+            'reverse': reverse,
+            'optimal': optimal,
+            'peaked': peaked,
+            # 山型正規化の最適値より下側・上側の幅
+            'lower_span': np.where(peaked, optimal - minimum, 1.0),
+            'upper_span': np.where(peaked, minimum + span - optimal, 1.0),
+            'has_rule': has_rule,
+            'known_weight': known_weight,
+            'membership': membership
+        }
+        self._vector_cache[key] = vectors
+        return vectors
+    
+    def normalize(self, values: np.ndarray, vectors: Dict[str, np.ndarray]) -> np.ndarray:
+        """指標値を 0-100 スケールに一括正規化"""
+        scaled = (values - vectors['min']) / vectors['span'] * 100
+        scaled = np.where(vectors['reverse'], 100 - scaled, scaled)
+        if vectors['peaked'].any():
+            below = (values - vectors['min']) / vectors['lower_span'] * 100
+            above = (vectors['min'] + vectors['span'] - values) / vectors['upper_span'] * 100
+            peak = np.where(values <= vectors['optimal'], below, above)
+            scaled = np.where(vectors['peaked'], peak, scaled)
+        return np.clip(np.where(vectors['has_rule'], scaled, values), 0, 100)
+    
+    def item_weights(self, present: np.ndarray, vectors: Dict[str, np.ndarray]) -> np.ndarray:
+        """市町村 × 指標 の項目重み（未定義項目はカテゴリ内項目数の逆数）"""
+        items_per_category = present.astype(float) @ vectors['membership']
+        items_per_indicator = items_per_category @ vectors['membership'].T
+        with np.errstate(divide='ignore'):
+            fallback = 1.0 / items_per_indicator
+        return np.where(np.isnan(vectors['known_weight']), fallback, vectors['known_weight'])
+    
+    @staticmethod
+    def category_scores(weighted: np.ndarray, membership: np.ndarray) -> np.ndarray:
+        """
+        カテゴリスコア（重み付き項目スコアのカテゴリ内合計）
+        
+        行列積や多次元の sum は処理する行数によって加算順が変わり得るため、
+        列を固定の順に足し込み、全件計算と差分計算の結果をビット単位で一致させる
+        （同点の順位を揃えるため）。
+        """
+        scores = np.zeros((weighted.shape[0], membership.shape[1]))
+        for j in range(weighted.shape[1]):
+            scores += weighted[:, j, None] * membership[j]
+        return scores
+    
+    @staticmethod
+    def total_scores(category_scores: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """総合スコア（カテゴリスコア × カテゴリの重み の合計、0-100にクリップ）"""
+        totals = np.zeros(category_scores.shape[0])
+        for k in range(category_scores.shape[1]):
+            totals += category_scores[:, k] * weights[k]
+        return np.clip(totals, 0, 100)
+    
+    def score(self,
+              values: np.ndarray,
+              indicators: List[Tuple[str, str]],
+              category_present: Optional[np.ndarray] = None,
+              category_weights: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        指標配列から全市町村のスコアを一括計算
+        
+        Args:
+            values: 市町村 × 指標 の値（欠損は NaN）
+            indicators: (カテゴリ, 項目) のリスト
+            category_present: 市町村 × カテゴリ のデータ有無（省略時は項目の有無から判定）
+            category_weights: カテゴリ重み（省略時は indicator_weights）
+        
+        Returns:
+            normalized, item_weights, weighted, category_scores（市町村 × カテゴリ）,
+            total_scores, grades, order（スコア降順の行番号）, positions（1始まりの順位）,
+            strengths, improvement_areas（市町村 × カテゴリ の真偽値）
+        """
+        vectors = self.indicator_vectors(indicators)
+        weights = self.category_weights if category_weights is None else np.asarray(category_weights, dtype=float)
+        
+        present = ~np.isnan(values)
+        if category_present is None:
+            category_present = (present.astype(float) @ vectors['membership']) > 0
+        
+        normalized = self.normalize(values, vectors)
+        item_weights = self.item_weights(present, vectors)
+        with np.errstate(invalid='ignore'):
+            weighted = np.where(present, normalized * item_weights, 0.0)
+        
+        category_scores = self.category_scores(weighted, vectors['membership'])
+        total_scores = self.total_scores(category_scores, weights)
+        
+        # 降順の安定ソート（同点は入力順）
+        order = np.argsort(-total_scores, kind='stable')
+        positions = np.empty(len(total_scores), dtype=int)
+        positions[order] = np.arange(1, len(total_scores) + 1)
+        
+        # 強み・改善分野（データのあるカテゴリの平均との比較）
+        n_present = category_present.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average = np.where(category_present, category_scores, 0.0).sum(axis=1, keepdims=True) / n_present
+        
+        return {
+            'normalized': normalized,
+            'item_weights': item_weights,
+            'weighted': weighted,
+            'category_scores': category_scores,
+            'category_present': category_present,
+            'total_scores': total_scores,
+            'grades': self.grade(total_scores),
+            'order': order,
+            'positions': positions,
+            'strengths': category_present & (category_scores > average * 1.1),
+            'improvement_areas': category_present & (category_scores < average * 0.9)
+        }
+    
+    def score_municipalities(self, municipalities_data: Dict[str, Dict[str, Dict[str, float]]]) -> Dict:
+        """入れ子辞書形式の指標データから全市町村のスコアを一括計算"""
+        matrix = self.build_matrix(municipalities_data)
+        result = self.score(matrix['values'], matrix['indicators'], matrix['category_present'])
+        result.update(matrix)
+        return result
+    
+    def update_scores(self, result: Dict, changes: List[Tuple[str, str, str, Optional[float]]]) -> Dict:
+        """
+        変化した (市町村, 指標) セルだけを再計算して一括計算結果を更新（差分計算）
+        
+        変化した市町村の行について、正規化値・項目の重み・変化したカテゴリのスコア・
+        総合スコアを再計算する。順位は変化した行を並びから外して挿入し直し、
+        旧順位と新順位の間の区間だけ順位を付け直す。
+        
+        Args:
+            result: score_municipalities の戻り値（その場で更新される）
+            changes: (市町村, カテゴリ, 項目, 新しい値) のリスト（値が None なら項目を削除）
+        
+        Returns:
+            rows（スコアを再計算した行）, categories（再計算したカテゴリ番号）,
+            rank_changed_rows（順位が変わった行）, n_cells（変化したセル数）
+        """
+        row_index = {municipality: row for row, municipality in enumerate(result['municipalities'])}
+        column_index = {indicator: j for j, indicator in enumerate(result['indicators'])}
+        
+        cells = []
+        for municipality, category, item, value in changes:
+            if municipality not in row_index:
+                raise ValueError(f"未登録の市町村です（全件再計算が必要）: {municipality}")
+            if category not in self._category_index:
+                continue
+            if (category, item) not in column_index:
+                column_index[(category, item)] = len(column_index)
+            cells.append((row_index[municipality], column_index[(category, item)],
+                          np.nan if value is None else float(value)))
+        
+        if len(column_index) > len(result['indicators']):
+            self._add_columns(result, list(column_index.keys()))
+        if not cells:
+            empty = np.empty(0, dtype=int)
+            return {'rows': empty, 'categories': empty, 'rank_changed_rows': empty, 'n_cells': 0}
+        
+        cell_rows = np.array([cell[0] for cell in cells])
+        cell_columns = np.array([cell[1] for cell in cells])
+        cell_values = np.array([cell[2] for cell in cells])
+        result['values'][cell_rows, cell_columns] = cell_values
+        
+        vectors = self.indicator_vectors(result['indicators'])
+        cell_categories = vectors['membership'][cell_columns].argmax(axis=1)
+        rows = np.unique(cell_rows)
+        categories = np.unique(cell_categories)
+        # 値の追加でカテゴリが現れる（削除ではカテゴリ自体は残る）
+        added = ~np.isnan(cell_values)
+        result['category_present'][cell_rows[added], cell_categories[added]] = True
+        
+        # 変化した行の項目単位の値（重みの既定値は行内の項目数に依存するため行単位で再計算）
+        values = result['values'][rows]
+        present = ~np.isnan(values)
+        result['normalized'][rows] = self.normalize(values, vectors)
+        result['item_weights'][rows] = self.item_weights(present, vectors)
+        with np.errstate(invalid='ignore'):
+            result['weighted'][rows] = np.where(present, result['normalized'][rows] * result['item_weights'][rows], 0.0)
+        
+        # 変化したカテゴリのスコアと総合スコア
+        result['category_scores'][np.ix_(rows, categories)] = self.category_scores(
+            result['weighted'][rows], vectors['membership'][:, categories]
+        )
+        category_scores = result['category_scores'][rows]
+        result['total_scores'][rows] = self.total_scores(category_scores, self.category_weights)
+        result['grades'][rows] = self.grade(result['total_scores'][rows])
+        
+        category_present = result['category_present'][rows]
+        n_present = category_present.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average = np.where(category_present, category_scores, 0.0).sum(axis=1, keepdims=True) / n_present
+        result['strengths'][rows] = category_present & (category_scores > average * 1.1)
+        result['improvement_areas'][rows] = category_present & (category_scores < average * 0.9)
+        
+        rank_changed_rows = self._reinsert_ranks(result, rows)
+        return {
+            'rows': rows,
+            'categories': categories,
+            'rank_changed_rows': rank_changed_rows,
+            'n_cells': len(cells)
+        }
+    
+    def _add_columns(self, result: Dict, indicators: List[Tuple[str, str]]) -> None:
+        """新しい指標列を追加（既存行は欠損扱い）"""
+        n_new = len(indicators) - len(result['indicators'])
+        n_rows = len(result['municipalities'])
+        for key, fill in (('values', np.nan), ('normalized', np.nan), ('item_weights', 0.0), ('weighted', 0.0)):
+            result[key] = np.hstack([result[key], np.full((n_rows, n_new), fill)])
+        result['indicators'] = indicators
+    
+    def _reinsert_ranks(self, result: Dict, rows: np.ndarray) -> np.ndarray:
+        """
+        変化した行を降順の並びに挿入し直し、影響区間だけ順位を更新
+        
+        並びは (スコア降順, 行番号昇順) で、score の安定ソートと一致する。
+        
+        Returns:
+            順位が変わった行
+        """
+        totals = result['total_scores']
+        old_positions = result['positions'][rows] - 1
+        remaining = np.delete(result['order'], old_positions)
+        keys = -totals[remaining]
+        
+        # 挿入位置 = 自分より前に並ぶ残りの行の数（同点は行番号順）
+        rows = rows[np.lexsort((rows, -totals[rows]))]
+        insert_at = np.empty(len(rows), dtype=int)
+        for i, row in enumerate(rows):
+            lo = np.searchsorted(keys, -totals[row], side='left')
+            hi = np.searchsorted(keys, -totals[row], side='right')
+            insert_at[i] = lo + np.searchsorted(remaining[lo:hi], row)
+        order = np.insert(remaining, insert_at, rows)
+        
+        new_positions = insert_at + np.arange(len(rows))
+        start = min(old_positions.min(), new_positions.min())
+        stop = max(old_positions.max(), new_positions.max()) + 1
+        
+        span = order[start:stop]
+        before = result['positions'][span].copy()
+        result['positions'][span] = np.arange(start + 1, stop + 1)
+        result['order'] = order
+        return span[result['positions'][span] != before]
+    
+    def score_policy_scenarios(self,
+                               municipalities_data: Dict[str, Dict[str, Dict[str, float]]],
+                               policy_scenarios: List[Dict[str, Dict[str, float]]]) -> Dict:
+        """
+        複数の政策シナリオによるスコア変化を一括計算
+        
+        現在の指標 (市町村 × 指標) に各シナリオの効果 (シナリオ × 指標) を加えた
+        (シナリオ × 市町村 × 指標) の配列を1回の一括スコア計算で評価する。
+        効果は現在値のある指標にだけ加算する（predict_score_changes と同じ規則）。
+        
+        Args:
+            municipalities_data: 市町村 → カテゴリ → 項目 → 現在値
+            policy_scenarios: シナリオごとの カテゴリ → 項目 → 効果
+        
+        Returns:
+            current（現在のスコア計算結果）, current_scores（市町村）, future_scores,
+            score_changes, future_grades, rank_changed（シナリオ × 市町村）,
+            category_changes, efficiency, effectiveness（シナリオ × 市町村 × カテゴリ）,
+            policy_inputs, evaluated（シナリオ × カテゴリ）
+        """
+        current = self.score_municipalities(municipalities_data)
+        n_scenarios = len(policy_scenarios)
+        n_municipalities, n_indicators = current['values'].shape
+        column_index = {indicator: j for j, indicator in enumerate(current['indicators'])}
+        
+        effects = np.zeros((n_scenarios, n_indicators))
+        policy_inputs = np.zeros((n_scenarios, len(self.categories)))
+        has_effects = np.zeros((n_scenarios, len(self.categories)), dtype=bool)
+        for s, scenario in enumerate(policy_scenarios):
+            for category, items in scenario.items():
+                if category not in self._category_index:
+                    continue
+                k = self._category_index[category]
+                policy_inputs[s, k] = sum(items.values())
+                has_effects[s, k] = bool(items)
+                for item, effect in items.items():
+                    if (category, item) in column_index:
+                        effects[s, column_index[(category, item)]] = effect
+        
+        # (シナリオ × 市町村 × 指標) → (シナリオ・市町村 × 指標) として一括計算（欠損は NaN のまま）
+        future_values = current['values'][None, :, :] + effects[:, None, :]
+        future = self.score(
+            future_values.reshape(n_scenarios * n_municipalities, n_indicators),
+            current['indicators'],
+            np.tile(current['category_present'], (n_scenarios, 1))
+        )
+        
+        future_scores = future['total_scores'].reshape(n_scenarios, n_municipalities)
+        future_grades = future['grades'].reshape(n_scenarios, n_municipalities)
+        category_changes = (
+            future['category_scores'].reshape(n_scenarios, n_municipalities, -1) - current['category_scores'][None]
+        )
+        
+        # 政策効果の評価（効果の指定があり投入量が正のカテゴリのみ）
+        evaluated = has_effects & (policy_inputs > 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            efficiency = np.where(
+                evaluated[:, None, :] & current['category_present'][None],
+                category_changes / policy_inputs[:, None, :],
+                np.nan
+            )
+        
+        return {
+            'current': current,
+            'current_scores': current['total_scores'],
+            'future_scores': future_scores,
+            'score_changes': future_scores - current['total_scores'][None],
+            'future_grades': future_grades,
+            'rank_changed': future_grades != current['grades'][None],
+            'category_changes': category_changes,
+            'policy_inputs': policy_inputs,
+            'evaluated': evaluated,
+            'efficiency': efficiency,
+            'effectiveness': self.classify_effectiveness(efficiency)
+        }
+    
+    @staticmethod
+    def classify_effectiveness(efficiency: np.ndarray) -> np.ndarray:
+        """効果効率の配列を分類ラベル配列に変換（評価対象外の NaN は空文字）"""
+        labels = EFFECTIVENESS_LABELS[np.searchsorted(EFFECTIVENESS_THRESHOLDS, np.nan_to_num(efficiency), side='right')]
+        return np.where(np.isnan(efficiency), '', labels)
+    
+    @staticmethod
+    def grade(total_scores: np.ndarray) -> np.ndarray:
+        """スコア配列からランクラベル配列を判定"""
+        return RANK_LABELS[np.searchsorted(RANK_THRESHOLDS, total_scores, side='right')]
+    
+    def to_score_result(self, result: Dict, row: int) -> Dict:
+        """
+        一括計算結果の1市町村分を calculate_livability_score と同じ形式の辞書に変換
+        
+        Args:
+            result: score_municipalities の戻り値
+            row: 市町村の行番号
+        
+        Returns:
+            住みやすさスコア結果
+        """
+        present_categories = np.flatnonzero(result['category_present'][row])
+        category_scores = {
+            self.categories[k]: float(result['category_scores'][row, k]) for k in present_categories
+        }
+        
+        detailed_breakdown = {self.categories[k]: {} for k in present_categories}
+        for j in np.flatnonzero(~np.isnan(result['values'][row])):
+            category, item = result['indicators'][j]
+            detailed_breakdown[category][item] = {
+                'raw_value': float(result['values'][row, j]),
+                'normalized_value': float(result['normalized'][row, j]),
+                'weight': float(result['item_weights'][row, j]),
+                'weighted_score': float(result['weighted'][row, j])
+            }
+        
+        return {
+            'total_score': float(result['total_scores'][row]),
+            'rank': str(result['grades'][row]),
+            'category_scores': category_scores,
+            'detailed_breakdown': detailed_breakdown,
+            'strengths': [self.categories[k] for k in np.flatnonzero(result['strengths'][row])],
+            'improvement_areas': [self.categories[k] for k in np.flatnonzero(result['improvement_areas'][row])]
+        }
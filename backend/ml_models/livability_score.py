@@ -6,22 +6,39 @@ from datetime import datetime
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.cluster import MiniBatchKMeans
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import xgboost as xgb
 import joblib
 
+from .livability_engine import LivabilityScoringEngine, compile_indicator_rules
+
 logger = logging.getLogger(__name__)
 
 class LivabilityScorePredictor:
     """住みやすさスコア予測モデルクラス"""
     
+    # 指標別の正規化ルールの既定値（指標マスター未登録の指標に使用）
+    NORMALIZATION_RULES = {
+        'school_access': {'min': 0, 'max': 5, 'reverse': False},
+        'hospital_access': {'min': 0, 'max': 10, 'reverse': False},
+        'employment_rate': {'min': 40, 'max': 80, 'reverse': False},
+        'crime_rate': {'min': 0, 'max': 10, 'reverse': True},
+        'commute_time': {'min': 5, 'max': 60, 'reverse': True},
+        'housing_cost': {'min': 30000, 'max': 150000, 'reverse': True},
+        'air_quality': {'min': 0, 'max': 100, 'reverse': False},
+        'green_space': {'min': 0, 'max': 100, 'reverse': False}
+    }
+    
     def __init__(self, model_dir: str = "backend/data/models"):
         self.model_dir = model_dir
         self.models = {}
         self.scalers = {}
         
+        # 重み設定のバージョン（indicator_weights・detailed_indicators の再代入ごとに更新）
+        self._weights_version = 0
+        
         # 住みやすさ指標の重み設定
         self.indicator_weights = {
             'education': 0.15,      # 教育環境
@@ -75,6 +92,84 @@ class LivabilityScorePredictor:
                 'land_price': 0.3           # 地価
             }
         }
+        
+        # 正規化ルール（指標マスターから構築したルールで上書きされる）
+        self.normalization_rules = dict(self.NORMALIZATION_RULES)
+        self.indicator_rules_version = None
+        self._default_detailed_indicators = {
+            category: dict(items) for category, items in self.detailed_indicators.items()
+        }
+        
+        # 一括スコア計算エンジン（重み設定・ルールが変わった場合のみ再構築）
+        self._scoring_engine = None
+        self._scoring_engine_key = None
+        
+        # データ駆動の重み（主成分分析）の既定値への復元用・逐次学習の端数行
+        self._default_indicator_weights = dict(self.indicator_weights)
+        self._weight_pca_pending = None
+    
+    @property
+    def indicator_weights(self) -> Dict[str, float]:
+        """カテゴリ重み（変更は再代入で行う。辞書をその場で書き換えてもエンジンには反映されない）"""
+        return self._indicator_weights
+    
+    @indicator_weights.setter
+    def indicator_weights(self, weights: Dict[str, float]) -> None:
+        self._indicator_weights = weights
+        self._weights_version += 1
+    
+    @property
+    def detailed_indicators(self) -> Dict[str, Dict[str, float]]:
+        """カテゴリ別の項目の重み（変更は再代入で行う）"""
+        return self._detailed_indicators
+    
+    @detailed_indicators.setter
+    def detailed_indicators(self, indicators: Dict[str, Dict[str, float]]) -> None:
+        self._detailed_indicators = indicators
+        self._weights_version += 1
+    
+    @property
+    def scoring_engine(self) -> LivabilityScoringEngine:
+        """現在の重み設定に対応する一括スコア計算エンジン"""
+        key = (self._weights_version, self.indicator_rules_version)
+        if self._scoring_engine is None or key != self._scoring_engine_key:
+            self._scoring_engine = LivabilityScoringEngine(
+                self.indicator_weights, self.detailed_indicators, self.normalization_rules
+            )
+            self._scoring_engine_key = key
+        return self._scoring_engine
+    
+    def apply_indicator_rules(self, indicators: List[Dict], version: Optional[str] = None) -> None:
+        """
+        指標マスターの定義を正規化ルール・項目の重みに反映
+        
+        マスターに登録された指標のルールが既定ルールより優先され、
+        マスターに指標のあるカテゴリは項目の重みをマスターの default_weight で置き換える。
+        
+        Args:
+            indicators: 有効な指標マスターの行（compile_indicator_rules の入力形式）
+            version: 指標マスターのバージョン（変更検知用。反映済みのバージョンなら何もしない）
+        """
+        rules_version = version if version is not None else repr(indicators)
+        if rules_version == self.indicator_rules_version:
+            return
+        
+        compiled = compile_indicator_rules(indicators)
+        
+        rules = dict(self.NORMALIZATION_RULES)
+        rules.update(compiled['normalization_rules'])
+        
+        detailed_indicators = {
+            category: dict(items) for category, items in self._default_detailed_indicators.items()
+        }
+        for category, weights in compiled['detailed_indicators'].items():
+            if category in self.indicator_weights:
+                detailed_indicators[category] = weights
+        
+        self.normalization_rules = rules
+        self.detailed_indicators = detailed_indicators
+        self.indicator_rules_version = rules_version
+        logger.info(f"指標マスター反映: ルール{len(compiled['normalization_rules'])}件")
     
     def calculate_livability_score(self, indicators_data: Dict[str, Dict[str, float]]) -> Dict:
         """
@@ -159,28 +254,24 @@ class LivabilityScorePredictor:
         Returns:
             正規化された値
         """
-        # 指標別の正規化ルール（実際のデータ分布に基づいて調整が必要）
-        normalization_rules = {
-            'school_access': {'min': 0, 'max': 5, 'reverse': False},
-            'hospital_access': {'min': 0, 'max': 10, 'reverse': False},
-            'employment_rate': {'min': 40, 'max': 80, 'reverse': False},
-            'crime_rate': {'min': 0, 'max': 10, 'reverse': True},
-            'commute_time': {'min': 5, 'max': 60, 'reverse': True},
-            'housing_cost': {'min': 30000, 'max': 150000, 'reverse': True},
-            'air_quality': {'min': 0, 'max': 100, 'reverse': False},
-            'green_space': {'min': 0, 'max': 100, 'reverse': False}
-        }
-        
-        if indicator in normalization_rules:
-            rule = normalization_rules[indicator]
+        rule = self.normalization_rules.get(indicator)
+        if rule is not None:
             min_val, max_val = rule['min'], rule['max']
+            optimal = rule.get('optimal')
             
-            # Min-Max正規化
-            normalized = (value - min_val) / (max_val - min_val) * 100
-            
-            # 逆転指標の場合（値が小さいほど良い）
-            if rule['reverse']:
-                normalized = 100 - normalized
+            if optimal is not None:
+                # 最適値のある指標（最適値で100、min/maxで0となる山型）
+                if value <= optimal:
+                    normalized = (value - min_val) / (optimal - min_val) * 100
+                else:
+                    normalized = (max_val - value) / (max_val - optimal) * 100
+            else:
+                # Min-Max正規化
+                normalized = (value - min_val) / (max_val - min_val) * 100
+                
+                # 逆転指標の場合（値が小さいほど良い）
+                if rule['reverse']:
+                    normalized = 100 - normalized
             
             # 0-100の範囲にクリップ
             normalized = max(0, min(100, normalized))
@@ -239,47 +330,33 @@ class LivabilityScorePredictor:
         try:
             logger.info("住みやすさスコア変化予測開始")
             
-            # 現在のスコア計算
-            current_result = self.calculate_livability_score(current_indicators)
-            
-            # 政策実施後の指標値を計算
-            future_indicators = {}
-            for category, indicators in current_indicators.items():
-                future_indicators[category] = {}
-                for indicator, current_value in indicators.items():
-                    # 政策効果を加味
-                    effect = policy_effects.get(category, {}).get(indicator, 0)
-                    future_value = current_value + effect
-                    future_indicators[category][indicator] = future_value
-            
-            # 将来のスコア計算
-            future_result = self.calculate_livability_score(future_indicators)
-            
-            # 変化量計算
-            score_change = future_result['total_score'] - current_result['total_score']
-            rank_change = future_result['rank'] != current_result['rank']
-            
-            # カテゴリ別変化量
-            category_changes = {}
-            for category in current_result['category_scores']:
-                current_score = current_result['category_scores'].get(category, 0)
-                future_score = future_result['category_scores'].get(category, 0)
-                category_changes[category] = future_score - current_score
+            # 1市町村 × 1シナリオの一括計算として評価
+            batch = self.predict_score_changes_batch({'target': current_indicators}, [policy_effects])
+            engine = self.scoring_engine
+            current = batch['current']
+            present = np.flatnonzero(current['category_present'][0])
+            
+            score_change = float(batch['score_changes'][0, 0])
+            
+            # カテゴリ別変化量（現在データのあるカテゴリ）
+            category_changes = {
+                engine.categories[k]: float(batch['category_changes'][0, 0, k]) for k in present
+            }
             
             result = {
-                'current_score': current_result['total_score'],
-                'future_score': future_result['total_score'],
+                'current_score': float(batch['current_scores'][0]),
+                'future_score': float(batch['future_scores'][0, 0]),
                 'score_change': score_change,
-                'current_rank': current_result['rank'],
-                'future_rank': future_result['rank'],
-                'rank_changed': rank_change,
+                'current_rank': str(current['grades'][0]),
+                'future_rank': str(batch['future_grades'][0, 0]),
+                'rank_changed': bool(batch['rank_changed'][0, 0]),
                 'category_changes': category_changes,
                 'most_improved_categories': sorted(
                     category_changes.items(), 
                     key=lambda x: x[1], 
                     reverse=True
                 )[:3],
-                'policy_effectiveness': self._evaluate_policy_effectiveness(category_changes, policy_effects)
+                'policy_effectiveness': self._policy_effectiveness_from_batch(batch, 0, 0)
             }
             
             logger.info(f"スコア変化予測完了: {score_change:+.2f}点変化")
@@ -289,6 +366,45 @@ class LivabilityScorePredictor:
             logger.error(f"スコア変化予測エラー: {e}")
             raise
     
+    def predict_score_changes_batch(self,
+                                    municipalities_data: Dict[str, Dict[str, Dict[str, float]]],
+                                    policy_scenarios: List[Dict[str, Dict[str, float]]]) -> Dict:
+        """
+        複数市町村 × 複数政策シナリオのスコア変化を一括予測
+        
+        Args:
+            municipalities_data: 市町村別の現在の指標値
+            policy_scenarios: シナリオごとの政策による指標への効果
+            
+        Returns:
+            スコア変化予測結果（配列形式。LivabilityScoringEngine.score_policy_scenarios を参照）
+        """
+        try:
+            logger.info(f"一括スコア変化予測開始: {len(municipalities_data)}市町村 × {len(policy_scenarios)}シナリオ")
+            
+            result = self.scoring_engine.score_policy_scenarios(municipalities_data, policy_scenarios)
+            result['municipalities'] = result['current']['municipalities']
+            result['categories'] = list(self.scoring_engine.categories)
+            
+            logger.info("一括スコア変化予測完了")
+            return result
+            
+        except Exception as e:
+            logger.error(f"一括スコア変化予測エラー: {e}")
+            raise
+    
+    def _policy_effectiveness_from_batch(self, batch: Dict, scenario: int, row: int) -> Dict:
+        """一括予測結果の1シナリオ・1市町村分を政策効果評価の辞書形式に変換"""
+        policy_evaluation = {}
+        for k in np.flatnonzero(~np.isnan(batch['efficiency'][scenario, row])):
+            policy_evaluation[batch['categories'][k]] = {
+                'score_change': float(batch['category_changes'][scenario, row, k]),
+                'policy_input': float(batch['policy_inputs'][scenario, k]),
+                'efficiency': float(batch['efficiency'][scenario, row, k]),
+                'effectiveness_level': str(batch['effectiveness'][scenario, row, k])
+            }
+        return policy_evaluation
+    
     def _evaluate_policy_effectiveness(self, 
                                      category_changes: Dict[str, float],
                                      policy_effects: Dict[str, Dict[str, float]]) -> Dict:
@@ -413,41 +529,40 @@ class LivabilityScorePredictor:
         try:
             logger.info("市町村比較分析開始")
             
-            comparison_results = {}
+            # 全市町村のスコアを行列演算で一括計算
+            engine = self.scoring_engine
+            scores = engine.score_municipalities(municipalities_data)
+            municipalities = scores['municipalities']
             
-            # 各市町村のスコア計算
-            for municipality, indicators in municipalities_data.items():
-                score_result = self.calculate_livability_score(indicators)
-                comparison_results[municipality] = score_result
+            comparison_results = {
+                municipality: engine.to_score_result(scores, row)
+                for row, municipality in enumerate(municipalities)
+            }
             
-            # ランキング作成
-            rankings = sorted(
-                comparison_results.items(),
-                key=lambda x: x[1]['total_score'],
-                reverse=True
-            )
+            # ランキング作成（スコア降順、同点は入力順）
+            rankings = [
+                (municipalities[row], comparison_results[municipalities[row]]) for row in scores['order']
+            ]
             
             # 統計情報
-            scores = [result['total_score'] for result in comparison_results.values()]
+            total_scores = scores['total_scores']
             statistics = {
-                'average_score': np.mean(scores),
-                'median_score': np.median(scores),
-                'std_score': np.std(scores),
-                'max_score': np.max(scores),
-                'min_score': np.min(scores)
+                'average_score': np.mean(total_scores),
+                'median_score': np.median(total_scores),
+                'std_score': np.std(total_scores),
+                'max_score': np.max(total_scores),
+                'min_score': np.min(total_scores)
             }
             
-            # カテゴリ別ベスト市町村
-            category_leaders = {}
-            for category in self.indicator_weights.keys():
-                best_municipality = max(
-                    comparison_results.items(),
-                    key=lambda x: x[1]['category_scores'].get(category, 0)
-                )
-                category_leaders[category] = {
-                    'municipality': best_municipality[0],
-                    'score': best_municipality[1]['category_scores'].get(category, 0)
+            # カテゴリ別ベスト市町村（データのないカテゴリは0点として比較）
+            leaders = np.argmax(scores['category_scores'], axis=0)
+            category_leaders = {
+                category: {
+                    'municipality': municipalities[leaders[k]],
+                    'score': float(scores['category_scores'][leaders[k], k])
                 }
+                for k, category in enumerate(engine.categories)
+            }
             
             result = {
                 'rankings': rankings,
@@ -463,6 +578,212 @@ class LivabilityScorePredictor:
             logger.error(f"市町村比較エラー: {e}")
             raise
     
+    def cluster_municipalities(self,
+                               features: np.ndarray,
+                               feature_names: List[str],
+                               n_clusters: int = 6,
+                               batch_size: int = 1024,
+                               random_state: int = 42,
+                               typology_threshold: float = 0.5) -> Dict:
+        """
+        市町村の類型クラスタリング（標準化 + ミニバッチKMeans + 描画用PCA埋め込み）
+        
+        Args:
+            features: 市町村 × 特徴量 の行列（カテゴリー別スコアなど）
+            feature_names: 特徴量名（列順）
+            n_clusters: クラスタ数（上限。市町村数が少ない場合や空のクラスタは除く）
+            batch_size: ミニバッチサイズ
+            random_state: 乱数シード
+            typology_threshold: 類型の特徴とみなす標準化済み中心値の閾値
+            
+        Returns:
+            クラスタリング結果（labels, centers, embedding, clusters など）
+        """
+        try:
+            features = np.asarray(features, dtype=float)
+            n_samples, n_features = features.shape
+            if n_samples == 0:
+                raise ValueError("クラスタリング対象の市町村がありません")
+            n_clusters = min(n_clusters, n_samples)
+            logger.info(f"市町村クラスタリング開始: {n_samples}市町村, {n_clusters}クラスタ")
+            
+            scaler = StandardScaler()
+            standardized = scaler.fit_transform(features)
+            
+            kmeans = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                batch_size=batch_size,
+                n_init=3,
+                random_state=random_state
+            )
+            raw_labels = kmeans.fit_predict(standardized)
+            
+            # クラスタ番号を規模の大きい順に振り直す（再計算時に番号が入れ替わりにくくする）
+            # ミニバッチ学習で空になったクラスタは除く
+            raw_sizes = np.bincount(raw_labels, minlength=n_clusters)
+            kept = np.argsort(-raw_sizes, kind='stable')[:np.count_nonzero(raw_sizes)]
+            n_clusters = len(kept)
+            relabel = np.full(len(raw_sizes), -1)
+            relabel[kept] = np.arange(n_clusters)
+            labels = relabel[raw_labels]
+            centers_z = kmeans.cluster_centers_[kept]
+            sizes = raw_sizes[kept]
+            
+            # 描画用の2次元埋め込み
+            pca = PCA(n_components=min(2, n_features, n_samples))
+            embedding = pca.fit_transform(standardized)
+            center_embedding = pca.transform(centers_z)
+            
+            # 類型の特徴：全国平均から大きく外れる特徴量（標準化済み中心値の降順・昇順）
+            clusters = []
+            for k in range(n_clusters):
+                order = np.argsort(-centers_z[k], kind='stable')
+                clusters.append({
+                    'cluster': k,
+                    'size': int(sizes[k]),
+                    'high': [feature_names[j] for j in order if centers_z[k, j] >= typology_threshold],
+                    'low': [feature_names[j] for j in order[::-1] if centers_z[k, j] <= -typology_threshold]
+                })
+            
+            result = {
+                'labels': labels,
+                'centers': scaler.inverse_transform(centers_z),
+                'standardized_centers': centers_z,
+                'embedding': embedding,
+                'center_embedding': center_embedding,
+                'explained_variance_ratio': pca.explained_variance_ratio_,
+                'inertia': float(kmeans.inertia_),
+                'clusters': clusters
+            }
+            
+            logger.info(f"市町村クラスタリング完了: 規模 {sizes.tolist()}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"市町村クラスタリングエラー: {e}")
+            raise
+    
+    def partial_fit_weight_pca(self, category_scores: np.ndarray, chunk_size: int = 1000) -> int:
+        """
+        重み算出用の主成分分析をカテゴリスコア行列で逐次更新（IncrementalPCA）
+        
+        チャンクごとに partial_fit するため、全国データでもメモリ使用量はチャンクの大きさで抑えられ、
+        新しい年のデータは既存の学習結果に追加で学習できる（再学習不要）。
+        カテゴリスコアは 0-100 の共通尺度のため標準化せずに用いる。
+        
+        Args:
+            category_scores: 市町村 × カテゴリ のスコア行列（scoring_engine.categories 順）
+            chunk_size: partial_fit 1回あたりの行数
+            
+        Returns:
+            今回の入力から取り込んだ行数（主成分数に満たない端数は次回の呼び出しに持ち越して学習し、
+            持ち越した行は次回の戻り値には含めない。学習済みの累計は models['weight_pca'].n_samples_seen_）
+        """
+        try:
+            n_categories = len(self.scoring_engine.categories)
+            rows = np.asarray(category_scores, dtype=float).reshape(-1, n_categories)
+            n_input = len(rows)
+            if self._weight_pca_pending is not None:
+                rows = np.vstack([self._weight_pca_pending, rows])
+            
+            model = self.models.get('weight_pca')
+            if model is None or model.n_components_ != n_categories:
+                model = IncrementalPCA(n_components=n_categories)
+            
+            # partial_fit には主成分数以上の行が必要なため、端数は最後のチャンクに含める
+            chunk_size = max(chunk_size, n_categories)
+            start = 0
+            while len(rows) - start >= n_categories:
+                end = start + chunk_size
+                if len(rows) - end < n_categories:
+                    end = len(rows)
+                model.partial_fit(rows[start:end])
+                start = end
+            
+            self._weight_pca_pending = rows[start:] if start < len(rows) else None
+            if start > 0:
+                self.models['weight_pca'] = model
+            return n_input
+            
+        except Exception as e:
+            logger.error(f"重み算出用主成分分析の学習エラー: {e}")
+            raise
+    
+    def update_weight_pca(self,
+                          municipalities_data: Dict[str, Dict[str, Dict[str, float]]],
+                          chunk_size: int = 1000) -> Dict:
+        """
+        市町村別指標データで重み算出用の主成分分析を逐次更新
+        
+        市町村をチャンクに分けてカテゴリスコアを計算し、全カテゴリのデータがある市町村のみを
+        学習に用いる（新しい年のデータが揃ったときに追加で呼び出す）。
+        
+        Args:
+            municipalities_data: 市町村別指標データ
+            chunk_size: スコア計算・学習1回あたりの市町村数
+            
+        Returns:
+            学習に取り込んだ市町村数・欠損カテゴリのため除外した市町村数・累計学習件数
+        """
+        try:
+            logger.info(f"重み算出用主成分分析の更新開始: {len(municipalities_data)}市町村")
+            engine = self.scoring_engine
+            items = list(municipalities_data.items())
+            used = skipped = 0
+            for start in range(0, len(items), chunk_size):
+                scores = engine.score_municipalities(dict(items[start:start + chunk_size]))
+                complete = scores['category_present'].all(axis=1)
+                used += self.partial_fit_weight_pca(scores['category_scores'][complete], chunk_size)
+                skipped += int((~complete).sum())
+            
+            model = self.models.get('weight_pca')
+            result = {
+                'used_municipalities': used,
+                'skipped_municipalities': skipped,
+                'total_samples': int(model.n_samples_seen_) if model is not None else 0
+            }
+            logger.info(f"重み算出用主成分分析の更新完了: {result}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"重み算出用主成分分析の更新エラー: {e}")
+            raise
+    
+    def pca_weights(self, variance_threshold: float = 0.8) -> Dict[str, float]:
+        """
+        主成分分析に基づくカテゴリ重み
+        
+        累積寄与率が閾値に達するまでの上位主成分について、各カテゴリの負荷量の二乗を
+        寄与率で重み付けして合計し、合計1に正規化する。
+        
+        Args:
+            variance_threshold: 使用する主成分の累積寄与率の閾値
+            
+        Returns:
+            カテゴリ別重み
+        """
+        model = self.models.get('weight_pca')
+        if model is None:
+            raise ValueError("重み算出用の主成分分析が未学習です")
+        
+        ratios = model.explained_variance_ratio_
+        n_components = int(np.searchsorted(np.cumsum(ratios), variance_threshold - 1e-12)) + 1
+        n_components = min(n_components, len(ratios))
+        weights = ratios[:n_components] @ model.components_[:n_components] ** 2
+        weights = weights / weights.sum()
+        return dict(zip(self.scoring_engine.categories, weights.tolist()))
+    
+    def apply_pca_weights(self, variance_threshold: float = 0.8) -> Dict[str, float]:
+        """主成分分析に基づく重みをカテゴリ重みとして適用（reset_indicator_weights で既定値に戻す）"""
+        weights = self.pca_weights(variance_threshold)
+        self.indicator_weights = dict(weights)
+        logger.info(f"主成分分析に基づく重みを適用: {weights}")
+        return weights
+    
+    def reset_indicator_weights(self) -> None:
+        """カテゴリ重みを既定値に戻す"""
+        self.indicator_weights = dict(self._default_indicator_weights)
+    
     def save_models(self) -> None:
         """モデル・設定の保存"""
         try:
@@ -0,0 +1,188 @@
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import joblib
+
+logger = logging.getLogger(__name__)
+
+# 作業ディレクトリに依存しない既定の保存先（backend/data/models）
+DEFAULT_MODEL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "models"
+)
+
+
+class ModelRegistry:
+    """バージョン管理付きモデルレジストリ
+    
+    保存形式:
+        <root_dir>/<namespace>/<version>/<model_name>.joblib
+        <root_dir>/<namespace>/<version>/metadata.json
+        <root_dir>/<namespace>/ACTIVE  （有効バージョン名）
+    
+    モデルは非圧縮で保存するため、numpy配列を多く含むモデルは
+    mmap_modeで読み込むとワーカー間でページキャッシュを共有できる。
+    """
+    
+    ACTIVE_FILE = "ACTIVE"
+    METADATA_FILE = "metadata.json"
+    
+    def __init__(self, root_dir: Optional[str] = None):
+        self.root_dir = os.path.abspath(root_dir or DEFAULT_MODEL_DIR)
+    
+    def register(self,
+                 namespace: str,
+                 models: Dict[str, Any],
+                 metadata: Optional[Dict[str, Any]] = None,
+                 activate: bool = True) -> str:
+        """
+        モデル群を新バージョンとして登録
+        
+        Args:
+            namespace: モデル種別（例: "population"）
+            models: モデル名 → モデルオブジェクト
+            metadata: 追加メタデータ（training_data_version, metrics 等）
+            activate: 登録後に有効バージョンへ切り替えるか
+        
+        Returns:
+            登録されたバージョン名
+        """
+        try:
+            namespace_dir = os.path.join(self.root_dir, namespace)
+            os.makedirs(namespace_dir, exist_ok=True)
+            
+            version = datetime.now().strftime("%Y%m%d%H%M%S%f")
+            staging_dir = os.path.join(namespace_dir, f".staging-{version}")
+            os.makedirs(staging_dir)
+            
+            # 一時ディレクトリに書き出してからリネームし、書き込み途中のバージョンを見せない
+            model_info = {}
+            for model_name, model in models.items():
+                file_name = f"{model_name}.joblib"
+                file_path = os.path.join(staging_dir, file_name)
+                joblib.dump(model, file_path, compress=0)
+                model_info[model_name] = {
+                    "file": file_name,
+                    "type": type(model).__name__,
+                    "size_bytes": os.path.getsize(file_path)
+                }
+            
+            metadata = dict(metadata or {})
+            version_metadata = {
+                "version": version,
+                "namespace": namespace,
+                "created_at": datetime.now().isoformat(),
+                "training_data_version": metadata.pop("training_data_version", None),
+                "metrics": metadata.pop("metrics", {}),
+                "models": model_info,
+                "total_size_bytes": sum(info["size_bytes"] for info in model_info.values()),
+                **metadata
+            }
+            self._write_json(os.path.join(staging_dir, self.METADATA_FILE), version_metadata)
+            
+            os.rename(staging_dir, os.path.join(namespace_dir, version))
+            logger.info(f"モデル登録完了: {namespace}/{version}")
+            
+            if activate:
+                self.activate(namespace, version)
+            
+            return version
+        
+        except Exception as e:
+            logger.error(f"モデル登録エラー: {e}")
+            raise
+    
+    def activate(self, namespace: str, version: str) -> None:
+        """有効バージョンをアトミックに切り替える（登録済みのバージョンのみ）"""
+        self._check_version(namespace, version)
+        
+        active_path = os.path.join(self.root_dir, namespace, self.ACTIVE_FILE)
+        tmp_path = f"{active_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, active_path)
+        logger.info(f"有効モデル切替: {namespace}/{version}")
+    
+    def get_active_version(self, namespace: str) -> Optional[str]:
+        """有効バージョン名を取得（未登録ならNone）"""
+        active_path = os.path.join(self.root_dir, namespace, self.ACTIVE_FILE)
+        try:
+            with open(active_path, encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def list_versions(self, namespace: str) -> List[Dict[str, Any]]:
+        """登録済みバージョンのメタデータ一覧（新しい順）"""
+        return [self.get_metadata(namespace, version) for version in self._version_names(namespace)]
+    
+    def _version_names(self, namespace: str) -> List[str]:
+        """登録済みバージョン名（新しい順）。書き込み途中の .staging-* やメタデータのないディレクトリは除く"""
+        namespace_dir = os.path.join(self.root_dir, namespace)
+        if not os.path.isdir(namespace_dir):
+            return []
+        
+        return sorted(
+            (name for name in os.listdir(namespace_dir)
+             if not name.startswith(".")
+             and os.path.isfile(os.path.join(namespace_dir, name, self.METADATA_FILE))),
+            reverse=True
+        )
+    
+    def _check_version(self, namespace: str, version: str) -> None:
+        """登録済みのバージョン名か確認（"..", パス区切りを含む名前なども拒否）"""
+        if not version or version not in self._version_names(namespace):
+            raise ValueError(f"モデルバージョンが見つかりません: {namespace}/{version}")
+    
+    def get_metadata(self, namespace: str, version: Optional[str] = None) -> Dict[str, Any]:
+        """バージョンのメタデータを取得（省略時は有効バージョン）"""
+        version = version or self.get_active_version(namespace)
+        if version is None:
+            raise ValueError(f"有効なモデルバージョンがありません: {namespace}")
+        self._check_version(namespace, version)
+        
+        with open(os.path.join(self.root_dir, namespace, version, self.METADATA_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    
+    def update_metadata(self, namespace: str, version: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """バージョンのメタデータを更新（モデル本体は変更しない）"""
+        metadata = self.get_metadata(namespace, version)
+        metadata.update(updates)
+        self._write_json(os.path.join(self.root_dir, namespace, version, self.METADATA_FILE), metadata)
+        return metadata
+    
+    def load(self,
+             namespace: str,
+             version: Optional[str] = None,
+             mmap_mode: Optional[str] = "c") -> Tuple[str, Dict[str, Any]]:
+        """
+        モデル群の読み込み
+        
+        Args:
+            namespace: モデル種別
+            version: バージョン（省略時は有効バージョン）
+            mmap_mode: joblibのmmapモード（Noneで全量読み込み）。
+                既定の"c"（コピーオンライト）は書き込みまでページを共有しつつ、
+                書き込み可能な配列を要求するライブラリ（statsmodels等）でも動作する
+        
+        Returns:
+            (バージョン名, モデル名 → モデルオブジェクト)
+        """
+        metadata = self.get_metadata(namespace, version)
+        version_dir = os.path.join(self.root_dir, namespace, metadata["version"])
+        
+        models = {}
+        for model_name, info in metadata["models"].items():
+            models[model_name] = joblib.load(os.path.join(version_dir, info["file"]), mmap_mode=mmap_mode)
+        
+        logger.info(f"モデル読み込み完了: {namespace}/{metadata['version']} ({len(models)}モデル)")
+        return metadata["version"], models
+    
+    @staticmethod
+    def _write_json(path: str, data: Dict[str, Any]) -> None:
+        """JSONファイルのアトミック書き込み"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, path)
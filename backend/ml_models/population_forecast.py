@@ -2,28 +2,114 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple, Union
 import logging
+import copy
+import hashlib
+import json
 from datetime import datetime, timedelta
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.model_selection import TimeSeriesSplit, GridSearchCV
+from sklearn.model_selection import TimeSeriesSplit
 import xgboost as xgb
 from statsmodels.tsa.arima.model import ARIMA
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
 import joblib
+from joblib import Parallel, delayed
+import time
 import warnings
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .feature_store import PopulationFeatureStore
+from .model_registry import ModelRegistry
 
 warnings.filterwarnings('ignore')
 logger = logging.getLogger(__name__)
 
+
+def _fit_predict_fold(estimator, X_train: pd.DataFrame, y_train: pd.Series,
+                      X_test: pd.DataFrame) -> np.ndarray:
+    """交差検証1フォールド分の学習・予測（joblibワーカーで実行）"""
+    estimator.fit(X_train, y_train)
+    return estimator.predict(X_test)
+
+
+def _bootstrap_error_paths(residuals: np.ndarray, horizon: int,
+                           n_replicates: int, seed: int) -> np.ndarray:
+    """残差ブートストラップによる累積誤差パス（プロセスプールで実行）"""
+    rng = np.random.default_rng(seed)
+    # 再帰予測では誤差が累積するため、各ステップの残差を再標本化して累積和を取る
+    samples = rng.choice(residuals, size=(n_replicates, horizon), replace=True)
+    return np.cumsum(samples, axis=1)
+
+
 class PopulationPredictor:
     """人口動態予測モデルクラス"""
     
-    def __init__(self, model_dir: str = "backend/data/models"):
-        self.model_dir = model_dir
+    REGISTRY_NAMESPACE = "population"
+    QUANTILE_SUFFIX = "_quantile"
+    HISTORY_ARTIFACT = "feature_history"  # 再帰予測の起点となる学習データ
+    
+    # 特徴量設定
+    FEATURE_LAGS = [1, 2, 3, 5]
+    FEATURE_WINDOWS = [3, 5, 10]
+    
+    # ハイパーパラメータ探索空間（n_estimators は逐次半減法のリソースとして扱う）
+    TUNING_SPACES = {
+        'xgboost': {
+            'max_depth': [3, 4, 6, 8],
+            'learning_rate': [0.03, 0.05, 0.1, 0.2],
+            'subsample': [0.6, 0.8, 1.0],
+            'colsample_bytree': [0.6, 0.8, 1.0],
+            'min_child_weight': [1, 3, 5]
+        },
+        'random_forest': {
+            'max_depth': [5, 10, 20, None],
+            'min_samples_split': [2, 5, 10],
+            'min_samples_leaf': [1, 2, 4],
+            'max_features': [1.0, 0.5, 'sqrt']
+        }
+    }
+    
+    def __init__(self, model_dir: Optional[str] = None, n_jobs: int = -1,
+                 registry_poll_interval: float = 5.0):
+        self.registry = ModelRegistry(model_dir)
+        self.model_dir = self.registry.root_dir
+        self.n_jobs = n_jobs  # 交差検証の並列数（-1で全コア）
         self.models = {}
         self.scalers = {}
         self.feature_columns = []
+        self.feature_store = PopulationFeatureStore(lags=self.FEATURE_LAGS, windows=self.FEATURE_WINDOWS)
+        
+        # モデルバージョン管理（学習データ版・評価指標はレジストリのメタデータに記録）
+        self.model_version = None
+        self.training_data_version = None
+        self.training_metrics = {}
+        self.registry_poll_interval = registry_poll_interval
+        self._last_registry_check = 0.0
+        
+        # 予測区間推定（分位点モデル・交差検証残差・ブートストラップ設定）
+        self.quantile_models = {}
+        self.residuals = {}
+        self.interval_configs = {
+            'alpha': 0.1,               # 90%予測区間
+            'fit_quantile_models': True,
+            'n_bootstrap': 2000,
+            'chunk_size': 250,          # ワーカー1タスクあたりの複製数
+            'time_budget': 0.2,         # 区間推定に使える時間（秒）
+            'max_workers': 2
+        }
+        self._interval_executor = None
+        
+        # アンサンブル設定（構成モデルの重みと並行予測用スレッドプール）
+        self.ensemble_weights = {'arima': 0.3, 'xgboost': 0.4, 'random_forest': 0.3}
+        self._ensemble_executor = None
+        self._executor_lock = threading.Lock()
+        
+        # 交差検証フォールド予測のキャッシュ（データ・パラメータのハッシュをキーとする）
+        self._fold_cache = {}
+        self._fold_cache_max_entries = 32
         
         # モデル設定
         self.model_configs = {
@@ -44,55 +130,64 @@ class PopulationPredictor:
             }
         }
         
+        # ハイパーパラメータ探索設定（木の数を min_resources から factor 倍ずつ増やし、上位 1/factor を残す）
+        self.tuning_configs = {
+            'n_splits': 5,
+            'factor': 3,
+            'min_resources': 20,
+            'max_resources': 540,
+            'n_candidates': 'exhaust',
+            'random_state': 42
+        }
+        self.tuned_configs = {}  # 探索で得た最良設定（レジストリに記録し、読み込み時に反映）
+        
+        # 増分更新設定（XGBoostの追加ブースティング回数・学習窓、Random Forestの追加木数）
+        self.incremental_configs = {
+            'xgboost_rounds': 20,
+            'xgboost_window': 24,       # 直近の期間数（全系列の該当期間の行を使用）
+            'random_forest_trees': 10
+        }
+        
+        # 政策効果の係数（例：子育て支援政策で出生率+10%、移住支援で転入+5%等）
+        self.policy_effect_coefficients = {
+            'childcare_support': 0.1,  # 子育て支援
+            'migration_support': 0.05,  # 移住支援
+            'economic_development': 0.03,  # 経済活性化
+            'senior_support': -0.02  # 高齢者支援（直接的な人口増加効果は限定的）
+        }
+        
     def prepare_features(self, df: pd.DataFrame, 
                         target_column: str = 'population',
-                        date_column: str = 'date') -> Tuple[pd.DataFrame, pd.Series]:
+                        date_column: str = 'date',
+                        data_version: Optional[str] = None) -> Tuple[pd.DataFrame, pd.Series]:
         """
         予測用特徴量準備
         
+        特徴量ストアに委譲し、同一データの再計算を避ける。
+        municipality_code 列があれば市町村ごとの系列として一括計算する。
+        
         Args:
             df: 入力データフレーム
             target_column: 目的変数列名
             date_column: 日付列名
+            data_version: データバージョン（省略時は内容ハッシュ）
             
         Returns:
-            特徴量データフレームと目的変数シリーズ
+            特徴量データフレームと目的変数シリーズ（系列・日付順）
         """
         try:
-            df_processed = df.copy()
-            
-            # 日付特徴量
-            if date_column in df_processed.columns:
-                df_processed[date_column] = pd.to_datetime(df_processed[date_column])
-                df_processed['year'] = df_processed[date_column].dt.year
-                df_processed['month'] = df_processed[date_column].dt.month
-                df_processed['quarter'] = df_processed[date_column].dt.quarter
-            
-            # ラグ特徴量
-            for lag in [1, 2, 3, 5]:
-                df_processed[f'{target_column}_lag_{lag}'] = df_processed[target_column].shift(lag)
+            store = self.feature_store
+            if store.target_column != target_column or store.date_column != date_column:
+                store = PopulationFeatureStore(
+                    target_column=target_column,
+                    date_column=date_column,
+                    lags=self.FEATURE_LAGS,
+                    windows=self.FEATURE_WINDOWS
+                )
+                self.feature_store = store
             
-            # 移動平均特徴量
-            for window in [3, 5, 10]:
-                df_processed[f'{target_column}_ma_{window}'] = df_processed[target_column].rolling(window=window).mean()
-                df_processed[f'{target_column}_std_{window}'] = df_processed[target_column].rolling(window=window).std()
-            
-            # 人口増減率
-            df_processed[f'{target_column}_pct_change'] = df_processed[target_column].pct_change()
-            df_processed[f'{target_column}_diff'] = df_processed[target_column].diff()
-            
-            # トレンド特徴量
-            df_processed['trend'] = np.arange(len(df_processed))
-            df_processed['trend_squared'] = df_processed['trend'] ** 2
-            
-            # 特徴量列選択
-            feature_columns = [col for col in df_processed.columns 
-                             if col not in [target_column, date_column] and not col.startswith('Unnamed')]
-            
-            X = df_processed[feature_columns].fillna(method='bfill').fillna(method='ffill')
-            y = df_processed[target_column]
-            
-            self.feature_columns = feature_columns
+            X, y = store.get_features(df, data_version=data_version)
+            self.feature_columns = store.feature_columns
             
             logger.info(f"特徴量準備完了: {X.shape[1]}個の特徴量")
             return X, y
@@ -101,6 +196,26 @@ class PopulationPredictor:
             logger.error(f"特徴量準備エラー: {e}")
             raise
     
+    def append_feature_rows(self, new_rows: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        新規データ行の特徴量を末尾のみ再計算して追加
+        
+        直前の prepare_features の結果を再利用し、ラグ・移動窓に必要な
+        過去行と新規行だけを対象に特徴量を計算する。
+        
+        Args:
+            new_rows: 追加するデータ行（prepare_featuresの入力と同じ列構成）
+            
+        Returns:
+            全期間の特徴量データフレームと目的変数シリーズ
+        """
+        try:
+            return self.feature_store.append(new_rows)
+            
+        except Exception as e:
+            logger.error(f"特徴量末尾更新エラー: {e}")
+            raise
+    
     def fit_arima(self, data: pd.Series, order: Tuple[int, int, int] = (2, 1, 2)) -> Dict:
         """
         ARIMAモデルの学習
@@ -132,8 +247,9 @@ class PopulationPredictor:
             mse = mean_squared_error(test_data, forecast)
             rmse = np.sqrt(mse)
             
-            # モデル保存
-            self.models['arima'] = fitted_model
+            # モデル保存（予測の起点を系列末尾にするため、評価期間の観測値をパラメータ固定で追加）
+            self.models['arima'] = fitted_model.append(test_data, refit=False) if len(test_data) else fitted_model
+            self.training_metrics['arima'] = {'mae': mae, 'rmse': rmse, 'aic': fitted_model.aic}
             
             result = {
                 'model': fitted_model,
@@ -167,32 +283,39 @@ class PopulationPredictor:
         try:
             logger.info("XGBoostモデル学習開始")
             
-            # 時系列分割
-            tscv = TimeSeriesSplit(n_splits=5)
-            
             # モデル定義
             model = xgb.XGBRegressor(**self.model_configs['xgboost'])
             
-            # 交差検証
-            cv_scores = []
-            for train_idx, test_idx in tscv.split(X):
-                X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
-                y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
-                
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
-                
-                mae = mean_absolute_error(y_test, y_pred)
-                cv_scores.append(mae)
+            # 時系列交差検証（日付順に並べ替えてフォールド並列実行）
+            X_cv, y_cv = self._time_ordered(X, y)
+            folds = self._cross_validate_folds('xgboost', model, X_cv, y_cv)
+            cv_scores = [mean_absolute_error(y_cv.iloc[test_idx], y_pred) for test_idx, y_pred in folds]
+            self.residuals['xgboost'] = self._out_of_fold_residuals(y_cv, folds)
             
             # 全データで再学習
             model.fit(X, y)
             
+            # 予測区間用の分位点回帰モデル（下限・上限を1モデルで同時学習）
+            if self.interval_configs['fit_quantile_models']:
+                alpha = self.interval_configs['alpha']
+                quantile_model = xgb.XGBRegressor(
+                    **self.model_configs['xgboost'],
+                    objective='reg:quantileerror',
+                    quantile_alpha=np.array([alpha / 2, 1 - alpha / 2])
+                )
+                quantile_model.fit(X, y)
+                self.quantile_models['xgboost'] = quantile_model
+            
             # 特徴量重要度
             feature_importance = dict(zip(X.columns, model.feature_importances_))
             
             # モデル保存
             self.models['xgboost'] = model
+            self.training_data_version = self._hash_data(X, y)[:16]
+            self.training_metrics['xgboost'] = {
+                'cv_mae_mean': float(np.mean(cv_scores)),
+                'cv_mae_std': float(np.std(cv_scores))
+            }
             
             result = {
                 'model': model,
@@ -222,23 +345,14 @@ class PopulationPredictor:
         try:
             logger.info("Random Forestモデル学習開始")
             
-            # 時系列分割
-            tscv = TimeSeriesSplit(n_splits=5)
-            
             # モデル定義
             model = RandomForestRegressor(**self.model_configs['random_forest'])
             
-            # 交差検証
-            cv_scores = []
-            for train_idx, test_idx in tscv.split(X):
-                X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
-                y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
-                
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
-                
-                mae = mean_absolute_error(y_test, y_pred)
-                cv_scores.append(mae)
+            # 時系列交差検証（日付順に並べ替えてフォールド並列実行）
+            X_cv, y_cv = self._time_ordered(X, y)
+            folds = self._cross_validate_folds('random_forest', model, X_cv, y_cv)
+            cv_scores = [mean_absolute_error(y_cv.iloc[test_idx], y_pred) for test_idx, y_pred in folds]
+            self.residuals['random_forest'] = self._out_of_fold_residuals(y_cv, folds)
             
             # 全データで再学習
             model.fit(X, y)
@@ -248,6 +362,11 @@ class PopulationPredictor:
             
             # モデル保存
             self.models['random_forest'] = model
+            self.training_data_version = self._hash_data(X, y)[:16]
+            self.training_metrics['random_forest'] = {
+                'cv_mae_mean': float(np.mean(cv_scores)),
+                'cv_mae_std': float(np.std(cv_scores))
+            }
             
             result = {
                 'model': model,
@@ -263,10 +382,439 @@ class PopulationPredictor:
             logger.error(f"Random Forestモデル学習エラー: {e}")
             raise
     
+    @property
+    def last_observed_date(self) -> Optional[pd.Timestamp]:
+        """特徴量キャッシュ上の最終観測日（増分更新の起点）"""
+        store = self.feature_store
+        if store.source is None or store.date_column not in store.source.columns:
+            return None
+        return pd.to_datetime(store.source[store.date_column]).max()
+    
+    def update_models_with_new_data(self, new_rows: pd.DataFrame) -> Dict:
+        """
+        新規データ（例：新年度の統計値）による学習済みモデルの増分更新
+        
+        - ARIMA: 新規観測値を結果オブジェクトに追加（パラメータ再推定なし）
+        - XGBoost: 既存ブースターから直近窓（全系列の直近 xgboost_window 期間）のデータで追加ブースティング
+        - Random Forest: warm_startで木を追加（既存の木は再学習しない）
+        - 特徴量: 末尾のみ再計算
+        
+        更新後のモデルは新しい辞書として差し替えるため、処理中の予測には影響しない。
+        
+        Args:
+            new_rows: 追加データ行（prepare_featuresの入力と同じ列構成）
+            
+        Returns:
+            モデル別の更新結果（所要時間・状態）
+        """
+        try:
+            logger.info(f"増分モデル更新開始: {len(new_rows)}行")
+            
+            update_results = {}
+            models = dict(self.models)
+            
+            # 特徴量の末尾更新
+            start = time.perf_counter()
+            X, y = self.append_feature_rows(new_rows)
+            update_results['features'] = {'status': 'updated', 'seconds': time.perf_counter() - start}
+            
+            target_column = self.feature_store.target_column
+            date_column = self.feature_store.date_column
+            
+            if 'arima' in models:
+                start = time.perf_counter()
+                arima_results = models['arima']
+                source = self.feature_store.source
+                
+                # ARIMAは学習時の系列末尾以降の観測値を追加（学習時に除いた検証期間も含む）
+                observations = pd.Series(
+                    source[target_column].values,
+                    name=getattr(arima_results.model.data.orig_endog, 'name', None)
+                )
+                if date_column in source.columns:
+                    observations.index = pd.DatetimeIndex(
+                        pd.to_datetime(source[date_column]),
+                        freq=getattr(arima_results.model._index, 'freq', None)
+                    )
+                new_observations = observations.iloc[int(arima_results.nobs):]
+                
+                # パラメータは固定のまま観測値のみ追加
+                models['arima'] = arima_results.append(new_observations, refit=False)
+                update_results['arima'] = {'status': 'appended', 'seconds': time.perf_counter() - start}
+            
+            if 'xgboost' in models:
+                start = time.perf_counter()
+                X_recent, y_recent = self._recent_rows(X, y, self.incremental_configs['xgboost_window'])
+                booster_model = clone(models['xgboost']).set_params(
+                    n_estimators=self.incremental_configs['xgboost_rounds']
+                )
+                # 既存ブースターを初期値として追加ラウンドのみ学習
+                booster_model.fit(X_recent, y_recent, xgb_model=models['xgboost'].get_booster())
+                models['xgboost'] = booster_model
+                
+                # 分位点モデルも同様に追加ブースティング
+                if 'xgboost' in self.quantile_models:
+                    quantile_model = clone(self.quantile_models['xgboost']).set_params(
+                        n_estimators=self.incremental_configs['xgboost_rounds']
+                    )
+                    quantile_model.fit(X_recent, y_recent,
+                                       xgb_model=self.quantile_models['xgboost'].get_booster())
+                    self.quantile_models = {**self.quantile_models, 'xgboost': quantile_model}
+                update_results['xgboost'] = {'status': 'boosted', 'seconds': time.perf_counter() - start}
+            
+            if 'random_forest' in models:
+                start = time.perf_counter()
+                forest = copy.deepcopy(models['random_forest'])
+                forest.set_params(
+                    warm_start=True,
+                    n_estimators=forest.n_estimators + self.incremental_configs['random_forest_trees']
+                )
+                forest.fit(X, y)
+                models['random_forest'] = forest
+                update_results['random_forest'] = {'status': 'trees_added', 'seconds': time.perf_counter() - start}
+            
+            self.models = models
+            self.training_data_version = self._hash_data(X, y)[:16]
+            
+            logger.info(f"増分モデル更新完了: {list(update_results.keys())}")
+            return update_results
+            
+        except Exception as e:
+            logger.error(f"増分モデル更新エラー: {e}")
+            raise
+    
+    def _cross_validate_folds(self, model_name: str, estimator,
+                              X: pd.DataFrame, y: pd.Series,
+                              n_splits: int = 5) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        時系列交差検証のフォールド予測（並列実行・キャッシュ付き）
+        
+        X・y は _time_ordered で日付順に並べ替えたものを渡す（返すテストインデックスはその行位置）。
+        各フォールドは推定器のクローンで学習するため、渡された推定器は変更されない。
+        同一データ・同一パラメータの結果はキャッシュから返す。
+        
+        Args:
+            model_name: モデル名
+            estimator: 推定器（パラメータのテンプレートとして使用）
+            X: 特徴量データフレーム
+            y: 目的変数シリーズ
+            n_splits: 分割数
+            
+        Returns:
+            (テストインデックス, 予測値) のフォールド別リスト
+        """
+        cache_key = (model_name, self._hash_data(X, y), self._hash_params(estimator), n_splits)
+        if cache_key in self._fold_cache:
+            logger.info(f"交差検証キャッシュ使用: {model_name}")
+            return self._fold_cache[cache_key]
+        
+        splits = self._time_series_splits(X, n_splits)
+        predictions = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_predict_fold)(
+                clone(estimator), X.iloc[train_idx], y.iloc[train_idx], X.iloc[test_idx]
+            )
+            for train_idx, test_idx in splits
+        )
+        folds = [(test_idx, np.asarray(y_pred)) for (_, test_idx), y_pred in zip(splits, predictions)]
+        
+        # 古いエントリから破棄してキャッシュサイズを制限
+        if len(self._fold_cache) >= self._fold_cache_max_entries:
+            self._fold_cache.pop(next(iter(self._fold_cache)))
+        self._fold_cache[cache_key] = folds
+        
+        return folds
+    
+    def tune_hyperparameters(self, X: pd.DataFrame, y: pd.Series,
+                             model_types: Optional[List[str]] = None,
+                             persist: bool = True) -> Dict:
+        """
+        逐次半減法によるハイパーパラメータ探索
+        
+        TUNING_SPACES からランダムに候補を生成し、少ない木の数で全候補を評価したのち
+        上位候補だけに木を追加して評価を繰り返す（見込みのない候補は早期に打ち切る）。
+        評価は TimeSeriesSplit、候補・フォールドの学習は n_jobs で並列実行する。
+        
+        Args:
+            X: 特徴量データフレーム
+            y: 目的変数シリーズ
+            model_types: 探索対象（省略時は xgboost, random_forest）
+            persist: 最良設定を有効バージョンのレジストリメタデータに記録するか
+            
+        Returns:
+            モデル別の探索結果（最良パラメータ・CV MAE・候補数等）
+        """
+        # sklearn の逐次半減探索は experimental 扱いのため明示的に有効化が必要
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingRandomSearchCV
+        
+        try:
+            model_types = model_types or ['xgboost', 'random_forest']
+            configs = self.tuning_configs
+            X_ordered, y_ordered = self._time_ordered(X, y)
+            
+            tuning_results = {}
+            for model_type in model_types:
+                if model_type not in self.TUNING_SPACES:
+                    raise ValueError(f"探索空間が定義されていないモデルです: {model_type}")
+                
+                start = time.perf_counter()
+                base_params = {k: v for k, v in self.model_configs[model_type].items() if k != 'n_estimators'}
+                # 並列化は探索側で行うため、推定器自体はシングルスレッドにする
+                if model_type == 'xgboost':
+                    estimator = xgb.XGBRegressor(**base_params, n_jobs=1)
+                else:
+                    estimator = RandomForestRegressor(**base_params, n_jobs=1)
+                
+                search = HalvingRandomSearchCV(
+                    estimator,
+                    self.TUNING_SPACES[model_type],
+                    n_candidates=configs['n_candidates'],
+                    factor=configs['factor'],
+                    resource='n_estimators',
+                    min_resources=configs['min_resources'],
+                    max_resources=configs['max_resources'],
+                    cv=self._time_series_splits(X_ordered, configs['n_splits']),
+                    scoring='neg_mean_absolute_error',
+                    refit=False,
+                    n_jobs=self.n_jobs,
+                    random_state=configs['random_state']
+                )
+                search.fit(X_ordered, y_ordered)
+                
+                best_params = dict(search.best_params_)
+                self.model_configs[model_type].update(best_params)
+                self.tuned_configs[model_type] = best_params
+                tuning_results[model_type] = {
+                    'best_params': best_params,
+                    'cv_mae': float(-search.best_score_),
+                    'n_candidates': int(search.n_candidates_[0]),
+                    'n_iterations': int(search.n_iterations_),
+                    'resources': [int(r) for r in search.n_resources_],
+                    'seconds': time.perf_counter() - start
+                }
+                logger.info(
+                    f"ハイパーパラメータ探索完了: {model_type}, MAE={tuning_results[model_type]['cv_mae']:.2f}, "
+                    f"候補数={tuning_results[model_type]['n_candidates']}"
+                )
+            
+            if persist:
+                self._persist_tuned_configs(tuning_results)
+            
+            return tuning_results
+            
+        except Exception as e:
+            logger.error(f"ハイパーパラメータ探索エラー: {e}")
+            raise
+    
+    def _persist_tuned_configs(self, tuning_results: Dict) -> None:
+        """探索結果を有効バージョンのメタデータに記録（次回読み込み時に model_configs へ反映）"""
+        version = self.registry.get_active_version(self.REGISTRY_NAMESPACE)
+        if version is None:
+            logger.warning("有効なモデルバージョンがないため、探索結果は次回の save_models で記録されます")
+            return
+        
+        metadata = self.registry.get_metadata(self.REGISTRY_NAMESPACE, version)
+        self.registry.update_metadata(self.REGISTRY_NAMESPACE, version, {
+            'tuned_configs': {**metadata.get('tuned_configs', {}), **self.tuned_configs},
+            'tuning': {**metadata.get('tuning', {}), **tuning_results},
+            'tuned_at': datetime.now().isoformat()
+        })
+        logger.info(f"探索結果をレジストリに記録: {self.REGISTRY_NAMESPACE}/{version}")
+    
+    def _row_dates(self, X: pd.DataFrame) -> Optional[np.ndarray]:
+        """特徴量の各行の日付（特徴量ストアの入力データと対応しない場合は None）"""
+        source = self.feature_store.source
+        date_column = self.feature_store.date_column
+        if (source is None or len(source) != len(X) or date_column not in source.columns
+                or not X.index.isin(source.index).all()):
+            return None
+        return pd.to_datetime(source[date_column]).loc[X.index].to_numpy()
+    
+    def _time_ordered(self, X: pd.DataFrame, y: pd.Series) -> Tuple[pd.DataFrame, pd.Series]:
+        """時系列分割用に行を日付順へ並べ替え（特徴量ストアは系列・日付順で保持しているため）"""
+        dates = self._row_dates(X)
+        if dates is None:
+            return X, y
+        
+        order = np.argsort(dates, kind='stable')
+        return X.iloc[order], y.iloc[order]
+    
+    def _time_series_splits(self, X: pd.DataFrame, n_splits: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        日付単位の時系列分割
+        
+        複数系列の場合も同じ日付の行を同じフォールドに入れ、検証期間が常に学習期間より後になるようにする。
+        日付が分からない場合は行位置で分割する。
+        
+        Args:
+            X: 日付順に並べ替えた特徴量データフレーム
+            n_splits: 分割数
+            
+        Returns:
+            (学習インデックス, テストインデックス) のフォールド別リスト
+        """
+        dates = self._row_dates(X)
+        if dates is None:
+            return list(TimeSeriesSplit(n_splits=n_splits).split(X))
+        
+        unique_dates = np.unique(dates)
+        return [
+            (np.flatnonzero(np.isin(dates, unique_dates[train_dates])),
+             np.flatnonzero(np.isin(dates, unique_dates[test_dates])))
+            for train_dates, test_dates in TimeSeriesSplit(n_splits=n_splits).split(unique_dates)
+        ]
+    
+    def _recent_rows(self, X: pd.DataFrame, y: pd.Series, n_periods: int) -> Tuple[pd.DataFrame, pd.Series]:
+        """全系列のうち直近 n_periods 期間の日付に該当する行（日付が分からない場合は末尾 n_periods 行）"""
+        dates = self._row_dates(X)
+        if dates is None:
+            return X.iloc[-n_periods:], y.iloc[-n_periods:]
+        
+        recent = dates >= np.unique(dates)[-n_periods:][0]
+        return X[recent], y[recent]
+    
+    @staticmethod
+    def _hash_data(X: pd.DataFrame, y: pd.Series) -> str:
+        """特徴量・目的変数の内容ハッシュ"""
+        digest = hashlib.sha1()
+        digest.update(pd.util.hash_pandas_object(X, index=True).values.tobytes())
+        digest.update(pd.util.hash_pandas_object(y, index=True).values.tobytes())
+        digest.update(','.join(map(str, X.columns)).encode())
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _hash_params(estimator) -> str:
+        """推定器のパラメータハッシュ"""
+        params = json.dumps(estimator.get_params(), sort_keys=True, default=str)
+        return hashlib.sha1(f"{type(estimator).__name__}:{params}".encode()).hexdigest()
+    
+    @staticmethod
+    def _out_of_fold_residuals(y: pd.Series,
+                               folds: List[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        """交差検証フォールドの予測残差（実測 - 予測）"""
+        return np.concatenate([y.iloc[test_idx].values - y_pred for test_idx, y_pred in folds])
+    
+    def predict_quantiles(self, model_type: str, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        特徴量に対する予測区間（分位点）
+        
+        XGBoostは分位点回帰モデル、Random Forestは決定木ごとの予測分布から算出する。
+        
+        Args:
+            model_type: "xgboost" または "random_forest"
+            X: 特徴量データフレーム
+            
+        Returns:
+            (下限, 上限)
+        """
+        alpha = self.interval_configs['alpha']
+        
+        if model_type == 'xgboost' and 'xgboost' in self.quantile_models:
+            bounds = np.sort(np.asarray(self.quantile_models['xgboost'].predict(X)).reshape(len(X), -1), axis=1)
+            return bounds[:, 0], bounds[:, -1]
+        
+        if model_type == 'random_forest' and 'random_forest' in self.models:
+            values = X.values if isinstance(X, pd.DataFrame) else X
+            tree_predictions = np.stack([tree.predict(values) for tree in self.models['random_forest'].estimators_])
+            return (np.quantile(tree_predictions, alpha / 2, axis=0),
+                    np.quantile(tree_predictions, 1 - alpha / 2, axis=0))
+        
+        raise ValueError(f"分位点予測に対応していないモデルです: {model_type}")
+    
+    def bootstrap_prediction_intervals(self, model_type: str,
+                                       forecast: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        交差検証残差の並列ブートストラップによる予測区間
+        
+        複製をチャンクに分けてプロセスプールで実行し、time_budget 内に完了した
+        チャンクだけで分位点を求める。1チャンクも完了しない場合は残差の標準偏差に
+        基づく正規近似にフォールバックする。
+        
+        Args:
+            model_type: モデル種別
+            forecast: 点予測（予測期間分）
+            
+        Returns:
+            (下限, 上限)
+        """
+        if model_type not in self.residuals:
+            raise ValueError(f"残差が記録されていません: {model_type}")
+        
+        residuals = np.asarray(self.residuals[model_type], dtype=float)
+        forecast = np.asarray(forecast, dtype=float)
+        horizon = len(forecast)
+        alpha = self.interval_configs['alpha']
+        chunk_size = self.interval_configs['chunk_size']
+        n_chunks = max(1, self.interval_configs['n_bootstrap'] // chunk_size)
+        
+        with self._executor_lock:
+            if self._interval_executor is None:
+                self._interval_executor = ProcessPoolExecutor(max_workers=self.interval_configs['max_workers'])
+        
+        deadline = time.monotonic() + self.interval_configs['time_budget']
+        pending = {
+            self._interval_executor.submit(_bootstrap_error_paths, residuals, horizon, chunk_size, seed)
+            for seed in range(n_chunks)
+        }
+        
+        # 時間予算内に完了したチャンクのみ集計
+        completed_paths = []
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            completed_paths.extend(future.result() for future in done)
+        for future in pending:
+            future.cancel()
+        
+        if completed_paths:
+            error_paths = np.vstack(completed_paths)
+            lower = forecast + np.quantile(error_paths, alpha / 2, axis=0)
+            upper = forecast + np.quantile(error_paths, 1 - alpha / 2, axis=0)
+        else:
+            logger.warning("ブートストラップが時間予算内に完了しなかったため正規近似を使用します")
+            from scipy.stats import norm
+            spread = norm.ppf(1 - alpha / 2) * residuals.std() * np.sqrt(np.arange(1, horizon + 1))
+            lower, upper = forecast - spread, forecast + spread
+        
+        logger.info(f"予測区間推定完了: {model_type}, 複製数={len(completed_paths) * chunk_size}")
+        return lower, upper
+    
+    def forecast_recursive(self, model_type: str, years_ahead: int) -> Dict:
+        """
+        機械学習モデルによる全系列の再帰的多段予測
+        
+        特徴量ストアの直近データを起点に、1ステップごとに全系列分の特徴量を更新して
+        モデルの predict を1回呼び出す（系列ごとのループは行わない）。
+        
+        Args:
+            model_type: "xgboost" または "random_forest"
+            years_ahead: 予測ステップ数
+            
+        Returns:
+            series（系列キー）, dates（系列 × 期間）, forecast（系列 × 期間）
+        """
+        if model_type not in self.models:
+            raise ValueError(f"学習済みモデルが見つかりません: {model_type}")
+        if self.feature_store.features is None:
+            raise ValueError("予測の起点となる履歴データがありません。先に prepare_features を実行してください")
+        if self.feature_columns and list(self.feature_columns) != list(self.feature_store.feature_columns):
+            raise ValueError("学習時と特徴量構成が一致しません")
+        
+        start = time.perf_counter()
+        paths = self.feature_store.recursive_forecast(self.models[model_type].predict, years_ahead)
+        logger.info(
+            f"再帰予測完了: {model_type}, {len(paths['series'])}系列 × {years_ahead}期間, "
+            f"{time.perf_counter() - start:.3f}秒"
+        )
+        return paths
+    
     def predict_population(self, 
                           model_type: str,
                           years_ahead: int = 10,
-                          policy_scenario: Optional[Dict] = None) -> Dict:
+                          policy_scenario: Optional[Dict] = None,
+                          with_intervals: bool = True) -> Dict:
         """
         人口予測実行
         
@@ -274,6 +822,7 @@ class PopulationPredictor:
             model_type: 使用モデル ("arima", "xgboost", "random_forest", "ensemble")
             years_ahead: 予測期間（年）
             policy_scenario: 政策シナリオ（政策効果を加味）
+            with_intervals: 予測区間を計算するか（アンサンブル構成モデルでは不要なため省略）
             
         Returns:
             予測結果辞書
@@ -289,24 +838,40 @@ class PopulationPredictor:
             if model_type == 'arima':
                 # ARIMA予測
                 forecast = model.forecast(steps=years_ahead * 12)  # 月次予測
-                confidence_intervals = model.get_forecast(steps=years_ahead * 12).conf_int()
                 
                 result = {
                     'forecast': forecast.values,
-                    'lower_bound': confidence_intervals.iloc[:, 0].values,
-                    'upper_bound': confidence_intervals.iloc[:, 1].values,
                     'dates': pd.date_range(start=datetime.now(), periods=years_ahead * 12, freq='M')
                 }
+                if with_intervals:
+                    confidence_intervals = model.get_forecast(steps=years_ahead * 12).conf_int()
+                    result['lower_bound'] = confidence_intervals.iloc[:, 0].values
+                    result['upper_bound'] = confidence_intervals.iloc[:, 1].values
                 
             else:
-                # 機械学習モデル予測
-                # 最新データから特徴量を構築して予測（簡略化）
-                # 実際の実装では、最新データから将来の特徴量を推定する必要がある
+                # 機械学習モデル予測（最新データから特徴量を更新しながら再帰的に予測）
+                paths = self.forecast_recursive(model_type, years_ahead)
+                series_forecasts = paths['forecast']
                 
+                # 複数系列（市町村別）の場合は合計を全体の予測とする
                 result = {
-                    'forecast': [100000] * years_ahead,  # プレースホルダー
-                    'dates': pd.date_range(start=datetime.now(), periods=years_ahead, freq='Y')
+                    'forecast': series_forecasts[0] if len(paths['series']) == 1 else series_forecasts.sum(axis=0),
+                    'dates': pd.DatetimeIndex(paths['dates'][0]) if paths['dates'] is not None
+                    else pd.date_range(start=datetime.now(), periods=years_ahead, freq='Y')
                 }
+                if len(paths['series']) > 1:
+                    result['series'] = paths['series']
+                    result['series_forecasts'] = series_forecasts
+                
+                # 交差検証残差のブートストラップによる予測区間（誤差パスは予測値に加算）
+                if with_intervals and model_type in self.residuals:
+                    lower, upper = self.bootstrap_prediction_intervals(model_type, np.zeros(years_ahead))
+                    if len(paths['series']) == 1:
+                        result['lower_bound'] = result['forecast'] + lower
+                        result['upper_bound'] = result['forecast'] + upper
+                    else:
+                        result['series_lower_bounds'] = series_forecasts + lower
+                        result['series_upper_bounds'] = series_forecasts + upper
             
             # 政策効果を加味
             if policy_scenario:
@@ -331,20 +896,11 @@ class PopulationPredictor:
             政策効果を反映した予測結果
         """
         try:
-            # 政策効果の係数（例：子育て支援政策で出生率+10%、移住支援で転入+5%等）
-            policy_effects = {
-                'childcare_support': 0.1,  # 子育て支援
-                'migration_support': 0.05,  # 移住支援
-                'economic_development': 0.03,  # 経済活性化
-                'senior_support': -0.02  # 高齢者支援（直接的な人口増加効果は限定的）
-            }
-            
-            # 政策効果を累積的に適用
+            # 政策効果を累積的に適用（政策強度を係数に乗算）
             total_effect = 1.0
             for policy, intensity in policy_scenario.items():
-                if policy in policy_effects:
-                    effect = policy_effects[policy] * intensity  # 政策強度（0-1）を乗算
-                    total_effect += effect
+                if policy in self.policy_effect_coefficients:
+                    total_effect += self.policy_effect_coefficients[policy] * intensity
             
             # 予測値に効果を適用
             adjusted_forecast = [value * total_effect for value in prediction_result['forecast']]
@@ -358,11 +914,78 @@ class PopulationPredictor:
             logger.error(f"政策効果適用エラー: {e}")
             raise
     
+    def predict_population_scenarios(self,
+                                     scenarios: List[Dict[str, float]],
+                                     model_type: str = 'ensemble',
+                                     years_ahead: int = 10) -> Dict:
+        """
+        複数政策シナリオの一括予測（What-if分析）
+        
+        基本予測は1回だけ実行し、政策効果は（シナリオ数 × 政策数）の
+        強度行列と効果係数ベクトルの行列積で全シナリオ分をまとめて算出する。
+        
+        Args:
+            scenarios: 政策シナリオのリスト（政策名 → 政策強度）
+            model_type: 使用モデル ("arima", "xgboost", "random_forest", "ensemble")
+            years_ahead: 予測期間（年）
+        
+        Returns:
+            列指向の一括予測結果（trajectoriesは シナリオ数 × 予測期間 の行列）
+        """
+        try:
+            logger.info(f"一括シナリオ予測開始: {len(scenarios)}シナリオ, {model_type}")
+            
+            if not scenarios:
+                raise ValueError("シナリオが指定されていません")
+            
+            # 政策効果なしの基本予測（1回のみ）
+            if model_type == 'ensemble':
+                base_result = self.ensemble_predict(years_ahead=years_ahead)
+            else:
+                base_result = self.predict_population(model_type, years_ahead)
+            base_forecast = np.asarray(base_result['forecast'], dtype=float)
+            
+            # (シナリオ数 × 政策数) の強度行列と効果係数ベクトル
+            policies = list(self.policy_effect_coefficients.keys())
+            coefficients = np.array([self.policy_effect_coefficients[p] for p in policies])
+            intensities = np.array(
+                [[scenario.get(policy, 0.0) for policy in policies] for scenario in scenarios],
+                dtype=float
+            )
+            
+            # 効果係数 = 1 + Σ(係数 × 強度) を全シナリオ一括計算
+            effect_factors = 1.0 + intensities @ coefficients
+            trajectories = np.outer(effect_factors, base_forecast)
+            
+            result = {
+                'forecast': base_forecast,
+                'policy_effect_factors': effect_factors,
+                'trajectories': trajectories,
+                'policies': policies,
+                'dates': base_result.get('dates', [])
+            }
+            
+            # 信頼区間も同じ効果係数でスケーリング
+            if 'lower_bound' in base_result and 'upper_bound' in base_result:
+                result['lower_bounds'] = np.outer(effect_factors, np.asarray(base_result['lower_bound'], dtype=float))
+                result['upper_bounds'] = np.outer(effect_factors, np.asarray(base_result['upper_bound'], dtype=float))
+            
+            logger.info(f"一括シナリオ予測完了: {trajectories.shape[0]}シナリオ × {trajectories.shape[1]}期間")
+            return result
+        
+        except Exception as e:
+            logger.error(f"一括シナリオ予測エラー: {e}")
+            raise
+    
     def ensemble_predict(self, years_ahead: int = 10, 
                         policy_scenario: Optional[Dict] = None) -> Dict:
         """
         アンサンブル予測（複数モデルの結果を統合）
         
+        構成モデルの予測はスレッドプールで並行実行し（XGBoost・scikit-learn・numpyの
+        予測処理はGILを解放する）、統合は（モデル数 × 期間）の予測行列と
+        正規化した重みベクトルの積で行う。
+        
         Args:
             years_ahead: 予測期間
             policy_scenario: 政策シナリオ
@@ -373,39 +996,52 @@ class PopulationPredictor:
         try:
             logger.info("アンサンブル予測開始")
             
-            predictions = {}
-            weights = {'arima': 0.3, 'xgboost': 0.4, 'random_forest': 0.3}
-            
-            # 各モデルから予測取得
-            for model_type in ['arima', 'xgboost', 'random_forest']:
-                if model_type in self.models:
-                    pred = self.predict_population(model_type, years_ahead, policy_scenario)
-                    predictions[model_type] = pred
-            
-            # 重み付き平均でアンサンブル
-            if predictions:
-                ensemble_forecast = np.zeros(years_ahead)
-                for model_type, pred in predictions.items():
-                    weight = weights.get(model_type, 1.0 / len(predictions))
-                    forecast = pred.get('forecast_adjusted', pred['forecast'])
-                    ensemble_forecast += np.array(forecast[:years_ahead]) * weight
-                
-                result = {
-                    'forecast': ensemble_forecast,
-                    'individual_predictions': predictions,
-                    'weights': weights,
-                    'dates': pd.date_range(start=datetime.now(), periods=years_ahead, freq='Y')
-                }
-                
-                logger.info("アンサンブル予測完了")
-                return result
-            else:
+            members = [model_type for model_type in self.ensemble_weights if model_type in self.models]
+            if not members:
                 raise ValueError("利用可能な学習済みモデルがありません")
+            
+            # 各モデルの予測を並行実行（統合後は使わない構成モデルの予測区間は計算しない）
+            executor = self._get_ensemble_executor()
+            futures = {
+                model_type: executor.submit(
+                    self.predict_population, model_type, years_ahead, policy_scenario, with_intervals=False
+                )
+                for model_type in members
+            }
+            predictions = {model_type: future.result() for model_type, future in futures.items()}
+            
+            # 重み付き平均（利用可能なモデルの重みを合計1に正規化）
+            forecasts = np.vstack([
+                np.asarray(pred.get('forecast_adjusted', pred['forecast']), dtype=float)[:years_ahead]
+                for pred in predictions.values()
+            ])
+            weights = np.array([self.ensemble_weights[model_type] for model_type in members], dtype=float)
+            weights /= weights.sum()
+            ensemble_forecast = weights @ forecasts
+            
+            result = {
+                'forecast': ensemble_forecast,
+                'individual_predictions': predictions,
+                'weights': dict(zip(members, weights.tolist())),
+                'dates': pd.date_range(start=datetime.now(), periods=years_ahead, freq='Y')
+            }
+            
+            logger.info("アンサンブル予測完了")
+            return result
                 
         except Exception as e:
             logger.error(f"アンサンブル予測エラー: {e}")
             raise
     
+    def _get_ensemble_executor(self) -> ThreadPoolExecutor:
+        """アンサンブル構成モデル用スレッドプール（初回利用時に作成）"""
+        with self._executor_lock:
+            if self._ensemble_executor is None:
+                self._ensemble_executor = ThreadPoolExecutor(
+                    max_workers=len(self.ensemble_weights), thread_name_prefix="ensemble"
+                )
+            return self._ensemble_executor
+    
     def evaluate_models(self, X: pd.DataFrame, y: pd.Series) -> Dict:
         """
         モデル性能評価
@@ -419,24 +1055,19 @@ class PopulationPredictor:
         """
         try:
             evaluation_results = {}
-            
-            # 時系列分割
-            tscv = TimeSeriesSplit(n_splits=5)
+            X_cv, y_cv = self._time_ordered(X, y)
             
             for model_name, model in self.models.items():
                 if model_name == 'arima':
                     # ARIMAは別途評価
                     continue
                 
-                cv_scores = {'mae': [], 'rmse': [], 'r2': []}
+                # 学習済みモデルは変更せず、クローンでのフォールド予測（キャッシュ済みなら再学習なし）
+                folds = self._cross_validate_folds(model_name, model, X_cv, y_cv)
                 
-                for train_idx, test_idx in tscv.split(X):
-                    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
-                    y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
-                    
-                    model.fit(X_train, y_train)
-                    y_pred = model.predict(X_test)
-                    
+                cv_scores = {'mae': [], 'rmse': [], 'r2': []}
+                for test_idx, y_pred in folds:
+                    y_test = y_cv.iloc[test_idx]
                     cv_scores['mae'].append(mean_absolute_error(y_test, y_pred))
                     cv_scores['rmse'].append(np.sqrt(mean_squared_error(y_test, y_pred)))
                     cv_scores['r2'].append(r2_score(y_test, y_pred))
@@ -457,36 +1088,146 @@ class PopulationPredictor:
             logger.error(f"モデル評価エラー: {e}")
             raise
     
-    def save_models(self) -> None:
-        """学習済みモデルの保存"""
+    def save_models(self, metadata: Optional[Dict] = None, activate: bool = True) -> str:
+        """
+        学習済みモデルをレジストリに新バージョンとして保存
+        
+        Args:
+            metadata: 追加メタデータ
+            activate: 保存後に有効バージョンへ切り替えるか
+            
+        Returns:
+            保存したバージョン名
+        """
         try:
-            import os
-            os.makedirs(self.model_dir, exist_ok=True)
+            version_metadata = {
+                'training_data_version': self.training_data_version,
+                'metrics': self.training_metrics,
+                'residuals': {name: values.tolist() for name, values in self.residuals.items()},
+                'feature_columns': self.feature_columns,
+                'model_configs': self.model_configs,
+                'tuned_configs': self.tuned_configs,
+                'feature_store': {
+                    'target_column': self.feature_store.target_column,
+                    'date_column': self.feature_store.date_column,
+                    'series_column': self.feature_store.series_column
+                }
+            }
+            version_metadata.update(metadata or {})
+            
+            # 分位点モデルは "<モデル名>_quantile" として同じバージョンに保存
+            artifacts = dict(self.models)
+            artifacts.update({f"{name}{self.QUANTILE_SUFFIX}": model for name, model in self.quantile_models.items()})
+            
+            # 読み込み後も再帰予測できるよう、特徴量ストアの入力データを同梱
+            if self.feature_store.source is not None:
+                artifacts[self.HISTORY_ARTIFACT] = self.feature_store.source.drop(
+                    columns=PopulationFeatureStore.SERIES_KEY
+                )
+            
+            version = self.registry.register(
+                self.REGISTRY_NAMESPACE, artifacts, version_metadata, activate=activate
+            )
+            if activate:
+                self.model_version = version
+            
+            logger.info(f"モデル保存完了: {self.REGISTRY_NAMESPACE}/{version}")
+            return version
             
-            for model_name, model in self.models.items():
-                file_path = f"{self.model_dir}/population_{model_name}_model.pkl"
-                joblib.dump(model, file_path)
-                logger.info(f"モデル保存完了: {file_path}")
-                
         except Exception as e:
             logger.error(f"モデル保存エラー: {e}")
             raise
     
-    def load_models(self) -> None:
-        """保存済みモデルの読み込み"""
+    def load_models(self, version: Optional[str] = None, mmap_mode: Optional[str] = 'c') -> None:
+        """
+        保存済みモデルの読み込み
+        
+        Args:
+            version: 読み込むバージョン（省略時は有効バージョン）
+            mmap_mode: joblibのmmapモード（配列の多いモデルをワーカー間で共有）
+        """
         try:
-            import os
-            if not os.path.exists(self.model_dir):
-                logger.warning("モデルディレクトリが見つかりません")
+            if version is None and self.registry.get_active_version(self.REGISTRY_NAMESPACE) is None:
+                self._load_legacy_models()
                 return
             
-            for file_name in os.listdir(self.model_dir):
-                if file_name.startswith("population_") and file_name.endswith("_model.pkl"):
-                    model_name = file_name.replace("population_", "").replace("_model.pkl", "")
-                    file_path = os.path.join(self.model_dir, file_name)
-                    self.models[model_name] = joblib.load(file_path)
-                    logger.info(f"モデル読み込み完了: {model_name}")
-                    
+            loaded_version, models = self.registry.load(self.REGISTRY_NAMESPACE, version, mmap_mode=mmap_mode)
+            metadata = self.registry.get_metadata(self.REGISTRY_NAMESPACE, loaded_version)
+            
+            # 特徴量ストアを学習時のデータで復元（再帰予測の起点）
+            history = models.pop(self.HISTORY_ARTIFACT, None)
+            if history is not None:
+                feature_store = PopulationFeatureStore(
+                    lags=self.FEATURE_LAGS, windows=self.FEATURE_WINDOWS, **metadata.get('feature_store', {})
+                )
+                feature_store.get_features(history)
+                self.feature_store = feature_store
+            
+            # 辞書ごと差し替えることで、処理中のリクエストは旧モデルのまま完了できる
+            self.quantile_models = {
+                name[:-len(self.QUANTILE_SUFFIX)]: model for name, model in models.items()
+                if name.endswith(self.QUANTILE_SUFFIX)
+            }
+            self.models = {name: model for name, model in models.items() if not name.endswith(self.QUANTILE_SUFFIX)}
+            self.residuals = {name: np.asarray(values) for name, values in metadata.get('residuals', {}).items()}
+            self.feature_columns = metadata.get('feature_columns', self.feature_columns)
+            self.tuned_configs = metadata.get('tuned_configs', {})
+            for model_type, params in self.tuned_configs.items():
+                self.model_configs.setdefault(model_type, {}).update(params)
+            self.training_data_version = metadata.get('training_data_version')
+            self.training_metrics = metadata.get('metrics', {})
+            self.model_version = loaded_version
+            self._last_registry_check = time.monotonic()
+            
         except Exception as e:
             logger.error(f"モデル読み込みエラー: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    def refresh_models(self, force: bool = False) -> bool:
+        """
+        有効バージョンが切り替わっていればモデルをホットスワップ
+        
+        Args:
+            force: ポーリング間隔を無視して確認するか
+            
+        Returns:
+            モデルを入れ替えた場合True
+        """
+        now = time.monotonic()
+        if not force and now - self._last_registry_check < self.registry_poll_interval:
+            return False
+        self._last_registry_check = now
+        
+        active_version = self.registry.get_active_version(self.REGISTRY_NAMESPACE)
+        if active_version is None or active_version == self.model_version:
+            return False
+        
+        self.load_models(active_version)
+        logger.info(f"モデルホットスワップ完了: {active_version}")
+        return True
+    
+    def activate_version(self, version: str) -> None:
+        """
+        指定バージョンを読み込んでから有効化する（他ワーカーはポーリングで追従）
+        
+        読み込みに失敗したバージョンは有効バージョン（ACTIVE）に書き込まない
+        """
+        self.load_models(version)
+        self.registry.activate(self.REGISTRY_NAMESPACE, version)
+    
+    def _load_legacy_models(self) -> None:
+        """レジストリ導入前の population_<name>_model.pkl 形式の読み込み"""
+        import os
+        if not os.path.exists(self.model_dir):
+            logger.warning("モデルディレクトリが見つかりません")
+            return
+        
+        models = {}
+        for file_name in os.listdir(self.model_dir):
+            if file_name.startswith("population_") and file_name.endswith("_model.pkl"):
+                model_name = file_name.replace("population_", "").replace("_model.pkl", "")
+                file_path = os.path.join(self.model_dir, file_name)
+                models[model_name] = joblib.load(file_path)
+                logger.info(f"モデル読み込み完了: {model_name}")
+        
+        self.models = models
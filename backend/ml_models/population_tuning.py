@@ -0,0 +1,153 @@
+"""
+人口予測モデルのハイパーパラメータ探索コマンド
+
+XGBoost / Random Forest を逐次半減法（HalvingRandomSearchCV）で探索し、
+最良設定をモデルレジストリの有効バージョンのメタデータに記録する。
+
+実行方法（backend ディレクトリから）:
+    python -m ml_models.population_tuning                       # DBの市町村別人口を使用
+    python -m ml_models.population_tuning --csv population.csv  # CSV（date/year, population, municipality_code）
+    python -m ml_models.population_tuning --retrain             # 最良設定で再学習し新バージョンとして登録
+"""
+import argparse
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+from .population_forecast import PopulationPredictor
+
+logger = logging.getLogger(__name__)
+
+
+def load_population_frame(csv_path: Optional[str] = None, prefecture_code: str = "31") -> pd.DataFrame:
+    """
+    探索用の人口データを読み込み
+
+    Args:
+        csv_path: CSVファイルパス（省略時はDBの市町村別年次人口）
+        prefecture_code: 都道府県コード（DB読み込み時）
+
+    Returns:
+        date, population, municipality_code 列のデータフレーム
+    """
+    if csv_path:
+        df = pd.read_csv(csv_path, dtype={'municipality_code': str})
+        if 'date' not in df.columns and 'year' in df.columns:
+            df['date'] = pd.to_datetime(df['year'].astype(str) + '-01-01')
+        if 'population' not in df.columns and 'total_population' in df.columns:
+            df = df.rename(columns={'total_population': 'population'})
+        return df[[col for col in ['date', 'municipality_code', 'population'] if col in df.columns]]
+
+    # DBはアプリケーション設定に依存するため、CSV指定時は読み込まない
+    from app.db.database import SessionLocal
+    from app.models.population import PopulationData
+
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            PopulationData.municipality_code, PopulationData.year, PopulationData.total_population
+        ).filter(
+            PopulationData.prefecture_code == prefecture_code,
+            PopulationData.municipality_code.isnot(None),
+            PopulationData.month.is_(None)
+        ).order_by(PopulationData.municipality_code, PopulationData.year).all()
+    finally:
+        db.close()
+
+    if not rows:
+        raise ValueError(f"人口データがありません: prefecture_code={prefecture_code}")
+
+    return pd.DataFrame({
+        'date': [datetime(row.year, 1, 1) for row in rows],
+        'municipality_code': [row.municipality_code for row in rows],
+        'population': [float(row.total_population) for row in rows]
+    })
+
+
+def run_tuning(df: pd.DataFrame,
+               model_types=None,
+               model_dir: Optional[str] = None,
+               n_jobs: int = -1,
+               tuning_overrides: Optional[dict] = None,
+               persist: bool = True,
+               retrain: bool = False) -> dict:
+    """
+    ハイパーパラメータ探索を実行
+
+    Args:
+        df: 人口データ
+        model_types: 探索対象モデル
+        model_dir: モデルレジストリのディレクトリ
+        n_jobs: 並列数（-1で全コア）
+        tuning_overrides: tuning_configs の上書き
+        persist: 最良設定を有効バージョンのメタデータに記録するか
+        retrain: 最良設定で学習し直して新バージョンとして登録するか
+
+    Returns:
+        探索結果レポート
+    """
+    predictor = PopulationPredictor(model_dir=model_dir, n_jobs=n_jobs)
+    predictor.tuning_configs.update(tuning_overrides or {})
+
+    X, y = predictor.prepare_features(df)
+    results = predictor.tune_hyperparameters(X, y, model_types=model_types, persist=persist)
+
+    report = {
+        'n_rows': len(X),
+        'n_features': X.shape[1],
+        'tuning_configs': predictor.tuning_configs,
+        'results': results
+    }
+
+    if retrain:
+        for model_type in results:
+            getattr(predictor, f"fit_{model_type}")(X, y)
+        report['registered_version'] = predictor.save_models(metadata={'update_type': 'tuned'})
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='人口予測モデル ハイパーパラメータ探索（逐次半減法）')
+    parser.add_argument('--csv', help='人口データCSV（省略時はDB）')
+    parser.add_argument('--prefecture', default='31', help='都道府県コード（DB読み込み時）')
+    parser.add_argument('--models', nargs='+', default=['xgboost', 'random_forest'],
+                        choices=sorted(PopulationPredictor.TUNING_SPACES), help='探索対象モデル')
+    parser.add_argument('--model-dir', help='モデルレジストリのディレクトリ')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='並列数（-1で全コア）')
+    parser.add_argument('--factor', type=int, help='各段で残す候補の割合の逆数')
+    parser.add_argument('--min-resources', type=int, help='初段の木の数')
+    parser.add_argument('--max-resources', type=int, help='最終段の木の数')
+    parser.add_argument('--n-splits', type=int, help='TimeSeriesSplit の分割数')
+    parser.add_argument('--no-persist', action='store_true', help='レジストリに記録しない')
+    parser.add_argument('--retrain', action='store_true', help='最良設定で再学習し新バージョンとして登録')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    overrides = {
+        key: value for key, value in {
+            'factor': args.factor,
+            'min_resources': args.min_resources,
+            'max_resources': args.max_resources,
+            'n_splits': args.n_splits
+        }.items() if value is not None
+    }
+
+    report = run_tuning(
+        load_population_frame(args.csv, args.prefecture),
+        model_types=args.models,
+        model_dir=args.model_dir,
+        n_jobs=args.n_jobs,
+        tuning_overrides=overrides,
+        persist=not args.no_persist,
+        retrain=args.retrain
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,612 @@
+import warnings
+
+import numpy as np
+import pytest
+from app.api.v1.endpoints.livability import livability_service
+from app.core.auth import get_current_verified_user
+from app.main import app
+from app.models.livability import LivabilityScore, LivabilityIndicatorValue, UserLivabilityWeight
+from app.models.population import PopulationData
+from app.models.user import User, UserRole
+from app.services.livability_delta import ENGINE_SCORE_COLUMNS, LivabilityDeltaUpdater, backfill_indicator_values
+from app.services.livability_ranking import LivabilityScoreMatrix
+from app.services.livability_similarity import MunicipalitySimilarityIndex, POPULATION_FEATURES
+from backend.ml_models.livability_score import LivabilityScorePredictor
+
+
+@pytest.fixture
+def login_as():
+    """認証ユーザーを差し替える（テスト終了時に解除）"""
+    def login(user_id, role=UserRole.VIEWER):
+        app.dependency_overrides[get_current_verified_user] = lambda: User(
+            id=user_id, role=role, is_active=True, is_verified=True
+        )
+    yield login
+    app.dependency_overrides.pop(get_current_verified_user, None)
+
+
+class TestLivabilityComparisonAPI:
+    """住みやすさ比較API のテストクラス"""
+
+    def test_comparison_uses_latest_year_per_municipality(self, client, db, sample_livability_data):
+        """市町村ごとの最新年で比較され、同点が同順位になることを確認"""
+        for municipality_code, year, total_score in [
+            ("95001", 2022, 50.0),
+            ("95001", 2023, 70.0),
+            ("95002", 2023, 70.0),
+            ("95003", 2021, 90.0),
+        ]:
+            data = sample_livability_data.copy()
+            data.update({
+                "prefecture_code": "95",
+                "municipality_code": municipality_code,
+                "year": year,
+                "total_score": total_score
+            })
+            db.add(LivabilityScore(**data))
+        db.commit()
+
+        response = client.get(
+            "/api/v1/livability/comparison",
+            params={"municipality_codes": ["95001", "95002", "95003"]}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["municipality_code"] for item in data] == ["95003", "95001", "95002"]
+        assert [item["total_score"] for item in data] == [90.0, 70.0, 70.0]
+        assert [item["rank"] for item in data] == [1, 2, 2]
+        assert data[0]["percentile"] == pytest.approx(100.0)
+
+        response = client.get(
+            "/api/v1/livability/comparison",
+            params={"municipality_codes": ["95001", "95002", "95003"], "year": 2022}
+        )
+
+        assert [item["municipality_code"] for item in response.json()] == ["95001"]
+
+
+class TestLivabilityRadarOverlayAPI:
+    """複数地域レーダーチャートAPI のテストクラス"""
+
+    def test_overlay_returns_dataset_per_municipality(self, client, db, sample_livability_data):
+        """指定順に地域ごとの系列が返り、重みが全系列に適用されることを確認"""
+        for municipality_code, healthcare in [("96001", 40.0), ("96002", 80.0)]:
+            data = sample_livability_data.copy()
+            data.update({
+                "prefecture_code": "96",
+                "municipality_code": municipality_code,
+                "healthcare_score": healthcare
+            })
+            db.add(LivabilityScore(**data))
+        db.commit()
+
+        response = client.get("/api/v1/livability/radar-chart/overlay", params={
+            "municipality_codes": ["96002", "96001", "96999"],
+            "user_weights": '{"healthcare_weight": 2.0}'
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["labels"]) == 8
+        assert [item["municipality_code"] for item in data["municipalities"]] == ["96002", "96001"]
+        assert [dataset["data"][1] for dataset in data["datasets"]] == [160.0, 80.0]
+        assert data["datasets"][0]["borderColor"] != data["datasets"][1]["borderColor"]
+        assert data["missing_codes"] == ["96999"]
+
+    def test_overlay_without_data(self, client):
+        """データのない地域のみ指定した場合に404となることを確認"""
+        response = client.get("/api/v1/livability/radar-chart/overlay", params={"municipality_codes": ["96998"]})
+
+        assert response.status_code == 404
+
+
+class TestLivabilityClustersAPI:
+    """市町村類型クラスタAPI のテストクラス"""
+
+    def test_clusters_precomputed_until_data_changes(self, client, db, sample_livability_data):
+        """データが変わらない間は計算済みのクラスタが返ることを確認"""
+        # クラスタは全国で算出されるため、他のテストが使わない年のデータで確認する
+        for i, (healthcare, transport) in enumerate([(90, 30), (88, 32), (92, 28), (30, 90), (32, 88), (28, 92)]):
+            data = sample_livability_data.copy()
+            data.update({
+                "prefecture_code": "97",
+                "municipality_code": f"9700{i}",
+                "year": 2015,
+                "healthcare_score": healthcare,
+                "transport_score": transport
+            })
+            db.add(LivabilityScore(**data))
+        db.commit()
+
+        response = client.get("/api/v1/livability/clusters", params={
+            "n_clusters": 2, "prefecture_code": "97", "year": 2015
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [cluster["size"] for cluster in data["clusters"]] == [3, 3]
+        clusters = {item["municipality_code"]: item["cluster"] for item in data["municipalities"]}
+        assert clusters["97000"] == clusters["97001"] == clusters["97002"]
+        assert clusters["97000"] != clusters["97003"]
+        assert {"x", "y"} <= data["municipalities"][0].keys()
+
+        response = client.get("/api/v1/livability/clusters", params={"n_clusters": 2, "year": 2015})
+        assert response.json()["computed_at"] == data["computed_at"]
+
+
+class TestSimilarMunicipalitiesAPI:
+    """類似市町村検索API のテストクラス"""
+
+    def test_similar_municipalities(self, client, db, sample_livability_data):
+        """スコア・人口構造の近い市町村が近い順に返り、重みで順序が変わることを確認"""
+        # 検索は全国が対象のため、他のテストが使わない市町村コード・年のデータで確認する
+        for municipality_code, (healthcare, transport, population) in {
+            "98000": (70.0, 50.0, 180000),
+            "98001": (71.0, 80.0, 170000),
+            "98002": (90.0, 51.0, 190000),
+            "98003": (20.0, 10.0, 3000),
+        }.items():
+            data = sample_livability_data.copy()
+            data.update({
+                "prefecture_code": municipality_code[:2],
+                "municipality_code": municipality_code,
+                "year": 2016,
+                "healthcare_score": healthcare,
+                "transport_score": transport
+            })
+            db.add(LivabilityScore(**data))
+            db.add(PopulationData(
+                prefecture_code=municipality_code[:2], municipality_code=municipality_code,
+                year=2016, total_population=population, age_65_plus=population // 3
+            ))
+        db.commit()
+
+        response = client.get("/api/v1/livability/similar", params={
+            "municipality_code": "98000", "k": 2, "year": 2016
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["neighbors"]) == 2
+        assert "98000" not in [item["municipality_code"] for item in data["neighbors"]]
+        distances = [item["distance"] for item in data["neighbors"]]
+        assert distances == sorted(distances)
+
+        # 交通を重視すると交通スコアの近い市町村が最も類似
+        response = client.get("/api/v1/livability/similar", params={
+            "municipality_code": "98000",
+            "k": 1,
+            "year": 2016,
+            "weights": '{"transport_weight": 20.0}'
+        })
+        assert response.json()["neighbors"][0]["municipality_code"] == "98002"
+
+    def test_similar_rejects_non_finite_weights(self, client, db, sample_livability_data):
+        """NaN の重みが400エラーになることを確認"""
+        data = sample_livability_data.copy()
+        data.update({"prefecture_code": "88", "municipality_code": "88001", "year": 2017})
+        db.add(LivabilityScore(**data))
+        db.commit()
+
+        response = client.get("/api/v1/livability/similar", params={
+            "municipality_code": "88001", "year": 2017, "weights": '{"transport_weight": NaN}'
+        })
+
+        assert response.status_code == 400
+
+    def test_index_without_population_data_has_no_warnings(self, client, db):
+        """人口データのない市町村だけでもインデックスが警告なしに構築されることを確認"""
+        index = MunicipalitySimilarityIndex(LivabilityScoreMatrix())
+        matrix = {"year": 2017, "codes": ["88901", "88902"], "scores": np.array([[50.0] * 8, [60.0] * 8])}
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            entry = index._build(db, matrix)
+
+        assert np.isfinite(entry["features"]).all()
+        assert np.allclose(entry["features"][:, -len(POPULATION_FEATURES):], 0.0)
+
+    def test_similar_unknown_municipality(self, client):
+        """データのない市町村の検索が400エラーになることを確認"""
+        response = client.get("/api/v1/livability/similar", params={"municipality_code": "99999"})
+
+        assert response.status_code == 400
+
+
+class TestIndicatorValuesAPI:
+    """指標値（縦持ちテーブル）API のテストクラス"""
+
+    def _add_values(self, db, values):
+        """(市町村コード, 年, 指標コード, 正規化値) の指標値を登録"""
+        for municipality_code, year, indicator_code, value in values:
+            db.add(LivabilityIndicatorValue(
+                prefecture_code=municipality_code[:2], municipality_code=municipality_code, year=year,
+                category="environment", indicator_code=indicator_code, raw_value=value, normalized_value=value
+            ))
+        db.commit()
+
+    def test_indicator_ranking_and_time_series(self, client, db):
+        """指標値の順位（同点は同順位）と時系列を確認"""
+        # 他のテストの指標値と混ざらないよう、テストごとに指標コード・市町村コードの範囲を分ける
+        self._add_values(db, [
+            ("99001", 2022, "test_ranking_indicator", 40.0),
+            ("99001", 2023, "test_ranking_indicator", 80.0),
+            ("99002", 2023, "test_ranking_indicator", 80.0),
+            ("99003", 2023, "test_ranking_indicator", 20.0),
+        ])
+
+        response = client.get("/api/v1/livability/indicator-values/test_ranking_indicator/ranking", params={
+            "top_k": 3, "prefecture_code": "99"
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["year"] == 2023
+        assert data["total_count"] == 3
+        assert [item["rank"] for item in data["rankings"]] == [1, 1, 3]
+        assert data["rankings"][2]["percentile"] == pytest.approx(100 / 3)
+
+        response = client.get("/api/v1/livability/indicator-values/test_ranking_indicator/time-series", params={
+            "municipality_codes": ["99001"]
+        })
+        assert [point["year"] for point in response.json()["series"]["99001"]] == [2022, 2023]
+
+    def test_indicator_correlation(self, client, db):
+        """指標間の相関係数を確認"""
+        self._add_values(db, [
+            (f"9910{i}", 2023, code, value)
+            for i, (x, y) in enumerate([(10.0, 20.0), (20.0, 40.0), (30.0, 60.0), (40.0, 50.0)])
+            for code, value in (("test_correlation_x", x), ("test_correlation_y", y))
+        ])
+
+        response = client.get("/api/v1/livability/indicator-values/correlation", params={
+            "indicator_codes": ["test_correlation_x", "test_correlation_y"], "prefecture_code": "99"
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["correlation"][0][0] == pytest.approx(1.0)
+        assert data["correlation"][0][1] == pytest.approx(0.8315218, abs=1e-6)
+        assert data["sample_counts"] == [[4, 4], [4, 4]]
+
+    def test_backfill_from_detailed_metrics(self, client, db, sample_livability_data):
+        """既存の detailed_metrics から指標値が作成され、再実行しても重複しないことを確認"""
+        for municipality_code, metrics in {
+            "87001": {"detailed_breakdown": {"environment": {"air_quality": {"raw_value": 60.0, "normalized_value": 60.0}}}},
+            "87002": {"environment": {"air_quality": 80.0, "green_space": 30.0}, "category_scores": {"environment": 55.0}},
+            "87003": {"category_scores": {"environment": 40.0}, "rank": 3},
+        }.items():
+            data = sample_livability_data.copy()
+            data.update({
+                "prefecture_code": "87",
+                "municipality_code": municipality_code,
+                "year": 2018,
+                "detailed_metrics": metrics
+            })
+            db.add(LivabilityScore(**data))
+        db.commit()
+        engine = LivabilityScorePredictor().scoring_engine
+
+        report = backfill_indicator_values(db, engine, prefecture_code="87")
+        assert report["inserted"] == 3 and report["municipalities"] == 2
+        assert backfill_indicator_values(db, engine, prefecture_code="87")["inserted"] == 0
+
+        response = client.get("/api/v1/livability/indicator-values/air_quality/ranking", params={
+            "prefecture_code": "87", "year": 2018
+        })
+        assert [item["municipality_code"] for item in response.json()["rankings"]] == ["87002", "87001"]
+
+    def test_delta_updater_syncs_indicator_values(self, db, sample_livability_data):
+        """スコア書き込み時に指標値が同期され、差分更新で変化したセルだけが反映されることを確認"""
+        data = sample_livability_data.copy()
+        data["municipality_code"] = "31202"
+        db.add(LivabilityScore(**data))
+        db.commit()
+        engine = LivabilityScorePredictor().scoring_engine
+        updater = LivabilityDeltaUpdater.from_db(db, engine, {
+            "31202": {"environment": {"air_quality": 60.0, "green_space": 30.0}}
+        }, "31", 2023)
+
+        updater.write_all(db)
+        result = updater.apply(db, [
+            ("31202", "environment", "air_quality", 70.0),
+            ("31202", "environment", "green_space", None),
+        ])
+
+        rows = db.query(LivabilityIndicatorValue).filter(LivabilityIndicatorValue.municipality_code == "31202").all()
+        assert [(row.indicator_code, row.raw_value) for row in rows] == [("air_quality", 70.0)]
+        assert result["indicator_values"] == {"inserted": 0, "updated": 1, "deleted": 1}
+
+    def test_delta_update_total_agrees_with_persisted_categories(self, db, sample_livability_data):
+        """差分更新後の total_score が保存したカテゴリスコアから再現でき、対応しない列が残らないことを確認"""
+        for municipality_code in ["84001", "84002", "84003"]:
+            data = sample_livability_data.copy()
+            data.update({"prefecture_code": "84", "municipality_code": municipality_code})
+            db.add(LivabilityScore(**data))
+        db.commit()
+        engine = LivabilityScorePredictor().scoring_engine
+        updater = LivabilityDeltaUpdater.from_db(db, engine, {
+            "84001": {"environment": {"air_quality": 60.0}, "safety": {"crime_rate": 2.0}},
+            "84002": {"healthcare": {"hospital_access": 8.0}, "housing": {"housing_cost": 60000.0}},
+            "84003": {"economy": {"employment_rate": 70.0}},
+        }, "84", 2023)
+
+        updater.write_all(db)
+        updater.apply(db, [("84003", "safety", "crime_rate", 1.0)])
+
+        weights = dict(zip(engine.categories, engine.category_weights))
+        for row in db.query(LivabilityScore).filter(LivabilityScore.prefecture_code == "84").all():
+            db.refresh(row)
+            category_scores = row.detailed_metrics["category_scores"]
+            assert row.total_score == pytest.approx(
+                sum(weights[category] * score for category, score in category_scores.items())
+            )
+            for category, column in ENGINE_SCORE_COLUMNS.items():
+                assert getattr(row, column) == category_scores.get(category)
+            assert row.infrastructure_score is None and row.community_score is None
+
+    def test_update_indicator_values(self, client, db, sample_livability_data, login_as):
+        """指標値の更新APIでスコア・順位が差分更新され、次回の更新に引き継がれることを確認"""
+        for municipality_code, metrics in {
+            "83001": {"detailed_breakdown": {"environment": {"air_quality": {"raw_value": 90.0}}}},
+            "83002": {"environment": {"air_quality": 50.0}},
+        }.items():
+            data = sample_livability_data.copy()
+            data.update({"prefecture_code": "83", "municipality_code": municipality_code, "detailed_metrics": metrics})
+            db.add(LivabilityScore(**data))
+        db.commit()
+        request = {
+            "prefecture_code": "83",
+            "year": 2023,
+            "changes": [{"municipality_code": "83002", "category": "environment",
+                         "indicator_code": "air_quality", "value": 100.0}]
+        }
+
+        login_as(3)
+        assert client.patch("/api/v1/livability/indicator-values", json=request).status_code == 403
+
+        login_as(3, UserRole.ANALYST)
+        response = client.patch("/api/v1/livability/indicator-values", json=request)
+        assert response.status_code == 200
+        assert response.json()["changed_cells"] == 1
+
+        rows = {
+            row.municipality_code: row
+            for row in db.query(LivabilityScore).filter(LivabilityScore.prefecture_code == "83").all()
+        }
+        for row in rows.values():
+            db.refresh(row)
+        assert rows["83002"].detailed_metrics["rank"] == 1
+        assert rows["83002"].detailed_metrics["indicator_values"] == {"environment": {"air_quality": 100.0}}
+        assert rows["83002"].total_score > rows["83001"].total_score
+
+        # 更新した値から状態を復元し、削除も差分で反映される
+        request["changes"][0]["value"] = None
+        response = client.patch("/api/v1/livability/indicator-values", json=request)
+        assert response.status_code == 200
+        db.refresh(rows["83002"])
+        assert rows["83002"].detailed_metrics["indicator_values"] == {}
+        assert rows["83002"].detailed_metrics["rank"] == 2
+
+        request["year"] = 1999
+        assert client.patch("/api/v1/livability/indicator-values", json=request).status_code == 404
+        request.update({"year": 2023, "changes": [{**request["changes"][0], "municipality_code": "83999"}]})
+        assert client.patch("/api/v1/livability/indicator-values", json=request).status_code == 400
+
+
+class TestLivabilityRankingAPI:
+    """カスタム重みランキングAPI のテストクラス"""
+
+    def _add_scores(self, db, sample_livability_data, prefecture_code, scores):
+        """市町村コード → (医療スコア, 交通スコア) のスコアデータを登録"""
+        for municipality_code, (healthcare, transport) in scores.items():
+            data = sample_livability_data.copy()
+            data.update({
+                "prefecture_code": prefecture_code,
+                "municipality_code": municipality_code,
+                "healthcare_score": healthcare,
+                "transport_score": transport
+            })
+            db.add(LivabilityScore(**data))
+        db.commit()
+
+    def test_ranking_follows_custom_weights(self, client, db, sample_livability_data):
+        """重みに応じて順位が入れ替わることを確認"""
+        self._add_scores(db, sample_livability_data, "91", {
+            "91001": (90.0, 30.0),
+            "91002": (30.0, 90.0),
+            "91003": (60.0, 60.0),
+        })
+
+        response = client.post("/api/v1/livability/ranking", json={
+            "prefecture_code": "91",
+            "custom_weights": {"healthcare_weight": 5.0},
+            "top_k": 2
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_count"] == 3
+        assert [item["municipality_code"] for item in data["rankings"]] == ["91001", "91003"]
+        assert [item["rank"] for item in data["rankings"]] == [1, 2]
+        assert data["rankings"][0]["percentile"] == pytest.approx(100.0)
+
+        response = client.post("/api/v1/livability/ranking", json={
+            "prefecture_code": "91",
+            "custom_weights": {"transport_weight": 5.0},
+            "top_k": 1
+        })
+
+        assert response.json()["rankings"][0]["municipality_code"] == "91002"
+
+    def test_ranking_ties_share_rank(self, client, db, sample_livability_data):
+        """同点の市町村が同順位になることを確認"""
+        self._add_scores(db, sample_livability_data, "92", {
+            "92001": (70.0, 70.0),
+            "92002": (70.0, 70.0),
+            "92003": (50.0, 50.0),
+        })
+
+        response = client.post("/api/v1/livability/ranking", json={"prefecture_code": "92", "top_k": 3})
+
+        assert response.status_code == 200
+        assert [item["rank"] for item in response.json()["rankings"]] == [1, 1, 3]
+
+    def test_ranking_rejects_invalid_weights(self, client):
+        """負の重みが400エラーになることを確認"""
+        response = client.post("/api/v1/livability/ranking", json={
+            "custom_weights": {"healthcare_weight": -1.0}
+        })
+
+        assert response.status_code == 400
+
+    def test_ranking_rejects_non_finite_weights(self, client):
+        """NaN・無限大の重みが400エラーになることを確認"""
+        for value in ("NaN", "Infinity"):
+            response = client.post(
+                "/api/v1/livability/ranking",
+                content='{"custom_weights": {"healthcare_weight": %s}}' % value,
+                headers={"Content-Type": "application/json"}
+            )
+
+            assert response.status_code == 400
+
+    def test_rank_stability(self, client, db, sample_livability_data):
+        """順位分布と上位k位以内の確率が返ることを確認"""
+        self._add_scores(db, sample_livability_data, "93", {
+            "93001": (95.0, 90.0),
+            "93002": (60.0, 62.0),
+            "93003": (61.0, 60.0),
+        })
+
+        response = client.post("/api/v1/livability/rank-stability", json={
+            "prefecture_code": "93",
+            "n_samples": 500,
+            "top_k": 1,
+            "include_distribution": True,
+            "seed": 0
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        leader = data["municipalities"][0]
+        assert leader["municipality_code"] == "93001"
+        assert leader["probability_top_k"] == pytest.approx(1.0)
+        assert leader["rank_interval_90"] == [1, 1]
+        for item in data["municipalities"]:
+            assert sum(item["rank_distribution"]) == pytest.approx(1.0)
+        # 僅差の2市町村は重みの揺らぎで順位が入れ替わる
+        assert 0 < data["municipalities"][1]["rank_distribution"][2] < 1
+
+    def test_profile_ranking_follows_profile_update(self, client, db, sample_livability_data, login_as):
+        """保存済みプロファイルでのランキングがプロファイル更新に追従することを確認"""
+        login_as(1)
+        self._add_scores(db, sample_livability_data, "94", {
+            "94001": (90.0, 30.0),
+            "94002": (30.0, 90.0),
+        })
+
+        response = client.post("/api/v1/livability/weight-profiles?prefecture_code=94", json={
+            "profile_name": "医療重視",
+            "healthcare_weight": 5.0
+        })
+        assert response.status_code == 200
+        profile = response.json()
+        assert profile["user_id"] == 1
+        assert profile["precomputed_years"] == [2023]
+
+        response = client.post("/api/v1/livability/ranking", json={
+            "prefecture_code": "94",
+            "profile_id": profile["id"],
+            "top_k": 1
+        })
+        assert response.json()["rankings"][0]["municipality_code"] == "94001"
+
+        response = client.put(f"/api/v1/livability/weight-profiles/{profile['id']}?prefecture_code=94", json={
+            "profile_name": "交通重視",
+            "transport_weight": 5.0
+        })
+        assert response.status_code == 200
+
+        response = client.post("/api/v1/livability/ranking", json={
+            "prefecture_code": "94",
+            "profile_id": profile["id"],
+            "top_k": 1
+        })
+        assert response.json()["rankings"][0]["municipality_code"] == "94002"
+
+    def test_profile_ranking_follows_update_by_other_worker(self, client, db, sample_livability_data, monkeypatch,
+                                                             login_as):
+        """他のワーカーによるプロファイル更新（DBの直接更新）にも追従することを確認"""
+        login_as(1)
+        monkeypatch.setattr(livability_service.profile_scores, "poll_interval", 0)
+        self._add_scores(db, sample_livability_data, "90", {
+            "90001": (90.0, 30.0),
+            "90002": (30.0, 90.0),
+        })
+        profile = client.post("/api/v1/livability/weight-profiles?prefecture_code=90", json={
+            "profile_name": "医療重視",
+            "healthcare_weight": 5.0
+        }).json()
+
+        request = {"prefecture_code": "90", "profile_id": profile["id"], "top_k": 1}
+        assert client.post("/api/v1/livability/ranking", json=request).json()["rankings"][0]["municipality_code"] == "90001"
+
+        row = db.query(UserLivabilityWeight).filter(UserLivabilityWeight.id == profile["id"]).one()
+        row.healthcare_weight = 1.0
+        row.transport_weight = 5.0
+        db.commit()
+
+        assert client.post("/api/v1/livability/ranking", json=request).json()["rankings"][0]["municipality_code"] == "90002"
+
+    def test_radar_chart_unknown_profile(self, client, db, sample_livability_data):
+        """存在しないプロファイルを指定したレーダーチャートが404となることを確認"""
+        self._add_scores(db, sample_livability_data, "89", {"89001": (50.0, 50.0)})
+
+        response = client.get("/api/v1/livability/radar-chart", params={
+            "municipality_code": "89001",
+            "profile_id": 999999
+        })
+
+        assert response.status_code == 404
+
+    def test_weight_profiles_require_login(self, client):
+        """未認証ではプロファイルを保存・更新できないことを確認"""
+        response = client.post("/api/v1/livability/weight-profiles", json={"healthcare_weight": 5.0})
+        assert response.status_code in (401, 403)
+
+        response = client.put("/api/v1/livability/weight-profiles/1", json={"healthcare_weight": 5.0})
+        assert response.status_code in (401, 403)
+
+    def test_weight_profile_owner_is_taken_from_token(self, client, db, sample_livability_data, login_as):
+        """所有者は本文ではなくトークンのユーザーとなり、他のユーザーは更新できないことを確認"""
+        self._add_scores(db, sample_livability_data, "86", {"86101": (50.0, 50.0)})
+        login_as(7)
+        profile = client.post("/api/v1/livability/weight-profiles?prefecture_code=86", json={
+            "user_id": 8,
+            "profile_name": "所有者確認"
+        }).json()
+        assert profile["user_id"] == 7
+
+        login_as(8)
+        response = client.put(f"/api/v1/livability/weight-profiles/{profile['id']}?prefecture_code=86", json={
+            "profile_name": "乗っ取り",
+            "healthcare_weight": 5.0
+        })
+        assert response.status_code == 403
+        row = db.query(UserLivabilityWeight).filter(UserLivabilityWeight.id == profile["id"]).one()
+        assert row.profile_name == "所有者確認"
+
+        response = client.put("/api/v1/livability/weight-profiles/999999?prefecture_code=86", json={
+            "profile_name": "不明"
+        })
+        assert response.status_code == 404
+
+    def test_ranking_unknown_profile(self, client, db, sample_livability_data):
+        """存在しないプロファイルを指定したランキングが404となることを確認"""
+        self._add_scores(db, sample_livability_data, "85", {"85101": (50.0, 50.0)})
+
+        for path in ["/api/v1/livability/ranking", "/api/v1/livability/rank-stability"]:
+            response = client.post(path, json={"prefecture_code": "85", "profile_id": 999999})
+            assert response.status_code == 404
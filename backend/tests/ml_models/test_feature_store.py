@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_models.feature_store import PopulationFeatureStore
+
+
+def _series(code, periods, start="2000-01-01", seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.date_range(start, periods=periods, freq="YS"),
+        "municipality_code": code,
+        "population": 100000 + np.cumsum(rng.normal(0, 500, periods)),
+    })
+
+
+@pytest.fixture
+def multi_series():
+    """長さの異なる複数市町村の系列（行順はシャッフル）"""
+    parts = [_series(f"3120{i}", periods, seed=i) for i, periods in enumerate([30, 12, 4])]
+    return parts, pd.concat(parts).sample(frac=1, random_state=0)
+
+
+class TestPopulationFeatureStore:
+    """特徴量ストアのテストクラス"""
+
+    def test_grouped_features_match_per_series(self, multi_series):
+        """一括計算が系列ごとの個別計算と一致し、系列をまたがないことを確認"""
+        parts, df = multi_series
+        X, y = PopulationFeatureStore().get_features(df)
+
+        expected = pd.concat(
+            [PopulationFeatureStore().get_features(part)[0] for part in parts], ignore_index=True
+        )
+        pd.testing.assert_frame_equal(X, expected, check_exact=False, rtol=1e-9)
+        assert "municipality_code" not in X.columns
+        assert len(y) == len(df)
+
+    def test_cache_hit_and_tail_append(self, multi_series):
+        """同一データはキャッシュを返し、末尾追加は全量再計算と一致する"""
+        parts, df = multi_series
+        store = PopulationFeatureStore()
+        X, _ = store.get_features(df)
+        assert store.get_features(df)[0] is X
+
+        new_rows = pd.concat([
+            _series(part["municipality_code"].iloc[0], 2,
+                    start=f"{part['date'].dt.year.max() + 1}-01-01", seed=10 + i)
+            for i, part in enumerate(parts)
+        ])
+        full = pd.concat([df, new_rows])
+        X_appended, y_appended = store.get_features(full)
+        X_full, y_full = PopulationFeatureStore().get_features(full)
+
+        pd.testing.assert_frame_equal(X_appended, X_full, check_exact=False, rtol=1e-9)
+        np.testing.assert_allclose(y_appended, y_full)
@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from ml_models.economic_impact import EconomicImpactPredictor
+from ml_models.io_engine import InputOutputEngine
+
+
+def random_coefficients(n, density=1.0, seed=0):
+    """列和が1未満になる投入係数行列"""
+    rng = np.random.default_rng(seed)
+    matrix = rng.uniform(0, 1, (n, n)) * (rng.uniform(0, 1, (n, n)) < density)
+    return matrix / matrix.sum(axis=0).clip(min=1e-9) * rng.uniform(0.2, 0.6, n)
+
+
+@pytest.fixture
+def engine():
+    """雇用者所得・雇用係数・自給率を持つ20部門のエンジン"""
+    rng = np.random.default_rng(1)
+    n = 20
+    return InputOutputEngine(
+        random_coefficients(n),
+        [f"s{i}" for i in range(n)],
+        compensation_ratios=rng.uniform(0.1, 0.4, n),
+        employment_coefficients=rng.uniform(0.05, 0.2, n),
+        self_sufficiency=rng.uniform(0.5, 1.0, n),
+        consumption_pattern=rng.uniform(0, 1, n)
+    )
+
+
+class TestInputOutputEngine:
+    """レオンチェフ逆行列エンジンのテストクラス"""
+
+    def test_solve_matches_explicit_inverse(self, engine):
+        """キャッシュした LU 分解による解が逆行列との積と一致することを確認"""
+        demand = np.random.default_rng(2).uniform(0, 10, (engine.n_sectors, 5))
+        system = np.eye(engine.n_sectors) - engine.self_sufficiency[:, None] * engine.input_coefficients
+
+        np.testing.assert_allclose(engine.solve(demand), np.linalg.inv(system) @ demand, rtol=1e-10)
+        np.testing.assert_allclose(engine.leontief_inverse(), np.linalg.inv(system), rtol=1e-10)
+
+    def test_factorization_is_cached(self, engine):
+        """分解は初回の計算時に1回だけ行われることを確認"""
+        assert engine._factorization is None
+        engine.solve(np.ones(engine.n_sectors))
+        factorization = engine._factorization
+        engine.compute_effects(np.ones(engine.n_sectors))
+
+        assert engine._factorization is factorization
+
+    def test_sparse_matches_dense(self):
+        """疎行列での計算が密行列と一致することを確認"""
+        coefficients = random_coefficients(300, density=0.03, seed=3)
+        demand = np.random.default_rng(4).uniform(0, 10, (300, 4))
+        dense = InputOutputEngine(coefficients, [str(i) for i in range(300)], compensation_ratios=np.full(300, 0.3))
+        sparse_engine = InputOutputEngine(
+            sparse.csc_matrix(coefficients), [str(i) for i in range(300)], compensation_ratios=np.full(300, 0.3)
+        )
+
+        assert sparse_engine.is_sparse
+        np.testing.assert_allclose(
+            sparse_engine.compute_effects(demand)["total"], dense.compute_effects(demand)["total"], rtol=1e-9
+        )
+
+    def test_batch_matches_single_scenarios(self, engine):
+        """シナリオの一括計算が1シナリオずつの計算と一致することを確認"""
+        demand = np.random.default_rng(5).uniform(0, 10, (engine.n_sectors, 3))
+        batch = engine.compute_effects(demand)
+
+        for column in range(3):
+            single = engine.compute_effects(demand[:, column])
+            for name, values in single.items():
+                np.testing.assert_allclose(batch[name][:, column], values, rtol=1e-12)
+
+    def test_effects_decomposition(self, engine):
+        """直接・間接・誘発効果の合計が総効果になり、誘発なしでは総効果が1次波及と一致することを確認"""
+        demand = np.random.default_rng(6).uniform(0, 10, engine.n_sectors)
+        effects = engine.compute_effects(demand)
+        without_induced = engine.compute_effects(demand, induced=False)
+
+        np.testing.assert_allclose(effects["direct"] + effects["indirect"] + effects["induced"], effects["total"])
+        np.testing.assert_allclose(
+            effects["total_value_added"], engine.value_added_ratios * effects["total"]
+        )
+        assert np.all(effects["indirect"] >= -1e-12)
+        assert np.all(effects["induced"] > 0)
+        assert np.all(without_induced["induced"] == 0)
+        np.testing.assert_allclose(without_induced["total"], effects["direct"] + effects["indirect"])
+
+    def test_output_multipliers(self, engine):
+        """Type II の生産誘発係数が Type I 以上で、Type I が1以上であることを確認"""
+        multipliers = engine.output_multipliers()
+
+        assert np.all(multipliers["type_i"] >= 1.0)
+        assert np.all(multipliers["type_ii"] >= multipliers["type_i"])
+
+    def test_from_table(self):
+        """取引基本表のデータフレームから係数が計算されることを確認"""
+        sectors = ["農業", "製造業", "サービス"]
+        transactions = np.array([[10.0, 30.0, 5.0], [20.0, 100.0, 40.0], [15.0, 60.0, 80.0]])
+        output = np.array([100.0, 400.0, 500.0])
+        table = pd.DataFrame(transactions, index=sectors, columns=sectors)
+        table["民間消費支出"] = [20.0, 100.0, 200.0]
+        table["県内需要合計"] = [120.0, 500.0, 550.0]
+        table["（控除）移輸入"] = [-30.0, -150.0, -55.0]
+        table["県内生産額"] = output
+        table.loc["雇用者所得", sectors] = [40.0, 150.0, 250.0]
+        table.loc["粗付加価値部門計", sectors] = [75.0, 210.0, 375.0]
+        table.loc["県内生産額", sectors] = output
+        engine = InputOutputEngine.from_table(table, employment={"農業": 10.0, "製造業": 20.0})
+
+        assert engine.sectors == sectors
+        np.testing.assert_allclose(engine.input_coefficients, transactions / output)
+        np.testing.assert_allclose(engine.value_added_ratios, [0.75, 0.525, 0.75])
+        np.testing.assert_allclose(engine.compensation_ratios, [0.4, 0.375, 0.5])
+        np.testing.assert_allclose(engine.employment_coefficients, [0.1, 0.05, 0.0])
+        np.testing.assert_allclose(engine.self_sufficiency, [0.75, 0.7, 0.9])
+        np.testing.assert_allclose(engine.consumption_pattern, [20 / 320, 100 / 320, 200 / 320])
+
+    def test_rejects_shape_mismatch(self):
+        """部門数と行列の形状が一致しない場合にエラーになることを確認"""
+        with pytest.raises(ValueError):
+            InputOutputEngine(np.zeros((3, 3)), ["a", "b"])
+
+
+class TestEconomicImpact:
+    """産業連関分析による経済波及効果のテストクラス"""
+
+    def test_calculate_economic_impact(self):
+        """GDP効果が直接・1次・2次の合計で、部門別内訳が総生産誘発額と一致することを確認"""
+        predictor = EconomicImpactPredictor()
+        result = predictor.calculate_economic_impact(
+            {"childcare_support": 10.0, "infrastructure": 20.0, "unknown_policy": 5.0},
+            {"employment_increase": 100}
+        )
+
+        assert result["total_investment"] == 35.0
+        assert result["total_gdp_impact"] == pytest.approx(
+            result["direct_gdp_impact"] + result["primary_gdp_impact"] + result["secondary_gdp_impact"]
+        )
+        assert result["primary_gdp_impact"] > 0 and result["secondary_gdp_impact"] > 0
+        assert result["tax_revenue_impact"] == pytest.approx(result["total_gdp_impact"] * 0.15)
+        assert set(result["industry_breakdown"]) == {"agriculture", "manufacturing", "services"}
+        assert sum(result["industry_breakdown"].values()) == pytest.approx(result["production_effects"]["total"])
+
+    def test_load_io_table(self):
+        """読み込んだ産業連関表の部門で投資が配分されることを確認"""
+        sectors = [f"部門{i}" for i in range(40)]
+        coefficients = random_coefficients(40, seed=7)
+        output = np.full(40, 1000.0)
+        table = pd.DataFrame(coefficients * output, index=sectors, columns=sectors)
+        table.loc["県内生産額"] = output
+        table.loc["雇用者所得"] = output * 0.3
+
+        predictor = EconomicImpactPredictor()
+        predictor.load_io_table(table, policy_sector_allocation={"tourism_promotion": {"部門3": 1.0}})
+        result = predictor.calculate_economic_impact({"tourism_promotion": 10.0, "other": 4.0})
+
+        assert predictor.input_output_matrix.shape == (40, 40)
+        assert len(result["industry_breakdown"]) == 40
+        assert result["direct_gdp_impact"] == pytest.approx(
+            10.0 * predictor.io_engine.value_added_ratios[3] + 0.1 * predictor.io_engine.value_added_ratios.sum()
+        )
+        assert result["employment_impact"] == pytest.approx(result["total_gdp_impact"] * 0.8)
+
+
+class TestEconomicScenarios:
+    """一括経済分析のテストクラス"""
+
+    def test_matches_single_scenario_analysis(self):
+        """一括分析の各シナリオが comprehensive_economic_analysis と一致することを確認"""
+        predictor = EconomicImpactPredictor()
+        scenarios = [
+            {"childcare_support": 10.0, "infrastructure": 20.0},
+            {"tourism_promotion": 5.0, "unknown_policy": 3.0},
+            {},
+        ]
+
+        batch = predictor.comprehensive_economic_analysis_batch(scenarios, population_change=0.5, years_ahead=4)
+
+        assert batch["gdp_projections"].shape == (3, 4)
+        assert batch["industry_breakdown"].shape == (3, 3)
+        for i, scenario in enumerate(scenarios):
+            single = predictor.comprehensive_economic_analysis(scenario, population_change=0.5, years_ahead=4)
+            impact = single["economic_impact"]
+            assert batch["total_gdp_impact"][i] == pytest.approx(impact["total_gdp_impact"])
+            assert batch["employment_impact"][i] == pytest.approx(impact["employment_impact"])
+            assert batch["multiplier_effect"][i] == pytest.approx(impact["multiplier_effect"])
+            np.testing.assert_allclose(batch["industry_breakdown"][i], list(impact["industry_breakdown"].values()))
+            np.testing.assert_allclose(batch["gdp_projections"][i], single["gdp_prediction"]["annual_projections"])
+            np.testing.assert_allclose(
+                batch["employment_projections"][i], single["employment_prediction"]["annual_employment_creation"]
+            )
+            np.testing.assert_allclose(batch["annual_tax_revenue"][i], single["tax_prediction"]["annual_tax_revenue"])
+            assert batch["roi_percent"][i] == pytest.approx(single["roi_percent"])
+            assert batch["payback_period"][i] == pytest.approx(single["payback_period"])
+
+    def test_rejects_empty_scenarios(self):
+        """シナリオが空の場合にエラーになることを確認"""
+        with pytest.raises(ValueError):
+            EconomicImpactPredictor().comprehensive_economic_analysis_batch([])
@@ -0,0 +1,427 @@
+import numpy as np
+import pytest
+
+from ml_models.livability_engine import compile_indicator_rules
+from ml_models.livability_score import LivabilityScorePredictor
+
+
+@pytest.fixture
+def predictor():
+    return LivabilityScorePredictor()
+
+
+@pytest.fixture
+def indicator_rows():
+    """指標マスター（LivabilityIndicator）の行"""
+    return [
+        {"indicator_code": "school_access", "category": "education", "min_value": 0, "max_value": 10,
+         "optimal_value": None, "higher_is_better": True, "default_weight": 2.0},
+        {"indicator_code": "class_size", "category": "education", "min_value": 10, "max_value": 40,
+         "optimal_value": 25, "higher_is_better": True, "default_weight": 1.0},
+        {"indicator_code": "education_quality", "category": "education", "min_value": None, "max_value": None,
+         "optimal_value": None, "higher_is_better": True, "default_weight": 1.0},
+        {"indicator_code": "commute_time", "category": "transportation", "min_value": 0, "max_value": 90,
+         "optimal_value": 0, "higher_is_better": False, "default_weight": 1.0},
+    ]
+
+
+@pytest.fixture
+def municipalities_data():
+    """未定義項目・欠損カテゴリ・範囲外の値を含む市町村別指標"""
+    return {
+        "盛岡市": {
+            "education": {"school_access": 4.5, "education_quality": 80, "child_support": 70},
+            "healthcare": {"hospital_access": 9, "medical_quality": 85, "elder_care": 75},
+            "safety": {"crime_rate": 2, "disaster_risk": 30},
+            "housing": {"housing_cost": 60000, "housing_quality": 70, "land_price": 50},
+        },
+        "宮古市": {
+            "education": {"school_access": 2, "education_quality": 60},
+            "transportation": {"public_transport": 30, "commute_time": 70, "ferry_access": 55},
+            "environment": {"air_quality": 95, "green_space": 120, "noise_level": 80},
+            "economy": {},
+        },
+        "遠野市": {
+            "culture": {"cultural_facilities": 40, "recreation": 65, "festivals": 90},
+            "economy": {"employment_rate": 35, "income_level": 45},
+            "unknown_category": {"anything": 10},
+        },
+    }
+
+
+class TestLivabilityScoringEngine:
+    """住みやすさスコア行列計算エンジンのテストクラス"""
+
+    def test_matches_calculate_livability_score(self, predictor, municipalities_data):
+        """一括計算の結果が市町村ごとの calculate_livability_score と一致することを確認"""
+        engine = predictor.scoring_engine
+        scores = engine.score_municipalities(municipalities_data)
+
+        for row, (name, indicators) in enumerate(municipalities_data.items()):
+            expected = predictor.calculate_livability_score(indicators)
+            actual = engine.to_score_result(scores, row)
+
+            assert actual["total_score"] == pytest.approx(expected["total_score"])
+            assert actual["rank"] == expected["rank"]
+            assert actual["category_scores"] == pytest.approx(expected["category_scores"])
+            assert actual["strengths"] == expected["strengths"]
+            assert actual["improvement_areas"] == expected["improvement_areas"]
+            assert actual["detailed_breakdown"].keys() == expected["detailed_breakdown"].keys()
+            for category, items in expected["detailed_breakdown"].items():
+                for item, breakdown in items.items():
+                    assert actual["detailed_breakdown"][category][item] == pytest.approx(breakdown)
+
+    def test_compare_municipalities_rankings(self, predictor, municipalities_data):
+        """比較結果の順位がスコア降順で、カテゴリ別ベストが最高スコアであることを確認"""
+        result = predictor.compare_municipalities(municipalities_data)
+
+        totals = [score["total_score"] for _, score in result["rankings"]]
+        assert totals == sorted(totals, reverse=True)
+        assert {name for name, _ in result["rankings"]} == set(municipalities_data)
+        assert result["statistics"]["max_score"] == pytest.approx(totals[0])
+
+        leader = result["category_leaders"]["education"]
+        best = max(
+            result["comparison_matrix"][name]["category_scores"].get("education", 0)
+            for name in municipalities_data
+        )
+        assert leader["score"] == pytest.approx(best)
+
+    def test_grade_thresholds(self):
+        """ランク判定の境界値が従来の判定と一致することを確認"""
+        predictor = LivabilityScorePredictor()
+        scores = np.array([0, 39.9, 40, 50, 59.9, 60, 70, 79.99, 80, 100])
+
+        grades = predictor.scoring_engine.grade(scores)
+
+        assert list(grades) == [predictor._determine_livability_rank(score) for score in scores]
+
+    def test_engine_follows_weight_changes(self, predictor, municipalities_data):
+        """重み設定の変更後はエンジンが再構築されることを確認"""
+        before = predictor.scoring_engine
+        predictor.indicator_weights = {**predictor.indicator_weights, "safety": 0.5}
+
+        assert predictor.scoring_engine is not before
+        assert predictor.scoring_engine is predictor.scoring_engine
+
+
+class TestIndicatorRules:
+    """指標マスター由来の正規化ルールのテストクラス"""
+
+    def test_compile_indicator_rules(self, indicator_rows):
+        """最適値・逆転指標・カテゴリ内の重み正規化を確認"""
+        compiled = compile_indicator_rules(indicator_rows)
+        rules = compiled["normalization_rules"]
+
+        assert rules["class_size"]["optimal"] == 25
+        # 最適値が範囲の下端なら値が小さいほど良い単調な指標
+        assert rules["commute_time"]["optimal"] is None
+        assert rules["commute_time"]["reverse"] is True
+        assert "education_quality" not in rules
+        assert compiled["detailed_indicators"]["education"] == pytest.approx(
+            {"school_access": 0.5, "class_size": 0.25, "education_quality": 0.25}
+        )
+
+    def test_peaked_normalization(self, predictor, indicator_rows):
+        """最適値で100、範囲の端で0となる山型の正規化を確認"""
+        predictor.apply_indicator_rules(indicator_rows, version="v1")
+        values = [10, 17.5, 25, 32.5, 40, 50]
+
+        scalar = [predictor._normalize_indicator_value("class_size", value, "education") for value in values]
+        engine = predictor.scoring_engine
+        vectors = engine.indicator_vectors([("education", "class_size")])
+        batch = engine.normalize(np.array(values)[:, None], vectors)[:, 0]
+
+        assert scalar == pytest.approx([0, 50, 100, 50, 0, 0])
+        assert batch == pytest.approx(scalar)
+
+    def test_applied_rules_match_single_score(self, predictor, indicator_rows, municipalities_data):
+        """マスター反映後も一括計算と calculate_livability_score が一致することを確認"""
+        municipalities_data["盛岡市"]["education"]["class_size"] = 30
+        before = predictor.scoring_engine
+        predictor.apply_indicator_rules(indicator_rows, version="v1")
+
+        engine = predictor.scoring_engine
+        scores = engine.score_municipalities(municipalities_data)
+
+        assert engine is not before
+        assert predictor.detailed_indicators["healthcare"] == predictor._default_detailed_indicators["healthcare"]
+        for row, indicators in enumerate(municipalities_data.values()):
+            expected = predictor.calculate_livability_score(indicators)
+            assert scores["total_scores"][row] == pytest.approx(expected["total_score"])
+
+    def test_same_version_keeps_engine(self, predictor, indicator_rows):
+        """同じバージョンの再反映ではエンジンを作り直さないことを確認"""
+        predictor.apply_indicator_rules(indicator_rows, version="v1")
+        engine = predictor.scoring_engine
+        predictor.apply_indicator_rules(indicator_rows, version="v1")
+
+        assert predictor.scoring_engine is engine
+
+
+class TestDeltaUpdate:
+    """差分更新のテストクラス"""
+
+    def _assert_same_scores(self, actual, expected):
+        assert actual["total_scores"] == pytest.approx(expected["total_scores"])
+        assert actual["category_scores"] == pytest.approx(expected["category_scores"])
+        assert list(actual["order"]) == list(expected["order"])
+        assert list(actual["positions"]) == list(expected["positions"])
+        assert list(actual["grades"]) == list(expected["grades"])
+        assert (actual["strengths"] == expected["strengths"]).all()
+        assert (actual["improvement_areas"] == expected["improvement_areas"]).all()
+
+    def test_matches_full_recompute(self, predictor):
+        """ランダムな変更の差分更新が全件再計算と一致することを確認"""
+        rng = np.random.default_rng(0)
+        engine = predictor.scoring_engine
+        data = {
+            f"{i:03d}": {
+                category: {item: float(rng.uniform(0, 100)) for item in items}
+                for category, items in predictor.detailed_indicators.items()
+            }
+            for i in range(60)
+        }
+        # 同点の市町村（順位は行番号順）
+        data["010"] = {category: dict(items) for category, items in data["020"].items()}
+        state = engine.score_municipalities(data)
+        categories = list(predictor.detailed_indicators)
+
+        for _ in range(30):
+            changes = []
+            for _ in range(rng.integers(1, 4)):
+                municipality = f"{rng.integers(60):03d}"
+                category = categories[rng.integers(len(categories))]
+                items = list(predictor.detailed_indicators[category]) + ["new_item"]
+                item = items[rng.integers(len(items))]
+                value = None if rng.random() < 0.2 else float(rng.uniform(0, 100))
+                if value is None:
+                    data[municipality][category].pop(item, None)
+                else:
+                    data[municipality][category][item] = value
+                changes.append((municipality, category, item, value))
+
+            delta = engine.update_scores(state, changes)
+            expected = engine.score_municipalities(data)
+
+            self._assert_same_scores(state, expected)
+            assert set(delta["rows"]) == {int(change[0]) for change in changes}
+
+    def test_rank_changes_reported(self, predictor, municipalities_data):
+        """最下位の市町村が首位に上がると、間の市町村も順位変化として報告されることを確認"""
+        engine = predictor.scoring_engine
+        state = engine.score_municipalities(municipalities_data)
+        last = state["municipalities"][state["order"][-1]]
+        changes = [
+            (last, "healthcare", "hospital_access", 10.0),
+            (last, "healthcare", "medical_quality", 100.0),
+            (last, "healthcare", "elder_care", 100.0),
+            (last, "education", "school_access", 5.0),
+            (last, "education", "education_quality", 100.0),
+            (last, "education", "child_support", 100.0),
+            (last, "housing", "housing_cost", 30000.0),
+            (last, "housing", "housing_quality", 100.0),
+        ]
+
+        delta = engine.update_scores(state, changes)
+
+        for municipality, category, item, value in changes:
+            municipalities_data[last].setdefault(category, {})[item] = value
+        self._assert_same_scores(state, engine.score_municipalities(municipalities_data))
+        assert state["positions"][state["municipalities"].index(last)] == 1
+        assert len(delta["rank_changed_rows"]) == len(municipalities_data)
+        assert set(engine.categories[k] for k in delta["categories"]) == {"healthcare", "education", "housing"}
+
+    def test_unknown_municipality_requires_full_recompute(self, predictor, municipalities_data):
+        """未登録の市町村の変更はエラーになることを確認"""
+        state = predictor.scoring_engine.score_municipalities(municipalities_data)
+
+        with pytest.raises(ValueError):
+            predictor.scoring_engine.update_scores(state, [("花巻市", "safety", "crime_rate", 1.0)])
+
+
+class TestPolicyScenarios:
+    """政策シナリオ一括評価のテストクラス"""
+
+    def _expected_changes(self, predictor, indicators, policy_effects):
+        """市町村・シナリオごとに calculate_livability_score で求めた変化量"""
+        future = {
+            category: {
+                item: value + policy_effects.get(category, {}).get(item, 0)
+                for item, value in items.items()
+            }
+            for category, items in indicators.items()
+        }
+        current_result = predictor.calculate_livability_score(indicators)
+        future_result = predictor.calculate_livability_score(future)
+        category_changes = {
+            category: future_result["category_scores"].get(category, 0) - score
+            for category, score in current_result["category_scores"].items()
+        }
+        return {
+            "score_change": future_result["total_score"] - current_result["total_score"],
+            "future_rank": future_result["rank"],
+            "category_changes": category_changes,
+            "policy_effectiveness": predictor._evaluate_policy_effectiveness(category_changes, policy_effects),
+        }
+
+    def test_batch_matches_single_scenarios(self, predictor, municipalities_data):
+        """一括評価の結果が市町村・シナリオごとの計算と一致することを確認"""
+        policy_scenarios = [
+            {"education": {"school_access": 1.0, "education_quality": 10}},
+            {"healthcare": {"medical_quality": 5, "elder_care": 20}, "economy": {"employment_rate": 30}},
+            {"transportation": {"commute_time": -30}, "culture": {"festivals": 0}},
+            {"safety": {}, "unknown_category": {"anything": 5}},
+        ]
+
+        batch = predictor.predict_score_changes_batch(municipalities_data, policy_scenarios)
+        categories = batch["categories"]
+
+        for s, policy_effects in enumerate(policy_scenarios):
+            for row, indicators in enumerate(municipalities_data.values()):
+                expected = self._expected_changes(predictor, indicators, policy_effects)
+
+                assert batch["score_changes"][s, row] == pytest.approx(expected["score_change"])
+                assert batch["future_grades"][s, row] == expected["future_rank"]
+                for category, change in expected["category_changes"].items():
+                    assert batch["category_changes"][s, row, categories.index(category)] == pytest.approx(change)
+
+                actual = predictor._policy_effectiveness_from_batch(batch, s, row)
+                assert actual.keys() == expected["policy_effectiveness"].keys()
+                for category, evaluation in expected["policy_effectiveness"].items():
+                    assert actual[category]["efficiency"] == pytest.approx(evaluation["efficiency"])
+                    assert actual[category]["effectiveness_level"] == evaluation["effectiveness_level"]
+
+    def test_predict_score_changes_keeps_format(self, predictor, municipalities_data):
+        """単一シナリオの予測結果が従来の形式で返ることを確認"""
+        indicators = municipalities_data["盛岡市"]
+        policy_effects = {"healthcare": {"hospital_access": 1}, "housing": {"housing_quality": 20}}
+
+        result = predictor.predict_score_changes(indicators, policy_effects)
+        expected = self._expected_changes(predictor, indicators, policy_effects)
+
+        assert result["score_change"] == pytest.approx(expected["score_change"])
+        assert result["category_changes"] == pytest.approx(expected["category_changes"])
+        assert result["most_improved_categories"][0][0] == "housing"
+        assert set(result["policy_effectiveness"]) == {"healthcare", "housing"}
+
+    def test_classify_effectiveness(self, predictor):
+        """効果分類の境界値が従来の分類と一致することを確認"""
+        efficiency = np.array([0.0, 0.49, 0.5, 0.99, 1.0, 1.99, 2.0, 5.0])
+
+        labels = predictor.scoring_engine.classify_effectiveness(efficiency)
+
+        assert list(labels) == [predictor._classify_effectiveness(value) for value in efficiency]
+
+
+class TestClustering:
+    """市町村類型クラスタリングのテストクラス"""
+
+    def test_recovers_typologies(self, predictor):
+        """特徴の異なる市町村群が規模順のクラスタとして分かれることを確認"""
+        rng = np.random.default_rng(0)
+        feature_names = ["healthcare", "transport", "economy", "environment"]
+        groups = [(0, 120), (2, 80), (3, 40)]
+        features = []
+        for high, size in groups:
+            block = rng.normal(50, 3, (size, len(feature_names)))
+            block[:, high] += 30
+            features.append(block)
+        features = np.vstack(features)
+
+        result = predictor.cluster_municipalities(features, feature_names, n_clusters=3, random_state=0)
+
+        assert [cluster["size"] for cluster in result["clusters"]] == [120, 80, 40]
+        start = 0
+        for k, (high, size) in enumerate(groups):
+            assert (result["labels"][start:start + size] == k).all()
+            assert result["clusters"][k]["high"] == [feature_names[high]]
+            start += size
+        assert result["embedding"].shape == (240, 2)
+        assert result["centers"][0, 0] == pytest.approx(80, abs=2)
+
+    def test_no_empty_clusters(self, predictor):
+        """市町村数がクラスタ数より少ない場合も空のクラスタを返さないことを確認"""
+        result = predictor.cluster_municipalities(np.arange(6.0).reshape(3, 2), ["a", "b"], n_clusters=6)
+
+        sizes = [cluster["size"] for cluster in result["clusters"]]
+        assert all(size > 0 for size in sizes)
+        assert sum(sizes) == 3
+        assert sizes == sorted(sizes, reverse=True)
+        assert set(result["labels"]) == set(range(len(sizes)))
+        assert len(result["centers"]) == len(sizes)
+
+
+class TestPCAWeights:
+    """主成分分析に基づく重みのテストクラス"""
+
+    def _category_scores(self, predictor, n, seed):
+        """2つの潜在因子で相関したカテゴリスコア行列"""
+        rng = np.random.default_rng(seed)
+        factors = rng.normal(size=(n, 2))
+        loadings = rng.normal(size=(2, len(predictor.indicator_weights)))
+        return 50 + 10 * factors @ loadings + rng.normal(scale=2, size=(n, len(predictor.indicator_weights)))
+
+    def _batch_weights(self, scores, variance_threshold=0.8):
+        """一括の主成分分析から求めた重み（比較用）"""
+        from sklearn.decomposition import PCA
+        pca = PCA().fit(scores)
+        n_components = int(np.searchsorted(np.cumsum(pca.explained_variance_ratio_), variance_threshold)) + 1
+        weights = pca.explained_variance_ratio_[:n_components] @ pca.components_[:n_components] ** 2
+        return weights / weights.sum()
+
+    def test_chunked_fit_matches_batch_pca(self, predictor):
+        """チャンク単位の逐次学習と新しい年の追加学習が一括学習と一致することを確認"""
+        first_year = self._category_scores(predictor, 503, seed=0)
+        next_year = self._category_scores(predictor, 211, seed=1)
+
+        assert predictor.partial_fit_weight_pca(first_year, chunk_size=100) == 503
+        assert predictor.partial_fit_weight_pca(next_year, chunk_size=100) == 211
+
+        weights = predictor.pca_weights()
+        assert list(weights) == predictor.scoring_engine.categories
+        assert sum(weights.values()) == pytest.approx(1.0)
+        assert list(weights.values()) == pytest.approx(
+            self._batch_weights(np.vstack([first_year, next_year])), abs=1e-6
+        )
+
+    def test_pending_rows_carried_over(self, predictor):
+        """主成分数に満たない行は次回の学習に持ち越されることを確認"""
+        scores = self._category_scores(predictor, 20, seed=2)
+
+        assert predictor.partial_fit_weight_pca(scores[:3]) == 3
+        assert "weight_pca" not in predictor.models
+        assert predictor.partial_fit_weight_pca(scores[3:]) == 17
+        assert predictor.models["weight_pca"].n_samples_seen_ == 20
+
+    def test_returned_counts_sum_to_input_rows(self, predictor):
+        """持ち越しを含む小さなバッチの戻り値の合計が入力行数と一致することを確認"""
+        scores = self._category_scores(predictor, 23, seed=4)
+
+        counts = [predictor.partial_fit_weight_pca(scores[i:i + 2]) for i in range(0, 23, 2)]
+        assert sum(counts) == 23
+        assert predictor.models["weight_pca"].n_samples_seen_ + len(predictor._weight_pca_pending) == 23
+
+    def test_update_from_indicator_data_and_apply(self, predictor):
+        """市町村別指標データからの学習・重みの適用と既定値への復元を確認"""
+        rng = np.random.default_rng(3)
+        data = {
+            f"{i:03d}": {
+                category: {item: float(rng.uniform(0, 100)) for item in items}
+                for category, items in predictor.detailed_indicators.items()
+            }
+            for i in range(40)
+        }
+        data["incomplete"] = {"education": {"school_access": 3}}
+        default_engine = predictor.scoring_engine
+
+        result = predictor.update_weight_pca(data, chunk_size=16)
+        weights = predictor.apply_pca_weights()
+
+        assert result["used_municipalities"] == 40
+        assert result["skipped_municipalities"] == 1
+        assert predictor.scoring_engine is not default_engine
+        assert predictor.scoring_engine.category_weights == pytest.approx(list(weights.values()))
+
+        predictor.reset_indicator_weights()
+        assert predictor.indicator_weights == predictor._default_indicator_weights
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_models.model_registry import ModelRegistry
+from ml_models.population_forecast import PopulationPredictor
+
+
+@pytest.fixture
+def trained_predictor(tmp_path):
+    """Random Forest学習済みの予測器（一時レジストリ使用）"""
+    df = pd.DataFrame({
+        "date": pd.date_range("1980-01-01", periods=30, freq="YS"),
+        "population": 600000 - np.arange(30) * 1500.0,
+    })
+    predictor = PopulationPredictor(model_dir=str(tmp_path), n_jobs=1)
+    X, y = predictor.prepare_features(df)
+    predictor.fit_random_forest(X, y)
+    return predictor, X
+
+
+class TestModelRegistry:
+    """モデルレジストリのテストクラス"""
+
+    def test_register_and_load_with_metadata(self, trained_predictor, tmp_path):
+        """保存したモデルがメタデータ付きで読み込めることを確認"""
+        predictor, X = trained_predictor
+        version = predictor.save_models(metadata={"note": "test"})
+
+        registry = ModelRegistry(str(tmp_path))
+        metadata = registry.get_metadata("population")
+        assert registry.get_active_version("population") == version
+        assert metadata["training_data_version"] == predictor.training_data_version
+        assert "random_forest" in metadata["metrics"]
+        assert metadata["models"]["random_forest"]["size_bytes"] > 0
+        assert metadata["note"] == "test"
+
+        loaded = PopulationPredictor(model_dir=str(tmp_path))
+        loaded.load_models()
+        assert loaded.model_version == version
+        np.testing.assert_allclose(
+            loaded.models["random_forest"].predict(X),
+            predictor.models["random_forest"].predict(X)
+        )
+
+    def test_hot_swap_follows_active_version(self, trained_predictor, tmp_path):
+        """別プロセスでの有効バージョン切替にポーリングで追従する"""
+        predictor, _ = trained_predictor
+        first = predictor.save_models()
+
+        worker = PopulationPredictor(model_dir=str(tmp_path), registry_poll_interval=0)
+        worker.load_models()
+        assert worker.refresh_models() is False
+
+        predictor.model_configs["random_forest"]["n_estimators"] = 10
+        second = predictor.save_models()
+        assert worker.refresh_models() is True
+        assert worker.model_version == second
+
+        predictor.activate_version(first)
+        assert worker.refresh_models() is True
+        assert worker.model_version == first
+
+    def test_activate_unknown_version_raises(self, tmp_path):
+        """存在しないバージョンの有効化はエラー"""
+        with pytest.raises(ValueError):
+            ModelRegistry(str(tmp_path)).activate("population", "missing")
+
+    @pytest.mark.parametrize("version", [".", "..", "../population", ".staging-20240101000000000000", "incomplete"])
+    def test_activate_invalid_version_keeps_active(self, trained_predictor, tmp_path, version):
+        """不正なバージョン名・未完成のバージョンは有効化されず、ACTIVE も変わらない"""
+        predictor, _ = trained_predictor
+        active = predictor.save_models()
+        (tmp_path / "population" / ".staging-20240101000000000000").mkdir()
+        (tmp_path / "population" / "incomplete").mkdir()
+
+        with pytest.raises(ValueError):
+            predictor.activate_version(version)
+
+        registry = ModelRegistry(str(tmp_path))
+        assert registry.get_active_version("population") == active
+        assert [metadata["version"] for metadata in registry.list_versions("population")] == [active]
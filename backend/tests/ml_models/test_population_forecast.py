@@ -0,0 +1,393 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_models.population_forecast import PopulationPredictor
+
+
+@pytest.fixture
+def population_series():
+    """減少トレンドの月次人口系列"""
+    rng = np.random.default_rng(0)
+    values = 560000 - np.arange(60) * 400 + rng.normal(0, 150, 60)
+    return pd.Series(values, index=pd.date_range("2019-01-01", periods=60, freq="MS"))
+
+
+@pytest.fixture
+def arima_predictor(population_series):
+    """ARIMA学習済みの予測器"""
+    predictor = PopulationPredictor()
+    predictor.fit_arima(population_series, order=(1, 1, 0))
+    return predictor
+
+
+class TestPopulationScenarios:
+    """一括シナリオ予測のテストクラス"""
+
+    def test_matches_single_scenario_prediction(self, arima_predictor):
+        """一括予測の各行が単一シナリオ予測と一致することを確認"""
+        scenarios = [
+            {"childcare_support": 2.0},
+            {"migration_support": 1.0, "economic_development": 3.0},
+            {},
+        ]
+
+        batch = arima_predictor.predict_population_scenarios(scenarios, model_type="arima", years_ahead=2)
+
+        assert batch["trajectories"].shape == (3, 24)
+        for row, scenario in zip(batch["trajectories"], scenarios):
+            single = arima_predictor.predict_population("arima", 2, scenario or None)
+            expected = single.get("forecast_adjusted", single["forecast"])
+            np.testing.assert_allclose(row, expected)
+
+    def test_unknown_policies_have_no_effect(self, arima_predictor):
+        """係数の定義されていない政策は効果係数に影響しない"""
+        batch = arima_predictor.predict_population_scenarios(
+            [{"infrastructure_improvement": 5.0}], model_type="arima", years_ahead=1
+        )
+
+        np.testing.assert_allclose(batch["policy_effect_factors"], [1.0])
+        np.testing.assert_allclose(batch["trajectories"][0], batch["forecast"])
+
+    def test_empty_scenarios_raise(self, arima_predictor):
+        """シナリオが空の場合はエラー"""
+        with pytest.raises(ValueError):
+            arima_predictor.predict_population_scenarios([], model_type="arima")
+
+
+@pytest.fixture
+def yearly_population():
+    """年次人口系列"""
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({
+        "date": pd.date_range("1980-01-01", periods=40, freq="YS"),
+        "population": 600000 - np.arange(40) * 1500 + rng.normal(0, 300, 40),
+    })
+
+
+@pytest.fixture
+def feature_data(yearly_population):
+    """年次人口系列から作成した特徴量"""
+    return PopulationPredictor(n_jobs=1).prepare_features(yearly_population)
+
+
+@pytest.fixture
+def municipal_population():
+    """5市町村の年次人口系列"""
+    rng = np.random.default_rng(4)
+    frames = []
+    for i in range(5):
+        base = rng.uniform(5000, 300000)
+        frames.append(pd.DataFrame({
+            "date": pd.date_range("1990-01-01", periods=25, freq="YS"),
+            "municipality_code": f"31{i:03d}",
+            "population": base * (1 - 0.01 * np.arange(25)) + rng.normal(0, base * 0.002, 25),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+class TestCrossValidation:
+    """時系列交差検証のテストクラス"""
+
+    def test_evaluate_models_does_not_mutate_trained_models(self, feature_data):
+        """評価時に学習済みモデルが再学習されないことを確認"""
+        X, y = feature_data
+        predictor = PopulationPredictor(n_jobs=1)
+        predictor.fit_random_forest(X, y)
+        trained = predictor.models["random_forest"]
+        before = trained.predict(X)
+
+        predictor.evaluate_models(X, y)
+
+        assert predictor.models["random_forest"] is trained
+        np.testing.assert_allclose(trained.predict(X), before)
+
+    def test_fold_predictions_are_cached(self, feature_data, monkeypatch):
+        """同一データ・同一パラメータでは再学習せずキャッシュを使用"""
+        X, y = feature_data
+        predictor = PopulationPredictor(n_jobs=1)
+        result = predictor.fit_random_forest(X, y)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("フォールドが再学習されました")
+
+        monkeypatch.setattr("ml_models.population_forecast._fit_predict_fold", fail)
+        evaluation = predictor.evaluate_models(X, y)
+
+        assert evaluation["random_forest"]["mae_mean"] == pytest.approx(result["cv_mae_mean"])
+
+    @pytest.mark.parametrize("model_type", ["xgboost", "random_forest"])
+    def test_multi_series_folds_are_temporal(self, municipal_population, monkeypatch, model_type):
+        """複数系列でも各フォールドの検証期間が学習期間より後で、全系列を含むことを確認"""
+        import ml_models.population_forecast as population_forecast
+
+        predictor = PopulationPredictor(n_jobs=1)
+        X, y = predictor.prepare_features(municipal_population)
+        folds = []
+        original = population_forecast._fit_predict_fold
+
+        def recording_fold(estimator, X_train, y_train, X_test):
+            folds.append((X_train["year"], X_test["year"]))
+            return original(estimator, X_train, y_train, X_test)
+
+        monkeypatch.setattr(population_forecast, "_fit_predict_fold", recording_fold)
+        getattr(predictor, f"fit_{model_type}")(X, y)
+
+        assert len(folds) == 5
+        for train_years, test_years in folds:
+            assert train_years.max() < test_years.min()
+            assert len(test_years) == 5 * test_years.nunique()
+
+
+class TestIncrementalUpdate:
+    """増分モデル更新のテストクラス"""
+
+    @pytest.fixture
+    def yearly_data(self):
+        rng = np.random.default_rng(2)
+        return pd.DataFrame({
+            "date": pd.date_range("1980-01-01", periods=40, freq="YS"),
+            "population": 600000 - np.arange(40) * 1500 + rng.normal(0, 200, 40),
+        })
+
+    def test_feature_tail_matches_full_recompute(self, yearly_data):
+        """末尾のみ再計算した特徴量が全量計算と一致することを確認"""
+        predictor = PopulationPredictor(n_jobs=1)
+        predictor.prepare_features(yearly_data.iloc[:-3])
+        X_incremental, y_incremental = predictor.append_feature_rows(yearly_data.iloc[-3:])
+
+        X_full, y_full = PopulationPredictor().prepare_features(yearly_data)
+
+        np.testing.assert_allclose(X_incremental.values, X_full.values)
+        np.testing.assert_allclose(y_incremental.values, y_full.values)
+
+    def test_models_are_extended_without_refit(self, yearly_data):
+        """ARIMAは観測追加、XGBoostは追加ブースティングで更新される"""
+        history = yearly_data.iloc[:-1]
+        predictor = PopulationPredictor(n_jobs=1)
+        X, y = predictor.prepare_features(history)
+        predictor.fit_arima(
+            pd.Series(history["population"].values, index=pd.DatetimeIndex(history["date"], freq="YS")),
+            order=(1, 1, 0)
+        )
+        predictor.fit_xgboost(X, y)
+        arima_params = predictor.models["arima"].params.copy()
+        rounds = predictor.models["xgboost"].get_booster().num_boosted_rounds()
+
+        results = predictor.update_models_with_new_data(yearly_data.iloc[-1:])
+
+        assert set(results) == {"features", "arima", "xgboost"}
+        assert predictor.models["arima"].nobs == len(yearly_data)
+        np.testing.assert_allclose(predictor.models["arima"].params, arima_params)
+        assert predictor.models["xgboost"].get_booster().num_boosted_rounds() == (
+            rounds + predictor.incremental_configs["xgboost_rounds"]
+        )
+        assert predictor.last_observed_date == yearly_data["date"].max()
+
+    def test_boosting_window_covers_all_series(self, municipal_population, monkeypatch):
+        """追加ブースティングは全系列の直近期間の行で行われることを確認"""
+        import xgboost as xgb
+
+        history = municipal_population[municipal_population["date"] < "2014-01-01"]
+        new_rows = municipal_population[municipal_population["date"] == "2014-01-01"]
+        predictor = PopulationPredictor(n_jobs=1)
+        predictor.interval_configs["fit_quantile_models"] = False
+        predictor.incremental_configs["xgboost_window"] = 3
+        X, y = predictor.prepare_features(history)
+        predictor.fit_xgboost(X, y)
+
+        boosted = []
+        original_fit = xgb.XGBRegressor.fit
+
+        def recording_fit(self, X, y, **kwargs):
+            if kwargs.get("xgb_model") is not None:
+                boosted.append(X["year"])
+            return original_fit(self, X, y, **kwargs)
+
+        monkeypatch.setattr(xgb.XGBRegressor, "fit", recording_fit)
+        predictor.update_models_with_new_data(new_rows)
+
+        assert len(boosted) == 1
+        assert sorted(boosted[0].unique()) == [2012, 2013, 2014]
+        assert len(boosted[0]) == 5 * 3
+
+
+class TestPredictionIntervals:
+    """木モデルの予測区間のテストクラス"""
+
+    @pytest.fixture
+    def tree_predictor(self, yearly_population):
+        predictor = PopulationPredictor(n_jobs=1)
+        X, y = predictor.prepare_features(yearly_population)
+        predictor.interval_configs["max_workers"] = 1
+        predictor.fit_xgboost(X, y)
+        predictor.fit_random_forest(X, y)
+        return predictor, X
+
+    @pytest.mark.parametrize("model_type", ["xgboost", "random_forest"])
+    def test_quantile_bounds_are_ordered(self, tree_predictor, model_type):
+        """分位点予測の下限が上限以下であることを確認"""
+        predictor, X = tree_predictor
+        lower, upper = predictor.predict_quantiles(model_type, X)
+
+        assert lower.shape == upper.shape == (len(X),)
+        assert np.all(lower <= upper)
+
+    def test_bootstrap_intervals_widen_with_horizon(self, tree_predictor):
+        """ブートストラップ区間が予測点を含み、期間とともに広がることを確認"""
+        predictor, _ = tree_predictor
+        predictor.interval_configs["time_budget"] = 5.0
+        forecast = np.full(5, 500000.0)
+
+        lower, upper = predictor.bootstrap_prediction_intervals("random_forest", forecast)
+
+        width = upper - lower
+        assert np.all(width > 0)
+        assert width[-1] > width[0]
+
+    def test_falls_back_when_budget_exhausted(self, tree_predictor):
+        """時間予算を超えた場合は正規近似の区間を返す"""
+        predictor, _ = tree_predictor
+        predictor.interval_configs["time_budget"] = 0.0
+        forecast = np.full(3, 500000.0)
+
+        lower, upper = predictor.bootstrap_prediction_intervals("xgboost", forecast)
+
+        np.testing.assert_allclose(forecast - lower, upper - forecast)
+
+    def test_ml_forecast_includes_intervals(self, tree_predictor):
+        """機械学習モデルの予測結果に区間が含まれる"""
+        predictor, _ = tree_predictor
+        result = predictor.predict_population("xgboost", years_ahead=4)
+
+        assert len(result["lower_bound"]) == len(result["upper_bound"]) == 4
+
+    def test_ensemble_members_skip_bootstrap(self, tree_predictor, monkeypatch):
+        """アンサンブルの構成モデルは統合で使わない予測区間を計算しないことを確認"""
+        predictor, _ = tree_predictor
+
+        def fail(*args, **kwargs):
+            raise AssertionError("構成モデルで予測区間が計算されました")
+
+        monkeypatch.setattr(predictor, "bootstrap_prediction_intervals", fail)
+        result = predictor.ensemble_predict(years_ahead=4)
+
+        assert len(result["forecast"]) == 4
+        assert predictor._interval_executor is None
+        for prediction in result["individual_predictions"].values():
+            assert "lower_bound" not in prediction
+
+
+class TestRecursiveForecast:
+    """再帰的多段予測のテストクラス"""
+
+    @pytest.fixture
+    def municipal_predictor(self, tmp_path):
+        """19市町村の年次系列でRandom Forestを学習した予測器"""
+        rng = np.random.default_rng(3)
+        frames = []
+        for i in range(19):
+            base = rng.uniform(5000, 300000)
+            frames.append(pd.DataFrame({
+                "date": pd.date_range("1990-01-01", periods=30, freq="YS"),
+                "municipality_code": f"31{i:03d}",
+                "population": base * (1 - 0.01 * np.arange(30)) + rng.normal(0, base * 0.002, 30),
+            }))
+        predictor = PopulationPredictor(model_dir=str(tmp_path), n_jobs=1)
+        X, y = predictor.prepare_features(pd.concat(frames, ignore_index=True))
+        predictor.fit_random_forest(X, y)
+        return predictor
+
+    def test_one_predict_call_per_step(self, municipal_predictor, monkeypatch):
+        """全系列を1回のpredictでまとめて予測し、予測値が次ステップの入力になる"""
+        forest = municipal_predictor.models["random_forest"]
+        batch_sizes = []
+        original_predict = forest.predict
+
+        def counting_predict(X):
+            batch_sizes.append(len(X))
+            return original_predict(X)
+
+        monkeypatch.setattr(forest, "predict", counting_predict)
+        paths = municipal_predictor.forecast_recursive("random_forest", years_ahead=20)
+
+        assert batch_sizes == [19] * 20
+        assert paths["forecast"].shape == (19, 20)
+        assert np.isfinite(paths["forecast"]).all()
+        assert pd.Timestamp(paths["dates"][0, 0]) == pd.Timestamp("2020-01-01")
+
+    def test_population_forecast_aggregates_series(self, municipal_predictor):
+        """予測結果が市町村別予測の合計となり、保存・読み込み後も再現される"""
+        result = municipal_predictor.predict_population("random_forest", years_ahead=5)
+
+        assert result["series_forecasts"].shape == (19, 5)
+        np.testing.assert_allclose(result["forecast"], result["series_forecasts"].sum(axis=0))
+
+        municipal_predictor.save_models()
+        loaded = PopulationPredictor(model_dir=municipal_predictor.model_dir)
+        loaded.load_models()
+        np.testing.assert_allclose(
+            loaded.forecast_recursive("random_forest", years_ahead=5)["forecast"],
+            result["series_forecasts"]
+        )
+
+
+class TestHyperparameterTuning:
+    """逐次半減法によるハイパーパラメータ探索のテストクラス"""
+
+    def test_best_configs_are_persisted_and_restored(self, yearly_population, tmp_path):
+        """最良設定がレジストリのメタデータに記録され、読み込み時に反映される"""
+        predictor = PopulationPredictor(model_dir=str(tmp_path), n_jobs=1)
+        predictor.tuning_configs.update({"min_resources": 5, "max_resources": 15, "n_splits": 3})
+        X, y = predictor.prepare_features(yearly_population)
+        predictor.fit_random_forest(X, y)
+        version = predictor.save_models()
+
+        results = predictor.tune_hyperparameters(X, y, model_types=["random_forest"])
+
+        best_params = results["random_forest"]["best_params"]
+        assert results["random_forest"]["resources"] == [5, 15]
+        assert set(best_params) == set(PopulationPredictor.TUNING_SPACES["random_forest"]) | {"n_estimators"}
+        assert predictor.registry.get_metadata("population", version)["tuned_configs"]["random_forest"] == best_params
+
+        loaded = PopulationPredictor(model_dir=str(tmp_path))
+        loaded.load_models()
+        assert loaded.model_configs["random_forest"]["n_estimators"] == best_params["n_estimators"]
+
+
+class TestEnsemble:
+    """アンサンブル予測のテストクラス"""
+
+    @pytest.fixture
+    def stub_predictor(self, monkeypatch):
+        """各構成モデルの予測に一定時間かかる予測器"""
+        predictor = PopulationPredictor(n_jobs=1)
+        predictor.models = {"arima": object(), "xgboost": object(), "random_forest": object()}
+        levels = {"arima": 100.0, "xgboost": 200.0, "random_forest": 400.0}
+
+        def slow_predict(model_type, years_ahead=10, policy_scenario=None, with_intervals=True):
+            time.sleep(0.3)
+            return {"forecast": np.full(years_ahead, levels[model_type])}
+
+        monkeypatch.setattr(predictor, "predict_population", slow_predict)
+        return predictor
+
+    def test_members_run_concurrently(self, stub_predictor):
+        """構成モデルが並行実行され、所要時間が最も遅いモデル程度に収まる"""
+        start = time.perf_counter()
+        result = stub_predictor.ensemble_predict(years_ahead=3)
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.6
+        np.testing.assert_allclose(result["forecast"], np.full(3, 0.3 * 100 + 0.4 * 200 + 0.3 * 400))
+
+    def test_weights_are_normalized_for_available_members(self, stub_predictor):
+        """一部のモデルのみ学習済みの場合は重みを正規化して統合する"""
+        del stub_predictor.models["arima"]
+
+        result = stub_predictor.ensemble_predict(years_ahead=2)
+
+        assert result["weights"] == pytest.approx({"xgboost": 4 / 7, "random_forest": 3 / 7})
+        np.testing.assert_allclose(result["forecast"], np.full(2, (0.4 * 200 + 0.3 * 400) / 0.7))